@@ -1,18 +1,39 @@
 """Admin dashboard module for the University Management System"""
 
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox
-import sqlite3
+from tkinter import ttk, messagebox, filedialog
 
-from config import DATABASE_NAME
+import bulk_io
+import data_access
+import query_stats
+import room_allocation
+import timetable
 from ui_components import create_label, create_entry, create_combobox, create_button
-from ui_components import create_treeview, create_form_frame, create_tree_frame
+from ui_components import create_treeview, create_form_frame, create_tree_frame, make_sortable
+from ui_components import create_busy_indicator, set_busy
+from query_executor import QueryExecutor
+from change_watcher import ChangeWatcher
 
 class AdminDashboard:
-    def __init__(self, root, user):
+    def __init__(self, root, user, login_started=None, service=None):
         self.root = root
         self.current_user = user
         self.logout_callback = None
+        # Calls go to the HTTP service when the client uses one, else straight to the database
+        self.data_access = service.data_access if service else data_access
+        self.bulk_io = service.bulk_io if service else bulk_io
+        self.room_allocation = service.room_allocation if service else room_allocation
+        # time.perf_counter() when the login button was pressed, for timing the first paint
+        self.login_started = login_started
+        
+        # Name to ID lookups for the comboboxes, filled once their queries finish
+        self.dept_id_map = {}
+        self.course_dept_id_map = {}
+        self.course_prof_id_map = {}
+        self.section_course_id_map = {}
+        # Choices each dropdown currently shows, so unchanged ones are not refilled
+        self.filled_choices = {}
         self.create_dashboard()
         
     def set_logout_callback(self, callback):
@@ -36,6 +57,13 @@ class AdminDashboard:
         logout_button = ttk.Button(header_frame, text="Logout", command=self.logout)
         logout_button.pack(side=tk.RIGHT)
         
+        stats_button = ttk.Button(header_frame, text="Query Stats", command=self.show_query_stats)
+        stats_button.pack(side=tk.RIGHT, padx=5)
+        
+        # Queries run in the background while the busy indicator is shown
+        self.busy_indicator = create_busy_indicator(header_frame)
+        self.executor = QueryExecutor(self.root, lambda busy: set_busy(self.busy_indicator, busy))
+        
         # Notebook for tabs
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
@@ -56,32 +84,232 @@ class AdminDashboard:
         # Bind tab change event
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
-        # Create content for each tab
-        self.create_student_tab()
-        self.create_professor_tab()
-        self.create_course_tab()
-        self.create_department_tab()
-        self.create_section_tab()
+        # Tabs are built and populated the first time they are selected
+        self.tab_builders = {
+            str(self.student_tab): self.create_student_tab,
+            str(self.professor_tab): self.create_professor_tab,
+            str(self.course_tab): self.create_course_tab,
+            str(self.department_tab): self.create_department_tab,
+            str(self.section_tab): self.create_section_tab,
+        }
+        self.build_tab(self.notebook.select())
+        
+        # Refresh the trees and dropdowns whose tables change; each tab's handlers patch
+        # its own tree and reload the dropdowns, so only writes to the other tables a
+        # tree shows (e.g. a renamed department in the professor tree) refresh it
+        self.watcher = ChangeWatcher(self.root, self.data_access)
+        self.watcher.watch(["Student"], lambda: self.refresh_tree("student_tree"), patched=["Student"])
+        self.watcher.watch(["Professor", "Department"], lambda: self.refresh_tree("professor_tree"),
+                           patched=["Professor"])
+        self.watcher.watch(["Course", "Professor", "Department"], lambda: self.refresh_tree("course_tree"),
+                           patched=["Course"])
+        self.watcher.watch(["Department"], lambda: self.refresh_tree("dept_tree"), patched=["Department"])
+        self.watcher.watch(["Section", "Course"], lambda: self.refresh_tree("section_tree"), patched=["Section"])
+        self.watcher.watch(["Department", "Professor", "Course"], self.refresh_choices,
+                           patched=["Department", "Professor", "Course"])
+        
+        if self.login_started is not None:
+            # Idle callbacks run after Tk has drawn the pending widgets
+            self.root.after_idle(self.record_first_paint)
+            
+    def build_tab(self, tab):
+        """Create a tab's content the first time it is selected"""
+        builder = self.tab_builders.pop(str(tab), None)
+        if builder:
+            builder()
+            
+    def record_first_paint(self):
+        """Record the time from pressing login to the dashboard being drawn"""
+        elapsed = time.perf_counter() - self.login_started
+        query_stats.record_timing("admin_dashboard.login_to_first_paint", elapsed)
         
     def logout(self):
         """Logout and return to login screen"""
+        self.watcher.stop()
+        self.executor.shutdown()
         if self.logout_callback:
             self.logout_callback()
             
+    def show_query_stats(self):
+        """Open a window with the SQL timings recorded by query_stats"""
+        window = tk.Toplevel(self.root)
+        window.title("Query Stats")
+        window.geometry("900x550")
+        
+        # Selected statement and its plan below the statistics
+        detail_frame = ttk.LabelFrame(window, text="Statement")
+        detail_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
+        detail_text = tk.Text(detail_frame, height=8, wrap=tk.WORD)
+        detail_text.grid(row=0, column=0, sticky=tk.EW)
+        detail_frame.columnconfigure(0, weight=1)
+        
+        # Non-SQL timings such as login to first paint
+        timings_label = ttk.Label(window)
+        timings_label.pack(side=tk.TOP, anchor=tk.W, padx=10, pady=(10, 0))
+        
+        tree_frame = create_tree_frame(window, "Statements (slowest total first)")
+        columns = ("name", "calls", "total", "average", "max", "rows", "slow")
+        headings = ("Query", "Calls", "Total ms", "Avg ms", "Max ms", "Rows", "Slow")
+        widths = (300, 70, 90, 80, 80, 80, 60)
+        stats_tree = create_treeview(tree_frame, columns, headings, widths)
+        stats = {}
+        
+        def refresh():
+            stats.clear()
+            for item in stats_tree.get_children():
+                stats_tree.delete(item)
+            for index, stat in enumerate(query_stats.snapshot()):
+                stats[f"stat{index}"] = stat
+                average = stat["total"] / stat["calls"] if stat["calls"] else 0.0
+                stats_tree.insert("", tk.END, iid=f"stat{index}", values=(
+                    stat["name"], stat["calls"], f"{stat['total'] * 1000:.1f}", f"{average * 1000:.2f}",
+                    f"{stat['max'] * 1000:.2f}", stat["rows"], stat["slow"]))
+            timings = query_stats.timings()
+            timings_label.config(text="   ".join(f"{name}: {elapsed * 1000:.0f} ms"
+                                                 for name, elapsed in sorted(timings.items())))
+            
+        def show_statement(event):
+            selected = stats_tree.selection()
+            if not selected or selected[0] not in stats:
+                return
+            stat = stats[selected[0]]
+            text = query_stats.normalize_sql(stat["sql"])
+            plan = query_stats.captured_plan(stat["sql"])
+            if plan:
+                text += "\n\nQuery plan:\n" + "\n".join(plan)
+            detail_text.delete("1.0", tk.END)
+            detail_text.insert(tk.END, text)
+            
+        def reset():
+            query_stats.reset()
+            refresh()
+            
+        def save():
+            path = filedialog.asksaveasfilename(parent=window, title="Save query report",
+                                                defaultextension=".txt", initialfile="query_stats.txt")
+            if path:
+                query_stats.dump(path)
+                messagebox.showinfo("Query Stats", f"Report saved to {path}", parent=window)
+                
+        stats_tree.bind("<<TreeviewSelect>>", show_statement)
+        
+        button_frame = ttk.Frame(detail_frame)
+        button_frame.grid(row=1, column=0, pady=10)
+        create_button(button_frame, "Refresh", refresh, "left")
+        create_button(button_frame, "Reset", reset, "left")
+        create_button(button_frame, "Save Report", save, "left")
+        refresh()
+        
     def on_tab_changed(self, event):
         """Handle tab change events to refresh data when needed"""
         # Get the currently selected tab
         selected_tab = event.widget.select()
         tab_text = event.widget.tab(selected_tab, "text")
+        self.build_tab(selected_tab)
         
-        # Refresh professor dropdown in course tab when course tab is selected
+        # Refresh dropdowns from the reference data cache; unchanged tables cost nothing
         if tab_text == "Courses":
             self.load_professors_to_course_combobox()
             self.load_departments_to_course_combobox()
-        # Refresh course dropdown in section tab when section tab is selected
         elif tab_text == "Sections":
             self.load_courses_to_section_combobox()
             
+    def load_choices(self, key, table, fill):
+        """Fill a dropdown from the cached choices for table, querying only after the table changed"""
+        # Dropdowns on tabs not built yet are filled when their tab is built
+        if not hasattr(self, key):
+            return
+        cache = self.data_access.CHOICE_CACHES[table]
+        choices = cache.cached()
+        if choices is not None:
+            self.executor.cancel(key)
+            self.fill_choices(key, choices, fill)
+            return
+        self.executor.submit(key, cache.get, on_success=lambda choices: self.fill_choices(key, choices, fill))
+        
+    def fill_choices(self, key, choices, fill):
+        """Pass choices to a dropdown's fill method unless it already shows them"""
+        if self.filled_choices.get(key) is not choices:
+            self.filled_choices[key] = choices
+            fill(choices)
+            
+    def show_added_row(self, tree, row, reload):
+        """Append a newly added row to a tree, reloading the tree only when that is not possible"""
+        if row is None or not tree.add_row(row):
+            reload()
+            
+    def show_updated_row(self, tree, key, row, reload):
+        """Patch an updated row in place, reloading the tree only when that is not possible"""
+        patched = tree.update_row(row) if row is not None else tree.remove_row(key)
+        if not patched:
+            reload()
+            
+    def show_deleted_row(self, tree, key, reload):
+        """Remove a deleted row from a tree, reloading the tree only when that is not possible"""
+        if not tree.remove_row(key):
+            reload()
+            
+    def refresh_tree(self, name):
+        """Re-read the rows in view of a tree, if its tab has been built"""
+        tree = getattr(self, name, None)
+        if tree is not None:
+            self.executor.refresh_tree(tree)
+            
+    def refresh_choices(self):
+        """Refill the dropdowns; only choices whose table changed are queried again"""
+        self.load_departments_to_combobox()
+        self.load_departments_to_course_combobox()
+        self.load_professors_to_course_combobox()
+        self.load_courses_to_section_combobox()
+            
+    def create_bulk_buttons(self, form_frame, row, entity, reload):
+        """Create the CSV import and export buttons for an entity tab"""
+        bulk_frame = ttk.Frame(form_frame)
+        bulk_frame.grid(row=row, column=0, columnspan=2, pady=10)
+        
+        create_button(bulk_frame, "Import CSV", lambda: self.import_entity(entity, reload), "left")
+        create_button(bulk_frame, "Export CSV", lambda: self.export_entity(entity), "left")
+        return bulk_frame
+        
+    def import_entity(self, entity, reload):
+        """Import rows for an entity from a CSV file in the background"""
+        path = filedialog.askopenfilename(title=f"Import {entity}", filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+            
+        def show_report(report):
+            reload()
+            messagebox.showinfo("Import", report.summary())
+            
+        self.executor.submit(f"import_{entity}", self.bulk_io.import_csv, entity, path, on_success=show_report,
+                             on_error=lambda e: messagebox.showerror("Error", f"Failed to import {entity}: {e}"))
+        
+    def export_entity(self, entity):
+        """Export an entity's rows to a CSV file in the background"""
+        path = filedialog.asksaveasfilename(title=f"Export {entity}", defaultextension=".csv",
+                                            initialfile=f"{entity}.csv", filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+        self.executor.submit(f"export_{entity}", self.bulk_io.export_csv, entity, path,
+                             on_success=lambda written: messagebox.showinfo("Export", f"Exported {written} {entity}"),
+                             on_error=lambda e: messagebox.showerror("Error", f"Failed to export {entity}: {e}"))
+        
+    def reload_professors(self):
+        """Reload the professor tree and the dropdowns that list professors"""
+        self.load_professors()
+        self.load_professors_to_course_combobox()
+        
+    def reload_courses(self):
+        """Reload the course tree and the dropdowns that list courses"""
+        self.load_courses()
+        self.load_courses_to_section_combobox()
+        
+    def reload_departments(self):
+        """Reload the department tree and the dropdowns that list departments"""
+        self.load_departments()
+        self.load_departments_to_combobox()
+        self.load_departments_to_course_combobox()
+        
     def create_student_tab(self):
         """Create the student management tab"""
         # Left frame for form
@@ -122,6 +350,9 @@ class AdminDashboard:
         search_button = ttk.Button(search_frame, text="Search", command=self.search_students)
         search_button.pack(side=tk.LEFT, padx=5)
         
+        # Bulk CSV import and export
+        self.create_bulk_buttons(form_frame, 7, "students", self.load_students)
+        
         # Right frame for treeview
         tree_frame = create_tree_frame(self.student_tab, "Student Records")
         
@@ -130,27 +361,15 @@ class AdminDashboard:
         headings = ("ID", "Name", "Email", "Date of Birth", "Username")
         widths = (50, 150, 200, 100, 100)
         self.student_tree = create_treeview(tree_frame, columns, headings, widths)
+        make_sortable(self.student_tree, self.data_access.STUDENT_SORTS, self.search_students)
         self.student_tree.bind("<ButtonRelease-1>", self.select_student)
         self.load_students()
         
     def load_students(self):
         """Load students from database to treeview"""
-        # Clear existing data
-        for item in self.student_tree.get_children():
-            self.student_tree.delete(item)
-            
-        # Fetch data
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT student_id, name, email, dob, username FROM Student")
-        students = cursor.fetchall()
-        
-        # Insert data
-        for student in students:
-            self.student_tree.insert("", tk.END, values=student)
-            
-        conn.close()
+        # Fetch data in the background, then a window at a time as the tree scrolls
+        source = self.data_access.students_source(None, self.student_tree.sort)
+        self.executor.load_tree(self.student_tree, source, key_column=0)
             
     def add_student(self):
         """Add a new student to database"""
@@ -165,15 +384,9 @@ class AdminDashboard:
             return
             
         try:
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
+            student_id = self.data_access.add_student(name, email, dob, username, password)
             
-            cursor.execute("INSERT INTO Student (name, email, dob, username, password) VALUES (?, ?, ?, ?, ?)", 
-                          (name, email, dob, username, password))
-            conn.commit()
-            conn.close()
-            
-            self.load_students()
+            self.show_added_row(self.student_tree, self.data_access.student_row(student_id), self.load_students)
             
             # Clear form
             self.student_name_entry.delete(0, tk.END)
@@ -222,20 +435,11 @@ class AdminDashboard:
                 messagebox.showerror("Error", "Name and username are required")
                 return
                 
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            
             # If password field is empty, don't update password
-            if self.student_password_entry.get():
-                cursor.execute("UPDATE Student SET name=?, email=?, dob=?, username=?, password=? WHERE student_id=?", 
-                              (name, email, dob, username, self.student_password_entry.get(), student_id))
-            else:
-                cursor.execute("UPDATE Student SET name=?, email=?, dob=?, username=? WHERE student_id=?", 
-                              (name, email, dob, username, student_id))
-            conn.commit()
-            conn.close()
+            self.data_access.update_student(student_id, name, email, dob, username,
+                                            self.student_password_entry.get())
             
-            self.load_students()
+            self.show_updated_row(self.student_tree, student_id, self.data_access.student_row(student_id), self.load_students)
             
             messagebox.showinfo("Success", "Student updated successfully")
         except IndexError:
@@ -252,14 +456,9 @@ class AdminDashboard:
             # Confirm deletion
             result = messagebox.askyesno("Confirm", "Are you sure you want to delete this student?")
             if result:
-                conn = sqlite3.connect(DATABASE_NAME)
-                cursor = conn.cursor()
-                
-                cursor.execute("DELETE FROM Student WHERE student_id=?", (student_id,))
-                conn.commit()
-                conn.close()
+                self.data_access.delete_student(student_id)
                 
-                self.load_students()
+                self.show_deleted_row(self.student_tree, student_id, self.load_students)
                 
                 # Clear form
                 self.student_name_entry.delete(0, tk.END)
@@ -275,29 +474,12 @@ class AdminDashboard:
             messagebox.showerror("Error", f"Failed to delete student: {str(e)}")
             
     def search_students(self):
-        """Search students by name or ID"""
+        """Search students by name, email, username or ID"""
         search_term = self.student_search_entry.get()
         
-        # Clear existing data
-        for item in self.student_tree.get_children():
-            self.student_tree.delete(item)
-            
-        # Search by name or ID
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        if search_term.isdigit():
-            cursor.execute("SELECT student_id, name, email, dob, username FROM Student WHERE student_id=? OR name LIKE ?", 
-                          (search_term, f"%{search_term}%"))
-        else:
-            cursor.execute("SELECT student_id, name, email, dob, username FROM Student WHERE name LIKE ?", (f"%{search_term}%",))
-            
-        students = cursor.fetchall()
-        conn.close()
-        
-        # Insert data
-        for student in students:
-            self.student_tree.insert("", tk.END, values=student)
+        # Ranked prefix search on the full-text index
+        source = self.data_access.students_source(search_term, self.student_tree.sort)
+        self.executor.load_tree(self.student_tree, source, key_column=0)
             
     def create_professor_tab(self):
         """Create the professor management tab"""
@@ -340,6 +522,9 @@ class AdminDashboard:
         search_button = ttk.Button(search_frame, text="Search", command=self.search_professors)
         search_button.pack(side=tk.LEFT, padx=5)
         
+        # Bulk CSV import and export
+        self.create_bulk_buttons(form_frame, 7, "professors", self.reload_professors)
+        
         # Right frame for treeview
         tree_frame = create_tree_frame(self.professor_tab, "Professor Records")
         
@@ -348,46 +533,28 @@ class AdminDashboard:
         headings = ("ID", "Name", "Email", "Department", "Username")
         widths = (50, 150, 200, 150, 100)
         self.professor_tree = create_treeview(tree_frame, columns, headings, widths)
+        make_sortable(self.professor_tree, self.data_access.PROFESSOR_SORTS, self.search_professors)
         self.professor_tree.bind("<ButtonRelease-1>", self.select_professor)
         self.load_professors()
         
     def load_departments_to_combobox(self):
         """Load departments to combobox"""
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT dept_id, dept_name FROM Department")
-        departments = cursor.fetchall()
-        conn.close()
+        self.load_choices("professor_dept_combobox", "Department", self.fill_departments_combobox)
         
+    def fill_departments_combobox(self, departments):
+        """Fill the professor department combobox with fetched departments"""
         # Create a list of department names for the combobox
         dept_names = [dept[1] for dept in departments]
         self.professor_dept_combobox['values'] = dept_names
         
-        # Create a mapping for dept_id lookup
-        self.dept_id_map = {dept[1]: dept[0] for dept in departments}
+        # Name to ID mapping, built once per change by the choice cache
+        self.dept_id_map = departments.ids
         
     def load_professors(self):
         """Load professors from database to treeview"""
-        # Clear existing data
-        for item in self.professor_tree.get_children():
-            self.professor_tree.delete(item)
-            
-        # Fetch data with department names
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT p.professor_id, p.name, p.email, d.dept_name, p.username
-            FROM Professor p 
-            LEFT JOIN Department d ON p.dept_id = d.dept_id
-        """)
-        professors = cursor.fetchall()
-        conn.close()
-        
-        # Insert data
-        for professor in professors:
-            self.professor_tree.insert("", tk.END, values=professor)
+        # Fetch data with department names in the background
+        source = self.data_access.professors_source(None, self.professor_tree.sort)
+        self.executor.load_tree(self.professor_tree, source, key_column=0)
             
     def select_professor(self, event):
         """Select a professor from treeview to populate form"""
@@ -424,15 +591,9 @@ class AdminDashboard:
             # Get department ID
             dept_id = self.dept_id_map.get(dept_name) if dept_name else None
             
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            
-            cursor.execute("INSERT INTO Professor (name, email, dept_id, username, password) VALUES (?, ?, ?, ?, ?)", 
-                          (name, email, dept_id, username, password))
-            conn.commit()
-            conn.close()
+            professor_id = self.data_access.add_professor(name, email, dept_id, username, password)
             
-            self.load_professors()
+            self.show_added_row(self.professor_tree, self.data_access.professor_row(professor_id), self.load_professors)
             
             # Refresh professor dropdown in course tab
             self.load_professors_to_course_combobox()
@@ -468,20 +629,11 @@ class AdminDashboard:
             # Get department ID
             dept_id = self.dept_id_map.get(dept_name) if dept_name else None
             
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            
             # If password field is empty, don't update password
-            if self.professor_password_entry.get():
-                cursor.execute("UPDATE Professor SET name=?, email=?, dept_id=?, username=?, password=? WHERE professor_id=?", 
-                              (name, email, dept_id, username, self.professor_password_entry.get(), professor_id))
-            else:
-                cursor.execute("UPDATE Professor SET name=?, email=?, dept_id=?, username=? WHERE professor_id=?", 
-                              (name, email, dept_id, username, professor_id))
-            conn.commit()
-            conn.close()
+            self.data_access.update_professor(professor_id, name, email, dept_id, username,
+                                              self.professor_password_entry.get())
             
-            self.load_professors()
+            self.show_updated_row(self.professor_tree, professor_id, self.data_access.professor_row(professor_id), self.load_professors)
             
             # Refresh professor dropdown in course tab
             self.load_professors_to_course_combobox()
@@ -503,14 +655,9 @@ class AdminDashboard:
             # Confirm deletion
             result = messagebox.askyesno("Confirm", "Are you sure you want to delete this professor?")
             if result:
-                conn = sqlite3.connect(DATABASE_NAME)
-                cursor = conn.cursor()
+                self.data_access.delete_professor(professor_id)
                 
-                cursor.execute("DELETE FROM Professor WHERE professor_id=?", (professor_id,))
-                conn.commit()
-                conn.close()
-                
-                self.load_professors()
+                self.show_deleted_row(self.professor_tree, professor_id, self.load_professors)
                 
                 # Refresh professor dropdown in course tab
                 self.load_professors_to_course_combobox()
@@ -531,38 +678,12 @@ class AdminDashboard:
             messagebox.showerror("Error", f"Failed to delete professor: {str(e)}")
             
     def search_professors(self):
-        """Search professors by name or ID"""
+        """Search professors by name, email, username or ID"""
         search_term = self.professor_search_entry.get()
         
-        # Clear existing data
-        for item in self.professor_tree.get_children():
-            self.professor_tree.delete(item)
-            
-        # Search by name or ID
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        if search_term.isdigit():
-            cursor.execute("""
-                SELECT p.professor_id, p.name, p.email, d.dept_name, p.username
-                FROM Professor p 
-                LEFT JOIN Department d ON p.dept_id = d.dept_id 
-                WHERE p.professor_id=? OR p.name LIKE ?
-            """, (search_term, f"%{search_term}%"))
-        else:
-            cursor.execute("""
-                SELECT p.professor_id, p.name, p.email, d.dept_name, p.username
-                FROM Professor p 
-                LEFT JOIN Department d ON p.dept_id = d.dept_id 
-                WHERE p.name LIKE ?
-            """, (f"%{search_term}%",))
-            
-        professors = cursor.fetchall()
-        conn.close()
-        
-        # Insert data
-        for professor in professors:
-            self.professor_tree.insert("", tk.END, values=professor)
+        # Ranked prefix search on the full-text index
+        source = self.data_access.professors_source(search_term, self.professor_tree.sort)
+        self.executor.load_tree(self.professor_tree, source, key_column=0)
             
     def create_course_tab(self):
         """Create the course management tab"""
@@ -605,6 +726,9 @@ class AdminDashboard:
         search_button = ttk.Button(search_frame, text="Search", command=self.search_courses)
         search_button.pack(side=tk.LEFT, padx=5)
         
+        # Bulk CSV import and export
+        self.create_bulk_buttons(form_frame, 7, "courses", self.reload_courses)
+        
         # Right frame for treeview
         tree_frame = create_tree_frame(self.course_tab, "Course Records")
         
@@ -613,63 +737,41 @@ class AdminDashboard:
         headings = ("ID", "Course Name", "Credits", "Semester", "Department", "Professor")
         widths = (50, 150, 70, 100, 120, 150)
         self.course_tree = create_treeview(tree_frame, columns, headings, widths)
+        make_sortable(self.course_tree, self.data_access.COURSE_SORTS, self.search_courses)
         self.course_tree.bind("<ButtonRelease-1>", self.select_course)
         self.load_courses()
         
     def load_departments_to_course_combobox(self):
         """Load departments to course combobox"""
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT dept_id, dept_name FROM Department")
-        departments = cursor.fetchall()
-        conn.close()
+        self.load_choices("course_dept_combobox", "Department", self.fill_course_departments_combobox)
         
+    def fill_course_departments_combobox(self, departments):
+        """Fill the course department combobox with fetched departments"""
         # Create a list of department names for the combobox
         dept_names = [dept[1] for dept in departments]
         self.course_dept_combobox['values'] = dept_names
         
-        # Create a mapping for dept_id lookup
-        self.course_dept_id_map = {dept[1]: dept[0] for dept in departments}
+        # Name to ID mapping, built once per change by the choice cache
+        self.course_dept_id_map = departments.ids
         
     def load_professors_to_course_combobox(self):
         """Load professors to course combobox"""
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT professor_id, name FROM Professor")
-        professors = cursor.fetchall()
-        conn.close()
+        self.load_choices("course_professor_combobox", "Professor", self.fill_course_professors_combobox)
         
+    def fill_course_professors_combobox(self, professors):
+        """Fill the course professor combobox with fetched professors"""
         # Create a list of professor names for the combobox
         prof_names = [prof[1] for prof in professors]
         self.course_professor_combobox['values'] = prof_names
         
-        # Create a mapping for professor_id lookup
-        self.course_prof_id_map = {prof[1]: prof[0] for prof in professors}
+        # Name to ID mapping, built once per change by the choice cache
+        self.course_prof_id_map = professors.ids
         
     def load_courses(self):
         """Load courses from database to treeview"""
-        # Clear existing data
-        for item in self.course_tree.get_children():
-            self.course_tree.delete(item)
-            
-        # Fetch data with department and professor names
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT c.course_id, c.course_name, c.credits, c.semester, d.dept_name, p.name 
-            FROM Course c 
-            LEFT JOIN Department d ON c.dept_id = d.dept_id
-            LEFT JOIN Professor p ON c.professor_id = p.professor_id
-        """)
-        courses = cursor.fetchall()
-        conn.close()
-        
-        # Insert data
-        for course in courses:
-            self.course_tree.insert("", tk.END, values=course)
+        # Fetch data with department and professor names in the background
+        source = self.data_access.courses_source(None, self.course_tree.sort)
+        self.executor.load_tree(self.course_tree, source, key_column=0)
             
     def select_course(self, event):
         """Select a course from treeview to populate form"""
@@ -711,15 +813,9 @@ class AdminDashboard:
             # Get professor ID
             prof_id = self.course_prof_id_map.get(prof_name) if prof_name else None
             
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            
-            cursor.execute("INSERT INTO Course (course_name, credits, semester, dept_id, professor_id) VALUES (?, ?, ?, ?, ?)", 
-                          (course_name, credits, semester, dept_id, prof_id))
-            conn.commit()
-            conn.close()
+            course_id = self.data_access.add_course(course_name, credits, semester, dept_id, prof_id)
             
-            self.load_courses()
+            self.show_added_row(self.course_tree, self.data_access.course_row(course_id), self.load_courses)
             
             # Refresh course dropdown in section tab
             self.load_courses_to_section_combobox()
@@ -757,15 +853,9 @@ class AdminDashboard:
             # Get professor ID
             prof_id = self.course_prof_id_map.get(prof_name) if prof_name else None
                 
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            
-            cursor.execute("UPDATE Course SET course_name=?, credits=?, semester=?, dept_id=?, professor_id=? WHERE course_id=?", 
-                          (course_name, credits, semester, dept_id, prof_id, course_id))
-            conn.commit()
-            conn.close()
+            self.data_access.update_course(course_id, course_name, credits, semester, dept_id, prof_id)
             
-            self.load_courses()
+            self.show_updated_row(self.course_tree, course_id, self.data_access.course_row(course_id), self.load_courses)
             
             # Refresh course dropdown in section tab
             self.load_courses_to_section_combobox()
@@ -785,14 +875,9 @@ class AdminDashboard:
             # Confirm deletion
             result = messagebox.askyesno("Confirm", "Are you sure you want to delete this course?")
             if result:
-                conn = sqlite3.connect(DATABASE_NAME)
-                cursor = conn.cursor()
+                self.data_access.delete_course(course_id)
                 
-                cursor.execute("DELETE FROM Course WHERE course_id=?", (course_id,))
-                conn.commit()
-                conn.close()
-                
-                self.load_courses()
+                self.show_deleted_row(self.course_tree, course_id, self.load_courses)
                 
                 # Refresh course dropdown in section tab
                 self.load_courses_to_section_combobox()
@@ -814,37 +899,9 @@ class AdminDashboard:
         """Search courses by name or ID"""
         search_term = self.course_search_entry.get()
         
-        # Clear existing data
-        for item in self.course_tree.get_children():
-            self.course_tree.delete(item)
-            
-        # Search by name or ID
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        if search_term.isdigit():
-            cursor.execute("""
-                SELECT c.course_id, c.course_name, c.credits, c.semester, d.dept_name, p.name 
-                FROM Course c 
-                LEFT JOIN Department d ON c.dept_id = d.dept_id
-                LEFT JOIN Professor p ON c.professor_id = p.professor_id
-                WHERE c.course_id=? OR c.course_name LIKE ?
-            """, (search_term, f"%{search_term}%"))
-        else:
-            cursor.execute("""
-                SELECT c.course_id, c.course_name, c.credits, c.semester, d.dept_name, p.name 
-                FROM Course c 
-                LEFT JOIN Department d ON c.dept_id = d.dept_id
-                LEFT JOIN Professor p ON c.professor_id = p.professor_id
-                WHERE c.course_name LIKE ?
-            """, (f"%{search_term}%",))
-            
-        courses = cursor.fetchall()
-        conn.close()
-        
-        # Insert data
-        for course in courses:
-            self.course_tree.insert("", tk.END, values=course)
+        # Ranked prefix search on the full-text index
+        source = self.data_access.courses_source(search_term, self.course_tree.sort)
+        self.executor.load_tree(self.course_tree, source, key_column=0)
             
     def create_department_tab(self):
         """Create the department management tab"""
@@ -876,6 +933,9 @@ class AdminDashboard:
         search_button = ttk.Button(search_frame, text="Search", command=self.search_departments)
         search_button.pack(side=tk.LEFT, padx=5)
         
+        # Bulk CSV import and export
+        self.create_bulk_buttons(form_frame, 4, "departments", self.reload_departments)
+        
         # Right frame for treeview
         tree_frame = create_tree_frame(self.department_tab, "Department Records")
         
@@ -884,26 +944,15 @@ class AdminDashboard:
         headings = ("ID", "Department Name", "Location")
         widths = (50, 200, 200)
         self.dept_tree = create_treeview(tree_frame, columns, headings, widths)
+        make_sortable(self.dept_tree, self.data_access.DEPARTMENT_SORTS, self.search_departments)
         self.dept_tree.bind("<ButtonRelease-1>", self.select_department)
         self.load_departments()
         
     def load_departments(self):
         """Load departments from database to treeview"""
-        # Clear existing data
-        for item in self.dept_tree.get_children():
-            self.dept_tree.delete(item)
-            
-        # Fetch data
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM Department")
-        departments = cursor.fetchall()
-        conn.close()
-        
-        # Insert data
-        for dept in departments:
-            self.dept_tree.insert("", tk.END, values=dept)
+        # Fetch data in the background, then a window at a time as the tree scrolls
+        source = self.data_access.departments_source(None, self.dept_tree.sort)
+        self.executor.load_tree(self.dept_tree, source, key_column=0)
             
     def select_department(self, event):
         """Select a department from treeview to populate form"""
@@ -930,15 +979,9 @@ class AdminDashboard:
             return
             
         try:
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
+            dept_id = self.data_access.add_department(dept_name, location)
             
-            cursor.execute("INSERT INTO Department (dept_name, location) VALUES (?, ?)", 
-                          (dept_name, location))
-            conn.commit()
-            conn.close()
-            
-            self.load_departments()
+            self.show_added_row(self.dept_tree, self.data_access.department_row(dept_id), self.load_departments)
             self.load_departments_to_combobox()  # Refresh comboboxes
             self.load_departments_to_course_combobox()
             # Refresh course dropdown in section tab (as course information may have changed)
@@ -965,15 +1008,9 @@ class AdminDashboard:
                 messagebox.showerror("Error", "Department name is required")
                 return
                 
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            
-            cursor.execute("UPDATE Department SET dept_name=?, location=? WHERE dept_id=?", 
-                          (dept_name, location, dept_id))
-            conn.commit()
-            conn.close()
+            self.data_access.update_department(dept_id, dept_name, location)
             
-            self.load_departments()
+            self.show_updated_row(self.dept_tree, dept_id, self.data_access.department_row(dept_id), self.load_departments)
             self.load_departments_to_combobox()  # Refresh comboboxes
             self.load_departments_to_course_combobox()
             # Refresh course dropdown in section tab (as course information may have changed)
@@ -994,14 +1031,9 @@ class AdminDashboard:
             # Confirm deletion
             result = messagebox.askyesno("Confirm", "Are you sure you want to delete this department?")
             if result:
-                conn = sqlite3.connect(DATABASE_NAME)
-                cursor = conn.cursor()
-                
-                cursor.execute("DELETE FROM Department WHERE dept_id=?", (dept_id,))
-                conn.commit()
-                conn.close()
+                self.data_access.delete_department(dept_id)
                 
-                self.load_departments()
+                self.show_deleted_row(self.dept_tree, dept_id, self.load_departments)
                 self.load_departments_to_combobox()  # Refresh comboboxes
                 self.load_departments_to_course_combobox()
                 # Refresh course dropdown in section tab (as course information may have changed)
@@ -1018,29 +1050,12 @@ class AdminDashboard:
             messagebox.showerror("Error", f"Failed to delete department: {str(e)}")
             
     def search_departments(self):
-        """Search departments by name or ID"""
+        """Search departments by name, location or ID"""
         search_term = self.dept_search_entry.get()
         
-        # Clear existing data
-        for item in self.dept_tree.get_children():
-            self.dept_tree.delete(item)
-            
-        # Search by name or ID
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        if search_term.isdigit():
-            cursor.execute("SELECT * FROM Department WHERE dept_id=? OR dept_name LIKE ?", 
-                          (search_term, f"%{search_term}%"))
-        else:
-            cursor.execute("SELECT * FROM Department WHERE dept_name LIKE ?", (f"%{search_term}%",))
-            
-        departments = cursor.fetchall()
-        conn.close()
-        
-        # Insert data
-        for dept in departments:
-            self.dept_tree.insert("", tk.END, values=dept)
+        # Ranked prefix search on the full-text index
+        source = self.data_access.departments_source(search_term, self.dept_tree.sort)
+        self.executor.load_tree(self.dept_tree, source, key_column=0)
             
     def create_section_tab(self):
         """Create the section management tab"""
@@ -1058,9 +1073,12 @@ class AdminDashboard:
         create_label(form_frame, "Time Slot:", 2, 0)
         self.section_time_entry = create_entry(form_frame, 30, 2, 1, pady=5)
         
+        create_label(form_frame, "Capacity:", 3, 0)
+        self.section_capacity_entry = create_entry(form_frame, 30, 3, 1, pady=5)
+        
         # Buttons
         button_frame = ttk.Frame(form_frame)
-        button_frame.grid(row=3, column=0, columnspan=2, pady=10)
+        button_frame.grid(row=4, column=0, columnspan=2, pady=10)
         
         create_button(button_frame, "Add Section", self.add_section, "left")
         create_button(button_frame, "Update Section", self.update_section, "left")
@@ -1068,7 +1086,7 @@ class AdminDashboard:
         
         # Search
         search_frame = ttk.Frame(form_frame)
-        search_frame.grid(row=4, column=0, columnspan=2, pady=10)
+        search_frame.grid(row=5, column=0, columnspan=2, pady=10)
         
         tk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
         self.section_search_entry = ttk.Entry(search_frame, width=20)
@@ -1076,83 +1094,86 @@ class AdminDashboard:
         search_button = ttk.Button(search_frame, text="Search", command=self.search_sections)
         search_button.pack(side=tk.LEFT, padx=5)
         
+        # Bulk CSV import and export, plus the timetable clash report
+        bulk_frame = self.create_bulk_buttons(form_frame, 6, "sections", self.load_sections)
+        create_button(bulk_frame, "Export Clashes", lambda: self.export_entity("clashes"), "left")
+        
+        # Rooms and automatic room allocation
+        room_frame = ttk.Frame(form_frame)
+        room_frame.grid(row=7, column=0, columnspan=2, pady=10)
+        
+        create_button(room_frame, "Import Rooms", lambda: self.import_entity("rooms", self.load_sections), "left")
+        create_button(room_frame, "Export Rooms", lambda: self.export_entity("rooms"), "left")
+        create_button(room_frame, "Allocate Rooms", self.allocate_rooms, "left")
+        
         # Right frame for treeview
         tree_frame = create_tree_frame(self.section_tab, "Section Records")
         
         # Create treeview
-        columns = ("ID", "Course", "Room", "Time Slot")
-        headings = ("ID", "Course", "Room Number", "Time Slot")
-        widths = (50, 200, 120, 120)
+        columns = ("ID", "Course", "Room", "Time Slot", "Capacity", "Enrolled")
+        headings = ("ID", "Course", "Room Number", "Time Slot", "Capacity", "Enrolled")
+        widths = (50, 200, 120, 120, 70, 70)
         self.section_tree = create_treeview(tree_frame, columns, headings, widths)
+        make_sortable(self.section_tree, self.data_access.SECTION_SORTS, self.search_sections)
         self.section_tree.bind("<ButtonRelease-1>", self.select_section)
         self.load_sections()
         
     def load_courses_to_section_combobox(self):
         """Load courses to section combobox"""
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT course_id, course_name FROM Course")
-        courses = cursor.fetchall()
-        conn.close()
+        self.load_choices("section_course_combobox", "Course", self.fill_section_courses_combobox)
         
+    def fill_section_courses_combobox(self, courses):
+        """Fill the section course combobox with fetched courses"""
         # Create a list of course names for the combobox
         course_names = [course[1] for course in courses]
         self.section_course_combobox['values'] = course_names
         
-        # Create a mapping for course_id lookup
-        self.section_course_id_map = {course[1]: course[0] for course in courses}
+        # Name to ID mapping, built once per change by the choice cache
+        self.section_course_id_map = courses.ids
         
     def load_sections(self):
         """Load sections from database to treeview"""
-        # Clear existing data
-        for item in self.section_tree.get_children():
-            self.section_tree.delete(item)
-            
-        # Fetch data with course names
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT s.section_id, c.course_name, s.room_no, s.time_slot 
-            FROM Section s 
-            LEFT JOIN Course c ON s.course_id = c.course_id
-        """)
-        sections = cursor.fetchall()
-        conn.close()
-        
-        # Insert data
-        for section in sections:
-            self.section_tree.insert("", tk.END, values=section)
+        # Fetch data with course names in the background
+        source = self.data_access.sections_source(None, self.section_tree.sort)
+        self.executor.load_tree(self.section_tree, source, key_column=0)
             
     def add_section(self):
         """Add a new section to database"""
         course_name = self.section_course_combobox.get()
         room_no = self.section_room_entry.get()
         time_slot = self.section_time_entry.get()
+        capacity = self.section_capacity_entry.get()
         
         if not course_name:
             messagebox.showerror("Error", "Course is required")
             return
+        if capacity and not capacity.isdigit():
+            messagebox.showerror("Error", "Capacity must be a whole number")
+            return
+        try:
+            timetable.parse_time_slot(time_slot)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
             
         try:
             # Get course ID
             course_id = self.section_course_id_map.get(course_name)
             
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
+            if not self.check_room_free(room_no, time_slot):
+                return
             
-            cursor.execute("INSERT INTO Section (course_id, room_no, time_slot) VALUES (?, ?, ?)", 
-                          (course_id, room_no, time_slot))
-            conn.commit()
-            conn.close()
+            # An empty capacity uses the default
+            section_id = self.data_access.add_section(course_id, room_no, time_slot,
+                                                      int(capacity) if capacity else None)
             
-            self.load_sections()
+            self.show_added_row(self.section_tree, self.data_access.section_row(section_id), self.load_sections)
             
             # Clear form
             self.section_course_combobox.set("")
             self.section_room_entry.delete(0, tk.END)
             self.section_time_entry.delete(0, tk.END)
+            self.section_capacity_entry.delete(0, tk.END)
             
             messagebox.showinfo("Success", "Section added successfully")
         except Exception as e:
@@ -1172,6 +1193,9 @@ class AdminDashboard:
             
             self.section_time_entry.delete(0, tk.END)
             self.section_time_entry.insert(0, values[3])
+            
+            self.section_capacity_entry.delete(0, tk.END)
+            self.section_capacity_entry.insert(0, values[4])
         except IndexError:
             pass  # No item selected
             
@@ -1184,23 +1208,31 @@ class AdminDashboard:
             course_name = self.section_course_combobox.get()
             room_no = self.section_room_entry.get()
             time_slot = self.section_time_entry.get()
+            capacity = self.section_capacity_entry.get()
             
             if not course_name:
                 messagebox.showerror("Error", "Course is required")
                 return
+            if capacity and not capacity.isdigit():
+                messagebox.showerror("Error", "Capacity must be a whole number")
+                return
+            try:
+                timetable.parse_time_slot(time_slot)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
                 
             # Get course ID
             course_id = self.section_course_id_map.get(course_name)
                 
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            
-            cursor.execute("UPDATE Section SET course_id=?, room_no=?, time_slot=? WHERE section_id=?", 
-                          (course_id, room_no, time_slot, section_id))
-            conn.commit()
-            conn.close()
+            if not self.check_room_free(room_no, time_slot, section_id):
+                return
+                
+            # An empty capacity leaves it unchanged
+            self.data_access.update_section(section_id, course_id, room_no, time_slot,
+                                            int(capacity) if capacity else None)
             
-            self.load_sections()
+            self.show_updated_row(self.section_tree, section_id, self.data_access.section_row(section_id), self.load_sections)
             
             messagebox.showinfo("Success", "Section updated successfully")
         except IndexError:
@@ -1208,6 +1240,28 @@ class AdminDashboard:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to update section: {str(e)}")
             
+    def check_room_free(self, room_no, time_slot, section_id=None):
+        """Show an error and return False if another section uses the room at that time"""
+        conflicts = self.data_access.room_conflicts(room_no, time_slot, section_id)
+        if conflicts:
+            other_id, course_name, other_slot = conflicts[0]
+            messagebox.showerror("Error", f"Room {room_no} is already used at that time by section "
+                                          f"{other_id} ({course_name}, {other_slot})")
+            return False
+        return True
+        
+    def allocate_rooms(self):
+        """Assign rooms to every section in the background and show the outcome"""
+        if not messagebox.askyesno("Confirm", "Reassign the rooms of every section?"):
+            return
+            
+        def show_report(report):
+            self.load_sections()
+            messagebox.showinfo("Allocate Rooms", report.summary())
+            
+        self.executor.submit("allocate_rooms", self.room_allocation.allocate_rooms, on_success=show_report,
+                             on_error=lambda e: messagebox.showerror("Error", f"Failed to allocate rooms: {e}"))
+            
     def delete_section(self):
         """Delete selected section"""
         try:
@@ -1217,19 +1271,15 @@ class AdminDashboard:
             # Confirm deletion
             result = messagebox.askyesno("Confirm", "Are you sure you want to delete this section?")
             if result:
-                conn = sqlite3.connect(DATABASE_NAME)
-                cursor = conn.cursor()
-                
-                cursor.execute("DELETE FROM Section WHERE section_id=?", (section_id,))
-                conn.commit()
-                conn.close()
+                self.data_access.delete_section(section_id)
                 
-                self.load_sections()
+                self.show_deleted_row(self.section_tree, section_id, self.load_sections)
                 
                 # Clear form
                 self.section_course_combobox.set("")
                 self.section_room_entry.delete(0, tk.END)
                 self.section_time_entry.delete(0, tk.END)
+                self.section_capacity_entry.delete(0, tk.END)
                 
                 messagebox.showinfo("Success", "Section deleted successfully")
         except IndexError:
@@ -1238,35 +1288,9 @@ class AdminDashboard:
             messagebox.showerror("Error", f"Failed to delete section: {str(e)}")
             
     def search_sections(self):
-        """Search sections by course name or ID"""
+        """Search sections by course name, room number or ID"""
         search_term = self.section_search_entry.get()
         
-        # Clear existing data
-        for item in self.section_tree.get_children():
-            self.section_tree.delete(item)
-            
-        # Search by course name or ID
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        if search_term.isdigit():
-            cursor.execute("""
-                SELECT s.section_id, c.course_name, s.room_no, s.time_slot 
-                FROM Section s 
-                LEFT JOIN Course c ON s.course_id = c.course_id
-                WHERE s.section_id=? OR c.course_name LIKE ?
-            """, (search_term, f"%{search_term}%"))
-        else:
-            cursor.execute("""
-                SELECT s.section_id, c.course_name, s.room_no, s.time_slot 
-                FROM Section s 
-                LEFT JOIN Course c ON s.course_id = c.course_id
-                WHERE c.course_name LIKE ?
-            """, (f"%{search_term}%",))
-            
-        sections = cursor.fetchall()
-        conn.close()
-        
-        # Insert data
-        for section in sections:
-            self.section_tree.insert("", tk.END, values=section)
\ No newline at end of file
+        # Ranked prefix search on the full-text index
+        source = self.data_access.sections_source(search_term, self.section_tree.sort)
+        self.executor.load_tree(self.section_tree, source, key_column=0)
\ No newline at end of file
@@ -0,0 +1,317 @@
+"""Headless benchmark for the University Management System
+
+Generates a deterministic synthetic university and times every query the
+dashboards and authenticate_user run against it:
+
+    python benchmark.py --students 100000
+    python benchmark.py --students 1000 --students 100000 --json results.json
+
+Datasets are cached in --data-dir by size and reused on later runs.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import data_access
+import database
+import repository
+import room_allocation
+import timetable
+from auth import authenticate_user
+from config import DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD
+
+FIRST_NAMES = ["Aarav", "Aditi", "Alice", "Bob", "Carlos", "Diya", "Emma", "Farhan", "Grace", "Hiro",
+               "Isha", "James", "Kavya", "Liam", "Maya", "Noah", "Olivia", "Priya", "Rohan", "Sara"]
+LAST_NAMES = ["Patil", "Mahajan", "Shah", "Smith", "Garcia", "Kim", "Iyer", "Brown", "Lee", "Nair",
+              "Jones", "Khan", "Mehta", "Wilson", "Rao", "Singh"]
+COURSE_WORDS = ["Data", "Systems", "Networks", "Algorithms", "Machine", "Learning", "Signals", "Circuits",
+                "Databases", "Compilers", "Graphics", "Security", "Statistics", "Calculus", "Physics"]
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+
+def scale_for(students):
+    """Return entity counts proportional to the number of students"""
+    courses = max(10, students // 50)
+    return {
+        "students": students,
+        "departments": max(3, min(40, students // 2000)),
+        "professors": max(5, students // 40),
+        "courses": courses,
+        "sections": courses * 2,
+        "rooms": max(5, courses // 5),
+        "enrollments_per_student": 5,
+    }
+
+def generate(path, students, seed=1709):
+    """Create a synthetic university database at path"""
+    rng = random.Random(seed)
+    scale = scale_for(students)
+    database.use_database(path)
+    database.create_database()
+    
+    def name():
+        return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        
+    with database.transaction() as cursor:
+        cursor.executemany("INSERT INTO Department (dept_name, location) VALUES (?, ?)",
+                           ((f"Department {i}", f"Block {i % 8}") for i in range(1, scale["departments"] + 1)))
+        cursor.executemany(
+            "INSERT INTO Professor (name, email, dept_id, username, password) VALUES (?, ?, ?, ?, ?)",
+            ((name(), f"prof{i}@uni.edu", rng.randint(1, scale["departments"]), f"prof{i}", f"pw{i}")
+             for i in range(1, scale["professors"] + 1)))
+        cursor.executemany(
+            "INSERT INTO Course (course_name, credits, semester, dept_id, professor_id) VALUES (?, ?, ?, ?, ?)",
+            ((f"{rng.choice(COURSE_WORDS)} {rng.choice(COURSE_WORDS)} {i}", rng.choice([2, 3, 4]),
+              str(rng.randint(1, 8)), rng.randint(1, scale["departments"]), rng.randint(1, scale["professors"]))
+             for i in range(1, scale["courses"] + 1)))
+        # Room for twice the average enrollment, so random assignment never fills a section
+        capacity = 2 * students * scale["enrollments_per_student"] // scale["sections"] + 10
+        rooms = [f"R{100 + i}" for i in range(scale["rooms"])]
+        cursor.executemany("INSERT INTO Room (room_no, capacity) VALUES (?, ?)",
+                           ((room_no, rng.choice([capacity, capacity + 40, 2 * capacity])) for room_no in rooms))
+        
+        def time_slot():
+            start = rng.randint(8, 17)
+            return f"{rng.choice(DAYS)}/{rng.choice(DAYS)} {start}:00-{start + rng.choice([1, 2])}:00"
+        cursor.executemany(
+            "INSERT INTO Section (course_id, room_no, time_slot, capacity) VALUES (?, ?, ?, ?)",
+            ((i % scale["courses"] + 1, rng.choice(rooms), time_slot(), capacity)
+             for i in range(scale["sections"])))
+        timetable.schedule_sections(cursor, cursor.execute("SELECT section_id, time_slot FROM Section").fetchall())
+        cursor.executemany(
+            "INSERT INTO Student (name, email, dob, username, password) VALUES (?, ?, ?, ?, ?)",
+            ((name(), f"student{i}@uni.edu", f"{rng.randint(1995, 2007)}-{rng.randint(1, 12):02d}-"
+              f"{rng.randint(1, 28):02d}", f"student{i}", f"pw{i}")
+             for i in range(1, students + 1)))
+             
+        def enrollments():
+            for student_id in range(1, students + 1):
+                for section_id in rng.sample(range(1, scale["sections"] + 1), scale["enrollments_per_student"]):
+                    yield student_id, section_id, rng.choice(["A", "B", "C", "D", "N/A"])
+        cursor.executemany("INSERT INTO Enrollment (student_id, section_id, grade) VALUES (?, ?, ?)",
+                           enrollments())
+    # Refresh planner statistics after bulk generation
+    database.get_connection().execute("ANALYZE")
+    return scale
+
+def window(source, offset=0, limit=200):
+    """Count a row source and fetch one window, as a VirtualTreeview does"""
+    source.count()
+    return source.fetch(offset, limit)
+
+def cached(function):
+    """Run function with data_access.QUERY_CACHE on, as the dashboards do"""
+    def run():
+        data_access.QUERY_CACHE.enabled = True
+        try:
+            return function()
+        finally:
+            data_access.QUERY_CACHE.enabled = False
+    return run
+
+def benchmark_cases(scale, rng):
+    """Return (name, function) pairs covering every dashboard and auth query"""
+    students = scale["students"]
+    middle = students // 2
+    
+    def student():
+        return rng.randint(1, students)
+        
+    def professor():
+        return rng.randint(1, scale["professors"])
+        
+    # Most professors teach nothing at small scales; this one has students
+    teacher = data_access.fetch_one("SELECT professor_id FROM Course WHERE course_id = 1")[0]
+        
+    # A window near the end of the students sorted by name, read by OFFSET and by
+    # seeking on from the window before it, as scrolling a sorted tree does
+    by_name = (1, False)
+    deep = max(200, students - 400)
+    seeking = data_access.students_source(None, by_name)
+    seeking.fetch(deep - 200, 200)
+    
+    return [
+        ("auth.student", lambda: [authenticate_user(f"student{middle}", f"pw{middle}", "Student")]),
+        ("auth.professor", lambda: [authenticate_user("prof1", "pw1", "Professor")]),
+        ("auth.admin", lambda: [authenticate_user(DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD, "Admin")]),
+        ("admin.students", lambda: window(data_access.students_source())),
+        ("admin.students.deep_window", lambda: window(data_access.students_source(), offset=middle)),
+        ("admin.students.search_name", lambda: window(data_access.students_source(rng.choice(FIRST_NAMES)))),
+        ("admin.students.search_prefix", lambda: window(data_access.students_source("ma"))),
+        ("admin.students.search_id", lambda: window(data_access.students_source(str(student())))),
+        ("admin.students.sort_name", lambda: window(data_access.students_source(None, by_name))),
+        ("admin.students.sort_name.deep_offset", lambda: data_access.students_source(None, by_name).fetch(deep, 200)),
+        ("admin.students.sort_name.deep_seek", lambda: seeking.fetch(deep, 200)),
+        ("admin.professors", lambda: window(data_access.professors_source())),
+        ("admin.professors.search", lambda: window(data_access.professors_source(rng.choice(LAST_NAMES)))),
+        ("admin.courses", lambda: window(data_access.courses_source())),
+        ("admin.courses.search", lambda: window(data_access.courses_source(rng.choice(COURSE_WORDS)))),
+        ("admin.departments", lambda: window(data_access.departments_source())),
+        ("admin.departments.search", lambda: window(data_access.departments_source("block"))),
+        ("admin.sections", lambda: window(data_access.sections_source())),
+        ("admin.sections.search", lambda: window(data_access.sections_source("R1"))),
+        ("admin.department_choices", data_access.department_choices),
+        ("admin.professor_choices", data_access.professor_choices),
+        ("admin.course_choices", data_access.course_choices),
+        ("student.available_courses", lambda: data_access.available_courses(student())),
+        ("student.course_catalog", lambda: window(data_access.course_catalog_source())),
+        ("student.my_courses", lambda: data_access.student_courses(student())),
+        ("student.summary", lambda: [data_access.student_summary(student())]),
+        ("admin.gpa_rankings", lambda: data_access.gpa_rankings()),
+        ("student.clash_check", lambda: timetable.clashing_sections(database.get_connection().cursor(), student(),
+                                                                    rng.randint(1, scale["sections"]))),
+        ("professor.my_courses", lambda: data_access.professor_courses(professor())),
+        ("professor.my_students", lambda: window(data_access.professor_students_source(professor()))),
+        ("report.course_enrollments", lambda: list(repository.course_enrollments(rng.randint(1, scale["courses"])))),
+        # The same user's view again with nothing committed in between
+        ("student.my_courses.cached", cached(lambda: data_access.student_courses(middle))),
+        ("professor.my_students.cached", cached(lambda: window(data_access.professor_students_source(teacher)))),
+    ]
+
+def write_cases(scale, rng):
+    """Return (name, function) pairs timing the dashboard writes"""
+    counter = iter(range(10 ** 9))
+    
+    def add_update_delete_student():
+        n = next(counter)
+        student_id = data_access.add_student(f"Bench {n}", f"bench{n}@uni.edu", "2000-01-01",
+                                             f"bench{n}_{rng.random()}", "pw")
+        data_access.update_student(student_id, f"Bench {n} Updated", None, None, f"benchu{n}_{rng.random()}")
+        data_access.delete_student(student_id)
+        return [student_id]
+        
+    def enroll():
+        student_id = data_access.add_student("Enroll Bench", None, None, f"enroll{next(counter)}_{rng.random()}", "pw")
+        return [data_access.enroll_student(student_id, rng.randint(1, scale["courses"]))]
+        
+    def save_grades():
+        # A professor's whole grade sheet in one save
+        professor_id = rng.randint(1, scale["professors"])
+        choices = data_access.grade_choices()
+        grades = [(row[0], rng.choice(choices)) for row in data_access.professor_students(professor_id)]
+        return [data_access.save_grades(professor_id, grades)]
+        
+    return [
+        ("admin.student_add_update_delete", add_update_delete_student),
+        ("student.enroll", enroll),
+        ("professor.save_grades", save_grades),
+        ("admin.allocate_rooms", lambda: list(room_allocation.allocate_rooms(dry_run=True).placed)),
+    ]
+
+def check_available_courses(students, samples=100, seed=7):
+    """Compare available_courses with a direct computation for sampled students
+    
+    Returns the IDs of students whose results differ.
+    """
+    conn = database.get_connection()
+    courses = {row[0] for row in conn.execute("SELECT course_id FROM Course")}
+    full = {row[0] for row in conn.execute(
+        "SELECT course_id FROM Section GROUP BY course_id HAVING MAX(enrolled < capacity) = 0")}
+    rng = random.Random(seed)
+    mismatches = []
+    for student_id in rng.sample(range(1, students + 1), min(samples, students)):
+        enrolled = {row[0] for row in conn.execute("""
+            SELECT s.course_id FROM Enrollment e JOIN Section s ON e.section_id = s.section_id
+            WHERE e.student_id = ?
+        """, (student_id,))}
+        expected = sorted(courses - enrolled - full)
+        if [row[0] for row in data_access.available_courses(student_id)] != expected:
+            mismatches.append(student_id)
+    return mismatches
+
+def percentile(sorted_values, fraction):
+    """Return the value at a fraction of a sorted list (nearest rank)"""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def run_case(function, repeat):
+    """Time a function repeat times; return latency and throughput figures"""
+    function()  # Warm up statement and page caches
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+        rows += len(result)
+    timings.sort()
+    total = sum(timings)
+    return {
+        "p50_ms": percentile(timings, 0.50) * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "rows": rows // repeat,
+        "rows_per_sec": rows / total if total else 0.0,
+    }
+
+def run(students, data_dir, repeat, include_writes, regenerate=False):
+    """Benchmark one dataset size and return {case name: figures}"""
+    path = os.path.join(data_dir, f"bench_{students}.db")
+    if regenerate and os.path.exists(path):
+        database.close_connections()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    if not os.path.exists(path):
+        print(f"Generating {students} students into {path} ...", flush=True)
+        start = time.perf_counter()
+        generate(path, students)
+        print(f"  generated in {time.perf_counter() - start:.1f}s", flush=True)
+    database.use_database(path)
+    database.create_database()  # Apply any migrations newer than the cached file
+    # Time the queries themselves; the .cached cases turn the cache on
+    data_access.QUERY_CACHE.enabled = False
+    
+    scale = scale_for(students)
+    rng = random.Random(42)
+    cases = benchmark_cases(scale, rng)
+    if include_writes:
+        cases += write_cases(scale, rng)
+        
+    results = {}
+    print(f"\n{students} students")
+    print(f"{'query':40} {'p50 ms':>9} {'p95 ms':>9} {'rows':>7} {'rows/s':>12}")
+    for name, function in cases:
+        figures = run_case(function, repeat)
+        results[name] = figures
+        print(f"{name:40} {figures['p50_ms']:9.2f} {figures['p95_ms']:9.2f} "
+              f"{figures['rows']:7d} {figures['rows_per_sec']:12.0f}", flush=True)
+    return results
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark dashboard queries on synthetic data")
+    parser.add_argument("--students", type=int, action="append",
+                        help="dataset size in students; repeat for several sizes (default 1000)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "ums_benchmark"),
+                        help="where generated datasets are cached")
+    parser.add_argument("--regenerate", action="store_true", help="rebuild cached datasets")
+    parser.add_argument("--no-writes", action="store_true", help="skip the write benchmarks")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    parser.add_argument("--check", action="store_true",
+                        help="verify available_courses results and fail if its p95 exceeds --budget-ms")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="p95 budget for --check")
+    args = parser.parse_args(argv)
+    
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = {}
+    failed = False
+    for students in args.students or [1000]:
+        results[str(students)] = run(students, args.data_dir, args.repeat, not args.no_writes, args.regenerate)
+        if args.check:
+            mismatches = check_available_courses(students)
+            p95 = results[str(students)]["student.available_courses"]["p95_ms"]
+            print(f"check: available_courses wrong for {len(mismatches)} sampled students, "
+                  f"p95 {p95:.2f} ms (budget {args.budget_ms:g} ms)")
+            failed = failed or bool(mismatches) or p95 > args.budget_ms
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""Bulk CSV import and export for the University Management System
+
+Usable from the admin dashboard or headless:
+
+    python bulk_io.py import students new_intake.csv
+    python bulk_io.py export courses courses.csv
+    python bulk_io.py import enrollments registrations.csv
+    python bulk_io.py export clashes clashes.csv
+    python bulk_io.py export rankings gpa_rankings.csv
+"""
+
+import argparse
+import csv
+import re
+import sys
+
+import data_access
+import timetable
+from config import BULK_CHUNK_SIZE, SECTION_DEFAULT_CAPACITY
+from database import create_database, get_connection, transaction
+
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+class EntitySpec:
+    """How one admin entity maps between CSV columns and its table"""
+    def __init__(self, table, columns, required, export_sql, unique=None, lookups=None, integers=(),
+                 defaults=None):
+        self.table = table
+        # CSV columns read on import, in INSERT order
+        self.columns = columns
+        self.required = required
+        self.export_sql = export_sql
+        # CSV column that must be unique across the file and the table
+        self.unique = unique
+        # CSV column -> (table column, SQL returning (key, id) pairs)
+        self.lookups = lookups or {}
+        self.integers = integers
+        # CSV column -> value used when the column is empty
+        self.defaults = defaults or {}
+        
+    def insert_sql(self):
+        """Return the INSERT statement used for imported rows"""
+        table_columns = [self.lookups[c][0] if c in self.lookups else c for c in self.columns]
+        placeholders = ", ".join("?" for _ in table_columns)
+        return f"INSERT INTO {self.table} ({', '.join(table_columns)}) VALUES ({placeholders})"
+
+ENTITIES = {
+    "students": EntitySpec(
+        "Student", ["name", "email", "dob", "username", "password"],
+        required=["name", "username", "password"], unique="username",
+        export_sql="SELECT student_id, name, email, dob, username FROM Student ORDER BY student_id"),
+    "professors": EntitySpec(
+        "Professor", ["name", "email", "department", "username", "password"],
+        required=["name", "username", "password"], unique="username",
+        lookups={"department": ("dept_id", "SELECT dept_name, dept_id FROM Department")},
+        export_sql="""
+            SELECT p.professor_id, p.name, p.email, d.dept_name AS department, p.username
+            FROM Professor p LEFT JOIN Department d ON p.dept_id = d.dept_id
+            ORDER BY p.professor_id
+        """),
+    "courses": EntitySpec(
+        "Course", ["course_name", "credits", "semester", "department", "professor_username"],
+        required=["course_name"], integers=["credits"],
+        lookups={"department": ("dept_id", "SELECT dept_name, dept_id FROM Department"),
+                 "professor_username": ("professor_id", "SELECT username, professor_id FROM Professor")},
+        export_sql="""
+            SELECT c.course_id, c.course_name, c.credits, c.semester, d.dept_name AS department,
+                   p.username AS professor_username
+            FROM Course c
+            LEFT JOIN Department d ON c.dept_id = d.dept_id
+            LEFT JOIN Professor p ON c.professor_id = p.professor_id
+            ORDER BY c.course_id
+        """),
+    "departments": EntitySpec(
+        "Department", ["dept_name", "location"], required=["dept_name"],
+        export_sql="SELECT dept_id, dept_name, location FROM Department ORDER BY dept_id"),
+    "sections": EntitySpec(
+        "Section", ["course_id", "room_no", "time_slot", "capacity"], required=["course_id"],
+        integers=["course_id", "capacity"], defaults={"capacity": SECTION_DEFAULT_CAPACITY},
+        lookups={"course_id": ("course_id", "SELECT course_id, course_id FROM Course")},
+        export_sql="""
+            SELECT s.section_id, s.course_id, c.course_name, s.room_no, s.time_slot, s.capacity, s.enrolled
+            FROM Section s LEFT JOIN Course c ON s.course_id = c.course_id
+            ORDER BY s.section_id
+        """),
+    "rooms": EntitySpec(
+        "Room", ["room_no", "capacity"], required=["room_no", "capacity"], unique="room_no",
+        integers=["capacity"],
+        export_sql="SELECT room_id, room_no, capacity FROM Room ORDER BY room_no"),
+    # Imported through data_access.enroll_students rather than a plain INSERT
+    "enrollments": EntitySpec(
+        "Enrollment", ["student_id", "course_id", "section_id"], required=["student_id"],
+        integers=["student_id", "course_id", "section_id"],
+        export_sql="""
+            SELECT e.enrollment_id, e.student_id, s.course_id, e.section_id, e.grade
+            FROM Enrollment e LEFT JOIN Section s ON e.section_id = s.section_id
+            ORDER BY e.enrollment_id
+        """),
+    # Export only: pairs of enrolled sections that overlap in a student's timetable
+    "clashes": EntitySpec(None, [], required=[], export_sql=data_access.CLASH_SELECT),
+    # Export only: class-wide GPA ranking from the materialized StudentSummary
+    "rankings": EntitySpec(None, [], required=[], export_sql="""
+        SELECT RANK() OVER (ORDER BY ss.gpa DESC) AS rank, st.student_id, st.name, ROUND(ss.gpa, 2) AS gpa,
+               ss.earned_credits, ss.attempted_credits
+        FROM StudentSummary ss
+        CROSS JOIN Student st ON st.student_id = ss.student_id
+        WHERE ss.gpa IS NOT NULL
+        ORDER BY ss.gpa DESC, ss.student_id
+    """),
+}
+
+class ImportReport:
+    """Outcome of a bulk import: rows inserted and per-row errors"""
+    def __init__(self, entity):
+        self.entity = entity
+        self.inserted = 0
+        # (CSV line number, message) for every rejected row
+        self.errors = []
+        
+    def summary(self):
+        """Return a short human readable summary"""
+        text = f"Imported {self.inserted} {self.entity}, rejected {len(self.errors)} rows"
+        for line, message in self.errors[:10]:
+            text += f"\nLine {line}: {message}"
+        if len(self.errors) > 10:
+            text += f"\n... and {len(self.errors) - 10} more"
+        return text
+
+def import_csv(entity, path, chunk_size=BULK_CHUNK_SIZE):
+    """Import a CSV file into an entity's table in a single transaction
+    
+    Rows are streamed from the file and validated one by one; valid rows
+    are inserted with executemany in chunks and invalid rows are skipped
+    and recorded in the returned ImportReport.
+    """
+    if entity == "enrollments":
+        return import_enrollments(path)
+    spec = ENTITIES[entity]
+    if spec.table is None:
+        raise ValueError(f"{entity} cannot be imported")
+    report = ImportReport(entity)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in spec.required if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+            
+        with transaction() as cursor:
+            lookups = {column: dict(cursor.execute(sql).fetchall())
+                       for column, (_, sql) in spec.lookups.items()}
+            if spec.table == "Section":
+                last_section = cursor.execute("SELECT COALESCE(MAX(section_id), 0) FROM Section").fetchone()[0]
+            seen = set()
+            if spec.unique:
+                seen = {row[0] for row in cursor.execute(f"SELECT {spec.unique} FROM {spec.table}")}
+                
+            insert_sql = spec.insert_sql()
+            chunk = []
+            # Line 1 is the header
+            for line, record in enumerate(reader, start=2):
+                values, error = validate_row(spec, record, lookups, seen)
+                if error:
+                    report.errors.append((line, error))
+                    continue
+                chunk.append(values)
+                if len(chunk) >= chunk_size:
+                    cursor.executemany(insert_sql, chunk)
+                    report.inserted += len(chunk)
+                    chunk = []
+            if chunk:
+                cursor.executemany(insert_sql, chunk)
+                report.inserted += len(chunk)
+                
+            if spec.table == "Section":
+                # Parse the new sections' time slots into meetings
+                cursor.execute("SELECT section_id, time_slot FROM Section WHERE section_id > ?", (last_section,))
+                timetable.schedule_sections(cursor, cursor.fetchall())
+    if report.inserted:
+        data_access.invalidate_choices(spec.table)
+    return report
+
+def import_enrollments(path):
+    """Enroll every (student_id, course_id or section_id) row of a CSV file in one batch
+    
+    Rows are validated as they are read and the valid ones are passed to
+    data_access.enroll_students, which places them in sections and
+    rejects duplicates and full courses set-wise. Each rejected request
+    is reported against its CSV line.
+    """
+    spec = ENTITIES["enrollments"]
+    report = ImportReport("enrollments")
+    requests = []
+    lines = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames or []
+        if "student_id" not in fieldnames or not {"course_id", "section_id"} & set(fieldnames):
+            raise ValueError("CSV needs a student_id column and a course_id or section_id column")
+        # Line 1 is the header
+        for line, record in enumerate(reader, start=2):
+            values, error = validate_row(spec, record, {}, set())
+            if not error and values[1] is None and values[2] is None:
+                error = "course_id or section_id is required"
+            if error:
+                report.errors.append((line, error))
+                continue
+            requests.append(values)
+            lines.append(line)
+            
+    enrollment = data_access.enroll_students(requests)
+    report.inserted = enrollment.enrolled
+    report.errors.extend((lines[index], outcome) for index, outcome in enrollment.rejected())
+    report.errors.sort()
+    return report
+
+def validate_row(spec, record, lookups, seen):
+    """Return (values, None) for a valid CSV record or (None, message)"""
+    values = []
+    for column in spec.columns:
+        value = (record.get(column) or "").strip()
+        if not value:
+            if column in spec.required:
+                return None, f"{column} is required"
+            values.append(spec.defaults.get(column))
+            continue
+        if column in spec.integers:
+            if not value.lstrip("-").isdigit():
+                return None, f"{column} must be a whole number"
+            value = int(value)
+        if column == "dob" and not DATE_PATTERN.match(value):
+            return None, "dob must be YYYY-MM-DD"
+        if column == "time_slot":
+            try:
+                timetable.parse_time_slot(value)
+            except ValueError as e:
+                return None, str(e)
+        if column in lookups:
+            if value not in lookups[column]:
+                return None, f"unknown {column} '{value}'"
+            value = lookups[column][value]
+        values.append(value)
+        
+    if spec.unique:
+        key = values[spec.columns.index(spec.unique)]
+        if key in seen:
+            return None, f"{spec.unique} '{key}' already exists"
+        seen.add(key)
+    return values, None
+
+def export_csv(entity, path, chunk_size=BULK_CHUNK_SIZE):
+    """Stream an entity's rows to a CSV file and return the number written"""
+    spec = ENTITIES[entity]
+    cursor = get_connection().cursor()
+    cursor.execute(spec.export_sql)
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([column[0] for column in cursor.description])
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.writerows(rows)
+            written += len(rows)
+    return written
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Bulk CSV import and export")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("entity", choices=sorted(ENTITIES))
+    parser.add_argument("path")
+    args = parser.parse_args(argv)
+    
+    create_database()
+    if args.action == "import":
+        report = import_csv(args.entity, args.path)
+        print(report.summary())
+        return 1 if report.errors else 0
+    written = export_csv(args.entity, args.path)
+    print(f"Exported {written} {args.entity} to {args.path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
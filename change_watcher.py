@@ -0,0 +1,130 @@
+"""Change detection for the University Management System dashboards
+
+Dashboards re-read a view after their own writes, but changes made by
+other clients went unseen until the next login. A ChangeWatcher polls
+data_access.table_versions() every CHANGE_POLL_MS in the background.
+Triggers keep a counter per table (see database.migrate_table_versions)
+and the poll is answered from QUERY_CACHE until PRAGMA data_version
+moves, so polling an idle database reads no tables. When counters move,
+only the views reading those tables are refreshed. A view names the
+tables whose writes by this client it already patches in place; counter
+moves on those tables that this client's own commits account for are
+skipped (see database.own_changes()), while its own writes to the other
+tables a view reads still refresh it.
+"""
+
+import tkinter as tk
+
+from config import CHANGE_POLL_MS
+from query_executor import QueryExecutor
+
+def changed_elsewhere(old, new, own_ranges):
+    """Return True if a table counter's move from old to new includes writes not in own_ranges
+    
+    Triggers bump the counter once per written row inside the writer's
+    transaction, so the (first, last) ranges this client committed are
+    exactly its own bumps and any value they leave uncovered is another
+    client's.
+    """
+    if old is None or new is None or new < old:
+        return old != new
+    covered = old
+    for first, last in sorted(own_ranges):
+        if first > covered + 1:
+            break
+        covered = max(covered, last)
+    return covered < new
+
+class Watch:
+    """A view's refresh function and the table versions it last showed"""
+    def __init__(self, tables, refresh, versions, patched):
+        self.tables = tables
+        self.refresh = refresh
+        self.versions = versions
+        # Tables whose writes by this client the view already shows
+        self.patched = set(patched)
+
+class ChangeWatcher:
+    """Call refresh functions when a table their view reads changes
+    
+    A refresh function returning False cannot refresh yet (e.g. an edit
+    is open over the view) and is called again after the next poll.
+    """
+    def __init__(self, root, data_access, interval=CHANGE_POLL_MS):
+        self.root = root
+        # The data_access module or a service_client.RemoteDataAccess
+        self.data_access = data_access
+        self.interval = interval
+        self.watches = []
+        # Latest counters, None until the first poll has answered
+        self.versions = None
+        # Its own executor, so polls never show the dashboard's busy indicator
+        self.executor = QueryExecutor(root, workers=1)
+        self.poll_job = None
+        self.closed = False
+        if interval > 0:
+            self.poll_job = self.root.after_idle(self.poll)
+            
+    def watch(self, tables, refresh, patched=()):
+        """Call refresh() whenever one of tables is changed from now on
+        
+        Writes this client makes to the tables in patched are skipped, as
+        the code making them updates the view itself.
+        """
+        self.watches.append(Watch(tables, refresh, self.versions_of(tables), patched))
+        
+    def versions_of(self, tables):
+        """Return the latest counters of tables, or None before the first poll"""
+        if self.versions is None:
+            return None
+        return [self.versions.get(table) for table in tables]
+        
+    def poll(self):
+        """Read the table counters in the background"""
+        self.poll_job = None
+        self.executor.submit("table_versions", self.data_access.table_versions,
+                             on_success=self.compare, on_error=lambda error: self.schedule())
+        
+    def compare(self, versions):
+        """Refresh the views whose tables changed since they were last shown, other than by their own patches"""
+        previous, self.versions = self.versions, versions
+        self.schedule()
+        own = {}
+        for table, first, last in self.data_access.own_changes():
+            own.setdefault(table, []).append((first, last))
+            
+        if previous is not None:
+            # Dropdown choices are otherwise only dropped after writes by this client
+            for table, version in versions.items():
+                if changed_elsewhere(previous.get(table), version, own.get(table, ())):
+                    self.data_access.invalidate_choices(table)
+                    
+        for watch in self.watches:
+            current = self.versions_of(watch.tables)
+            if watch.versions is None:
+                watch.versions = current
+            elif current != watch.versions:
+                changed = any(changed_elsewhere(old, new, own.get(table, ()) if table in watch.patched else ())
+                              for table, old, new in zip(watch.tables, watch.versions, current))
+                if not changed or watch.refresh() is not False:
+                    watch.versions = current
+                
+    def schedule(self):
+        """Poll again after the interval"""
+        if self.closed:
+            return
+        try:
+            self.poll_job = self.root.after(self.interval, self.poll)
+        except tk.TclError:
+            self.stop()  # The window has been destroyed
+            
+    def stop(self):
+        """Stop polling"""
+        self.closed = True
+        self.executor.shutdown()
+        if self.poll_job is not None:
+            try:
+                self.root.after_cancel(self.poll_job)
+            except tk.TclError:
+                pass
+            self.poll_job = None
\ No newline at end of file
@@ -3,6 +3,43 @@
 # Database configuration
 DATABASE_NAME = "university.db"
 
+# Connection configuration (one long-lived connection per thread)
+DATABASE_CACHED_STATEMENTS = 256
+DATABASE_CACHE_SIZE_KB = 16384
+
+# Concurrency configuration for several clients sharing one database file
+DATABASE_JOURNAL_MODE = "WAL"
+DATABASE_BUSY_TIMEOUT_MS = 5000
+DATABASE_WRITE_RETRIES = 5
+DATABASE_RETRY_BACKOFF = 0.05  # Seconds, doubled after each busy attempt
+
+# SQL instrumentation (see query_stats.py)
+QUERY_STATS_ENABLED = True
+SLOW_QUERY_MS = 100
+SLOW_QUERY_LOG = "slow_queries.log"  # None keeps slow statements in memory only
+SLOW_QUERY_EXPLAIN = True  # Capture EXPLAIN QUERY PLAN for slow statements
+SLOW_QUERY_PARAMS = False  # Log the values bound to slow statements (passwords included); debugging only
+
+# Background query configuration
+QUERY_WORKERS = 4
+QUERY_CACHE_SIZE = 512  # Results kept by the dashboards' read-through query cache; 0 disables it
+QUERY_POLL_MS = 30
+CHANGE_POLL_MS = 2000  # How often open dashboards check for changes by other clients; 0 turns it off
+
+# Rows per executemany/fetchmany batch for bulk CSV import and export
+BULK_CHUNK_SIZE = 5000
+
+# Seats in a section created without an explicit capacity
+SECTION_DEFAULT_CAPACITY = 60
+
+# HTTP/JSON service (see service.py)
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_WORKERS = 8  # Worker threads, each with its own database connection
+# Set to e.g. "http://127.0.0.1:8765" to have the desktop client use the service instead of the file
+SERVICE_URL = None
+SERVICE_TIMEOUT = 30  # Seconds
+
 # UI configuration
 WINDOW_TITLE = "University Management System"
 WINDOW_SIZE = "1000x700"
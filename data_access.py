@@ -0,0 +1,1209 @@
+"""Data access layer for the University Management System
+
+Every query used by the dashboards lives here and runs on the calling
+thread's shared connection from database.get_connection().
+"""
+
+import functools
+import re
+import threading
+from collections import OrderedDict
+
+import database
+import query_stats
+import timetable
+from config import QUERY_CACHE_SIZE, SECTION_DEFAULT_CAPACITY
+from database import get_connection, transaction
+
+class EnrollmentError(Exception):
+    """Raised when an enrollment request cannot be satisfied"""
+
+class GradeError(Exception):
+    """Raised when grades cannot be saved"""
+
+def fetch_all(sql, params=()):
+    """Run a read query on the shared connection and return all rows"""
+    cursor = get_connection().cursor()
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+def fetch_one(sql, params=()):
+    """Run a read query on the shared connection and return the first row"""
+    cursor = get_connection().cursor()
+    cursor.execute(sql, params)
+    return cursor.fetchone()
+
+def execute_write(sql, params=()):
+    """Run a single write statement in its own transaction and return the cursor"""
+    with transaction() as cursor:
+        cursor.execute(sql, params)
+    return cursor
+
+class QueryCache:
+    """Read-through cache of query results keyed by query and parameters
+    
+    Entries are evicted least recently used first beyond size. Every
+    lookup compares database.data_version(), which changes on any commit
+    from this process or another client, with the version the entries
+    were read at and empties the cache if it moved, so results are only
+    re-queried when the database actually changed.
+    """
+    def __init__(self, size=QUERY_CACHE_SIZE):
+        self.size = size
+        self.enabled = size > 0
+        self.entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        
+    def get(self, key, compute):
+        """Return the cached result for key, calling compute() to fill it on a miss"""
+        if not self.enabled:
+            return compute()
+        version = database.data_version()
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            elif key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        result = compute()
+        with self.lock:
+            # A commit while computing makes the result's version unknown
+            if self.version == version:
+                self.entries[key] = result
+                while len(self.entries) > self.size:
+                    self.entries.popitem(last=False)
+        return result
+        
+    def clear(self):
+        """Forget every cached result"""
+        with self.lock:
+            self.entries.clear()
+            self.version = None
+
+QUERY_CACHE = QueryCache()
+
+def cached_query(function):
+    """Serve a query function's results from QUERY_CACHE, keyed by its name and arguments"""
+    @functools.wraps(function)
+    def wrapper(*args):
+        return QUERY_CACHE.get((function.__name__,) + args, lambda: function(*args))
+    return wrapper
+
+# Window edge rows a QuerySource with a seek key remembers the keys of
+SEEK_EDGES = 64
+
+class QuerySource:
+    """Row source for ui_components.VirtualTreeview backed by a SELECT
+    
+    Windows are fetched with LIMIT/OFFSET in order_by order so that
+    consecutive windows line up. With cached, counts and windows are
+    served from QUERY_CACHE until the database changes.
+    
+    With a seek key, a unique order of (SQL expression, row position,
+    value standing for NULL) triples with an index for its first
+    expression, a window next to one already read is fetched by seeking
+    past that window's edge row in the index instead of skipping OFFSET
+    rows, so scrolling costs the same at row 200 and at row 2,000,000.
+    Jumping to an unvisited position still uses OFFSET once. The sql of
+    such a source must not have a WHERE clause of its own.
+    """
+    def __init__(self, sql, params=(), order_by=None, count_sql=None, count_params=(), key_ordered=False,
+                 cached=False, seek_key=None, descending=False):
+        # Statements are recorded under the function that built the source
+        self.name = query_stats.caller_name()
+        self.sql = sql
+        self.params = tuple(params)
+        self.seek_key = seek_key
+        self.descending = descending
+        if seek_key:
+            order_by = ", ".join(self.ordering(descending))
+        self.order_by = order_by
+        # Sort keys of rows at known offsets, least recently used first
+        self.edges = OrderedDict()
+        self.edges_lock = threading.Lock()
+        # Bumped by forget_edges() so windows read before it are not remembered
+        self.edges_generation = 0
+        # Rows are in ascending autoincrement key order, so new rows come last
+        self.key_ordered = key_ordered
+        # Optional cheaper query producing the same row count
+        self.count_sql = count_sql
+        self.count_params = tuple(count_params)
+        self.cached = cached
+        
+    def cache(self, key, compute):
+        """Return compute()'s result, through QUERY_CACHE if this source is cached"""
+        if not self.cached:
+            return compute()
+        return QUERY_CACHE.get((self.name, self.sql, self.order_by, self.params) + key, compute)
+        
+    def ordering(self, descending):
+        """Return the ORDER BY terms of the seek key"""
+        direction = " DESC" if descending else ""
+        return [f"{expression}{direction}" for expression, _, _ in self.seek_key]
+        
+    def ordered_sql(self):
+        """Return the query with its ORDER BY clause"""
+        if self.order_by:
+            return f"{self.sql} ORDER BY {self.order_by}"
+        return self.sql
+        
+    def count(self):
+        """Return the number of rows the query produces"""
+        return self.cache(("count",), self.query_count)
+        
+    def query_count(self):
+        """Count the rows in the database"""
+        # Rows may have moved since the edges were read
+        self.forget_edges()
+        with query_stats.named(self.name):
+            if self.count_sql:
+                return fetch_one(self.count_sql, self.count_params)[0]
+            return fetch_one(f"SELECT COUNT(*) FROM ({self.sql})", self.params)[0]
+        
+    def fetch(self, offset, limit):
+        """Return up to limit rows starting at offset"""
+        generation = self.edges_generation
+        rows = self.cache(("fetch", offset, limit), lambda: self.query_rows(offset, limit))
+        if self.seek_key and rows:
+            self.remember(offset, rows[0], generation)
+            self.remember(offset + len(rows) - 1, rows[-1], generation)
+        return rows
+        
+    def query_rows(self, offset, limit):
+        """Read a window of rows from the database"""
+        with query_stats.named(self.name):
+            if self.seek_key and offset:
+                with self.edges_lock:
+                    before = self.edges.get(offset - 1)
+                    after = self.edges.get(offset + limit)
+                if before is not None:
+                    return self.seek(before, limit, forward=True)
+                if after is not None:
+                    return self.seek(after, limit, forward=False)
+            return fetch_all(f"{self.ordered_sql()} LIMIT ? OFFSET ?", self.params + (limit, offset))
+            
+    def remember(self, offset, row, generation):
+        """Keep the sort key of the row at offset to seek from, unless the edges were forgotten since"""
+        key = tuple(null if row[position] is None else row[position] for _, position, null in self.seek_key)
+        self.keep_edge(offset, key, generation)
+        
+    def keep_edge(self, offset, key, generation):
+        """Keep a sort key at offset, unless the edges were forgotten since generation"""
+        with self.edges_lock:
+            if generation != self.edges_generation:
+                return
+            self.edges[offset] = key
+            self.edges.move_to_end(offset)
+            while len(self.edges) > SEEK_EDGES:
+                self.edges.popitem(last=False)
+                
+    def edge_keys(self):
+        """Return the remembered (offset, sort key) pairs, least recently used first"""
+        with self.edges_lock:
+            return list(self.edges.items())
+            
+    def use_edges(self, edges):
+        """Remember (offset, sort key) pairs read by another source over the same query
+        
+        The service builds a new source for every request, so a client
+        sends back the edges of the windows it read to let the next window
+        be found by seeking.
+        """
+        if not self.seek_key:
+            return
+        generation = self.edges_generation
+        for offset, key in edges:
+            if len(key) != len(self.seek_key):
+                raise ValueError("Edge key does not match the sort order")
+            self.keep_edge(int(offset), tuple(key), generation)
+            
+
+    def forget_edges(self):
+        """Forget the sort keys of window edges, whose offsets go stale when rows are added or removed"""
+        with self.edges_lock:
+            self.edges.clear()
+            self.edges_generation += 1
+                
+    def seek(self, key, limit, forward):
+        """Read the limit rows after (forward) or before the row with key, in order"""
+        expressions = [expression for expression, _, _ in self.seek_key]
+        operator = ">" if forward != self.descending else "<"
+        # The first expression alone lets SQLite seek in its index; the row value breaks ties
+        condition = (f"{expressions[0]} {operator}= ? AND ({', '.join(expressions)}) {operator} "
+                     f"({', '.join('?' * len(key))})")
+        ordering = ", ".join(self.ordering(self.descending if forward else not self.descending))
+        rows = fetch_all(f"{self.sql} WHERE {condition} ORDER BY {ordering} LIMIT ?",
+                         self.params + key[:1] + key + (limit,))
+        return rows if forward else rows[::-1]
+        
+    def all(self):
+        """Return every row"""
+        return self.cache(("all",), self.query_all)
+        
+    def query_all(self):
+        """Read every row from the database"""
+        with query_stats.named(self.name):
+            return fetch_all(self.ordered_sql(), self.params)
+
+def match_expression(search_term):
+    """Turn a search box entry into an FTS5 query matching every word as a prefix"""
+    words = re.findall(r"\w+", search_term)
+    return " AND ".join(f'"{word}"*' for word in words)
+
+def sort_key(sorts, sort):
+    """Return the seek key ordering rows by sort, a (row position, descending) pair from a *_SORTS table
+    
+    Ties are broken by the table's key, sorts[0], so the order is unique.
+    """
+    position, descending = sort
+    expression, null = sorts[position]
+    key = [(expression, position, null)]
+    if position != 0:
+        key.append((sorts[0][0], 0, None))
+    return key, bool(descending)
+
+def search_source(select_sql, key_column, search_index, search_term=None, sorts=None, sort=None):
+    """Return select_sql's rows, or only those matching search_term best first
+    
+    Matches come from the FTS5 table search_index (see
+    database.migrate_search_index) and are joined to select_sql on
+    key_column. An all-digit search term also matches the row with that ID,
+    which is ranked first. With sort, a (row position, descending) pair
+    for a column in sorts, rows are in that column's order instead.
+    
+    Without a search, rows are scrolled by seeking in the index of the
+    sort column, or of the key, instead of by OFFSET (see QuerySource).
+    """
+    seek_key, descending = sort_key(sorts, sort) if sort else (None, False)
+    match = match_expression(search_term or "")
+    if not match:
+        if seek_key is None:
+            seek_key = [(key_column, 0, None)]
+        # New rows come last only in ascending key order
+        key_ordered = seek_key[0][1] == 0 and not descending
+        return QuerySource(select_sql, key_ordered=key_ordered, seek_key=seek_key, descending=descending)
+        
+    matches = f"SELECT rowid AS id, rank AS score FROM {search_index} WHERE {search_index} MATCH ?"
+    if search_term.isdigit():
+        matches = f"""
+            SELECT id, MIN(score) AS score FROM ({matches} UNION ALL SELECT ?, -1e308) GROUP BY id
+        """
+        return QuerySource(f"{select_sql} JOIN ({matches}) m ON m.id = {key_column}",
+                           (match, int(search_term)), order_by="m.score", seek_key=seek_key, descending=descending)
+        
+    # Every index row has a base row, so the index alone gives the count
+    count_sql = f"SELECT COUNT(*) FROM {search_index} WHERE {search_index} MATCH ?"
+    return QuerySource(f"{select_sql} JOIN ({matches}) m ON m.id = {key_column}", (match,),
+                       order_by="m.score", count_sql=count_sql, count_params=(match,), seek_key=seek_key,
+                       descending=descending)
+
+# Helpers whose callers give the statements they run their query names
+query_stats.internal(fetch_all, fetch_one, execute_write, search_source, QuerySource.__init__, sort_key)
+
+# Students
+
+STUDENT_SELECT = "SELECT s.student_id, s.name, s.email, s.dob, s.username FROM Student s"
+
+# Sortable columns of STUDENT_SELECT rows: row position -> (expression, value standing for NULL).
+# Each expression has an index (see database.SORT_INDEXES); the NULL values match its IFNULL.
+STUDENT_SORTS = {
+    0: ("s.student_id", None),
+    1: ("s.name COLLATE NOCASE", None),
+    2: ("IFNULL(s.email, '') COLLATE NOCASE", ""),
+    3: ("IFNULL(s.dob, '')", ""),
+    4: ("IFNULL(s.username, '') COLLATE NOCASE", ""),
+}
+
+def students_source(search_term=None, sort=None):
+    """Return students, optionally searched by name, email, username or ID and sorted by a STUDENT_SORTS column"""
+    return search_source(STUDENT_SELECT, "s.student_id", "StudentSearch", search_term, STUDENT_SORTS, sort)
+
+def list_students():
+    """Return all students for the admin student tree"""
+    return students_source().all()
+
+def search_students(search_term):
+    """Search students by name or ID"""
+    return students_source(search_term).all()
+
+def student_row(student_id):
+    """Return one row of the admin student tree, or None if it no longer exists"""
+    return fetch_one(f"{STUDENT_SELECT} WHERE s.student_id = ?", (student_id,))
+
+def add_student(name, email, dob, username, password):
+    """Insert a student and return the new student_id"""
+    cursor = execute_write("INSERT INTO Student (name, email, dob, username, password) VALUES (?, ?, ?, ?, ?)",
+                           (name, email, dob, username, password))
+    return cursor.lastrowid
+
+def update_student(student_id, name, email, dob, username, password=None):
+    """Update a student, leaving the password unchanged when none is given"""
+    if password:
+        execute_write("UPDATE Student SET name=?, email=?, dob=?, username=?, password=? WHERE student_id=?",
+                      (name, email, dob, username, password, student_id))
+    else:
+        execute_write("UPDATE Student SET name=?, email=?, dob=?, username=? WHERE student_id=?",
+                      (name, email, dob, username, student_id))
+
+def delete_student(student_id):
+    """Delete a student"""
+    execute_write("DELETE FROM Student WHERE student_id=?", (student_id,))
+
+# Professors
+
+PROFESSOR_SELECT = """
+    SELECT p.professor_id, p.name, p.email, d.dept_name, p.username
+    FROM Professor p
+    LEFT JOIN Department d ON p.dept_id = d.dept_id
+"""
+
+# Sortable columns of PROFESSOR_SELECT rows (see STUDENT_SORTS)
+PROFESSOR_SORTS = {
+    0: ("p.professor_id", None),
+    1: ("p.name COLLATE NOCASE", None),
+    2: ("IFNULL(p.email, '') COLLATE NOCASE", ""),
+    4: ("IFNULL(p.username, '') COLLATE NOCASE", ""),
+}
+
+def professors_source(search_term=None, sort=None):
+    """Return professors with department names, optionally searched by name, email, username or ID and sorted"""
+    return search_source(PROFESSOR_SELECT, "p.professor_id", "ProfessorSearch", search_term, PROFESSOR_SORTS, sort)
+
+def list_professors():
+    """Return all professors with their department names"""
+    return professors_source().all()
+
+def search_professors(search_term):
+    """Search professors by name or ID"""
+    return professors_source(search_term).all()
+
+def professor_row(professor_id):
+    """Return one row of the admin professor tree, or None if it no longer exists"""
+    return fetch_one(f"{PROFESSOR_SELECT} WHERE p.professor_id = ?", (professor_id,))
+
+def add_professor(name, email, dept_id, username, password):
+    """Insert a professor and return the new professor_id"""
+    cursor = execute_write("INSERT INTO Professor (name, email, dept_id, username, password) VALUES (?, ?, ?, ?, ?)",
+                           (name, email, dept_id, username, password))
+    invalidate_choices("Professor")
+    return cursor.lastrowid
+
+def update_professor(professor_id, name, email, dept_id, username, password=None):
+    """Update a professor, leaving the password unchanged when none is given"""
+    if password:
+        execute_write("UPDATE Professor SET name=?, email=?, dept_id=?, username=?, password=? WHERE professor_id=?",
+                      (name, email, dept_id, username, password, professor_id))
+    else:
+        execute_write("UPDATE Professor SET name=?, email=?, dept_id=?, username=? WHERE professor_id=?",
+                      (name, email, dept_id, username, professor_id))
+    invalidate_choices("Professor")
+
+def delete_professor(professor_id):
+    """Delete a professor"""
+    execute_write("DELETE FROM Professor WHERE professor_id=?", (professor_id,))
+    invalidate_choices("Professor")
+
+# Courses
+
+COURSE_SELECT = """
+    SELECT c.course_id, c.course_name, c.credits, c.semester, d.dept_name, p.name
+    FROM Course c
+    LEFT JOIN Department d ON c.dept_id = d.dept_id
+    LEFT JOIN Professor p ON c.professor_id = p.professor_id
+"""
+
+# Sortable columns of COURSE_SELECT rows (see STUDENT_SORTS)
+COURSE_SORTS = {
+    0: ("c.course_id", None),
+    1: ("c.course_name COLLATE NOCASE", None),
+    2: ("IFNULL(c.credits, 0)", 0),
+    3: ("IFNULL(c.semester, '') COLLATE NOCASE", ""),
+}
+
+def courses_source(search_term=None, sort=None):
+    """Return courses with department and professor names, optionally searched by name or ID and sorted"""
+    return search_source(COURSE_SELECT, "c.course_id", "CourseSearch", search_term, COURSE_SORTS, sort)
+
+def list_courses():
+    """Return all courses with department and professor names"""
+    return courses_source().all()
+
+def search_courses(search_term):
+    """Search courses by name or ID"""
+    return courses_source(search_term).all()
+
+def course_row(course_id):
+    """Return one row of the admin course tree, or None if it no longer exists"""
+    return fetch_one(f"{COURSE_SELECT} WHERE c.course_id = ?", (course_id,))
+
+def add_course(course_name, credits, semester, dept_id, professor_id):
+    """Insert a course and return the new course_id"""
+    cursor = execute_write("INSERT INTO Course (course_name, credits, semester, dept_id, professor_id) VALUES (?, ?, ?, ?, ?)",
+                           (course_name, credits, semester, dept_id, professor_id))
+    invalidate_choices("Course")
+    return cursor.lastrowid
+
+def update_course(course_id, course_name, credits, semester, dept_id, professor_id):
+    """Update a course"""
+    execute_write("UPDATE Course SET course_name=?, credits=?, semester=?, dept_id=?, professor_id=? WHERE course_id=?",
+                  (course_name, credits, semester, dept_id, professor_id, course_id))
+    invalidate_choices("Course")
+
+def delete_course(course_id):
+    """Delete a course"""
+    execute_write("DELETE FROM Course WHERE course_id=?", (course_id,))
+    invalidate_choices("Course")
+
+# Departments
+
+DEPARTMENT_SELECT = "SELECT d.dept_id, d.dept_name, d.location FROM Department d"
+
+# Sortable columns of DEPARTMENT_SELECT rows (see STUDENT_SORTS)
+DEPARTMENT_SORTS = {
+    0: ("d.dept_id", None),
+    1: ("d.dept_name COLLATE NOCASE", None),
+    2: ("IFNULL(d.location, '') COLLATE NOCASE", ""),
+}
+
+def departments_source(search_term=None, sort=None):
+    """Return departments, optionally searched by name, location or ID and sorted"""
+    return search_source(DEPARTMENT_SELECT, "d.dept_id", "DepartmentSearch", search_term, DEPARTMENT_SORTS, sort)
+
+def list_departments():
+    """Return all departments"""
+    return departments_source().all()
+
+def search_departments(search_term):
+    """Search departments by name or ID"""
+    return departments_source(search_term).all()
+
+def department_row(dept_id):
+    """Return one row of the admin department tree, or None if it no longer exists"""
+    return fetch_one(f"{DEPARTMENT_SELECT} WHERE d.dept_id = ?", (dept_id,))
+
+def add_department(dept_name, location):
+    """Insert a department and return the new dept_id"""
+    cursor = execute_write("INSERT INTO Department (dept_name, location) VALUES (?, ?)", (dept_name, location))
+    invalidate_choices("Department")
+    return cursor.lastrowid
+
+def update_department(dept_id, dept_name, location):
+    """Update a department"""
+    execute_write("UPDATE Department SET dept_name=?, location=? WHERE dept_id=?", (dept_name, location, dept_id))
+    invalidate_choices("Department")
+
+def delete_department(dept_id):
+    """Delete a department"""
+    execute_write("DELETE FROM Department WHERE dept_id=?", (dept_id,))
+    invalidate_choices("Department")
+
+# Sections
+
+SECTION_SELECT = """
+    SELECT s.section_id, c.course_name, s.room_no, s.time_slot, s.capacity, s.enrolled
+    FROM Section s
+    LEFT JOIN Course c ON s.course_id = c.course_id
+"""
+
+# Sortable columns of SECTION_SELECT rows (see STUDENT_SORTS)
+SECTION_SORTS = {
+    0: ("s.section_id", None),
+    2: ("IFNULL(s.room_no, '') COLLATE NOCASE", ""),
+    3: ("IFNULL(s.time_slot, '')", ""),
+    4: ("s.capacity", None),
+    5: ("s.enrolled", None),
+}
+
+def sections_source(search_term=None, sort=None):
+    """Return sections with course names, optionally searched by course name, room or ID and sorted"""
+    return search_source(SECTION_SELECT, "s.section_id", "SectionSearch", search_term, SECTION_SORTS, sort)
+
+def list_sections():
+    """Return all sections with their course names"""
+    return sections_source().all()
+
+def search_sections(search_term):
+    """Search sections by course name or ID"""
+    return sections_source(search_term).all()
+
+def section_row(section_id):
+    """Return one row of the admin section tree, or None if it no longer exists"""
+    return fetch_one(f"{SECTION_SELECT} WHERE s.section_id = ?", (section_id,))
+
+def add_section(course_id, room_no, time_slot, capacity=None):
+    """Insert a section and return the new section_id"""
+    if capacity is None:
+        capacity = SECTION_DEFAULT_CAPACITY
+    with transaction() as cursor:
+        cursor.execute("INSERT INTO Section (course_id, room_no, time_slot, capacity) VALUES (?, ?, ?, ?)",
+                       (course_id, room_no, time_slot, capacity))
+        section_id = cursor.lastrowid
+        timetable.schedule_sections(cursor, [(section_id, time_slot)])
+    return section_id
+
+def update_section(section_id, course_id, room_no, time_slot, capacity=None):
+    """Update a section, leaving the capacity unchanged when none is given
+    
+    The database refuses a capacity below the section's current enrollment.
+    """
+    with transaction() as cursor:
+        if capacity is None:
+            cursor.execute("UPDATE Section SET course_id=?, room_no=?, time_slot=? WHERE section_id=?",
+                           (course_id, room_no, time_slot, section_id))
+        else:
+            cursor.execute("UPDATE Section SET course_id=?, room_no=?, time_slot=?, capacity=? WHERE section_id=?",
+                           (course_id, room_no, time_slot, capacity, section_id))
+        timetable.schedule_sections(cursor, [(section_id, time_slot)])
+
+def delete_section(section_id):
+    """Delete a section"""
+    execute_write("DELETE FROM Section WHERE section_id=?", (section_id,))
+
+def room_conflicts(room_no, time_slot, section_id=None):
+    """Return (section_id, course_name, time_slot) of other sections in room_no at an overlapping time
+    
+    Each meeting of the slot is one lookup on idx_section_room.
+    """
+    if not room_no or room_no.strip() in ("", "TBD"):
+        return []
+    conflicts = []
+    for day, start, end in timetable.parse_time_slot(time_slot):
+        for row in fetch_all("""
+            SELECT DISTINCT s.section_id, c.course_name, s.time_slot
+            FROM Section s
+            JOIN SectionMeeting m ON m.section_id = s.section_id
+            LEFT JOIN Course c ON s.course_id = c.course_id
+            WHERE s.room_no = ? AND s.section_id IS NOT ?
+            AND m.day = ? AND m.start_minute < ? AND m.end_minute > ?
+            ORDER BY s.section_id
+        """, (room_no, section_id, day, end, start)):
+            if row not in conflicts:
+                conflicts.append(row)
+    return conflicts
+
+# Combobox lookups
+
+class Choices(list):
+    """(id, name) pairs for a dropdown, with a name to id lookup built once"""
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.ids = {name: key for key, name in rows}
+
+class ChoiceCache:
+    """Dropdown choices read from one table and kept until that table is written
+    
+    Writes through this module and bulk_io call invalidate_choices() for
+    the table they changed; everything else is served from memory.
+    """
+    def __init__(self, sql):
+        self.sql = sql
+        self.choices = None
+        # Database file the choices were read from (see database.use_database)
+        self.path = None
+        # Bumped by invalidate() so a read racing a write is not cached
+        self.version = 0
+        self.lock = threading.Lock()
+        
+    def cached(self):
+        """Return the cached Choices, or None if the table must be queried"""
+        with self.lock:
+            if self.path == database.database_path:
+                return self.choices
+            return None
+            
+    def get(self):
+        """Return the cached Choices, querying the table only if it changed"""
+        choices = self.cached()
+        if choices is not None:
+            return choices
+        with self.lock:
+            version, path = self.version, database.database_path
+        choices = Choices(fetch_all(self.sql))
+        with self.lock:
+            if self.version == version:
+                self.choices, self.path = choices, path
+        return choices
+        
+    def invalidate(self):
+        """Forget the cached choices"""
+        with self.lock:
+            self.version += 1
+            self.choices = None
+
+query_stats.internal(ChoiceCache.get)
+
+CHOICE_CACHES = {
+    "Department": ChoiceCache("SELECT dept_id, dept_name FROM Department"),
+    "Professor": ChoiceCache("SELECT professor_id, name FROM Professor"),
+    "Course": ChoiceCache("SELECT course_id, course_name FROM Course"),
+}
+
+def invalidate_choices(table):
+    """Drop the cached dropdown choices read from table, if any"""
+    cache = CHOICE_CACHES.get(table)
+    if cache is not None:
+        cache.invalidate()
+
+def department_choices():
+    """Return (dept_id, dept_name) pairs for department dropdowns"""
+    return CHOICE_CACHES["Department"].get()
+
+def professor_choices():
+    """Return (professor_id, name) pairs for professor dropdowns"""
+    return CHOICE_CACHES["Professor"].get()
+
+def course_choices():
+    """Return (course_id, course_name) pairs for course dropdowns"""
+    return CHOICE_CACHES["Course"].get()
+
+# Student dashboard
+
+@cached_query
+def available_courses(student_id):
+    """Return (course_id, course_name) pairs a student can enroll in
+    
+    That is every course the student is not enrolled in that has a free
+    seat, or no section yet. The student's courses are read once through
+    idx_enrollment_student, so the cost follows their own enrollments
+    and the number of courses, not the size of Enrollment.
+    """
+    return fetch_all("""
+        SELECT c.course_id, c.course_name
+        FROM Course c
+        WHERE c.course_id NOT IN (
+            SELECT s.course_id
+            FROM Enrollment e
+            JOIN Section s ON e.section_id = s.section_id
+            WHERE e.student_id = ? AND s.course_id IS NOT NULL
+        )
+        AND (NOT EXISTS (SELECT 1 FROM Section s WHERE s.course_id = c.course_id)
+             OR EXISTS (SELECT 1 FROM Section s WHERE s.course_id = c.course_id AND s.enrolled < s.capacity))
+        ORDER BY c.course_id
+    """, (student_id,))
+
+CATALOG_SELECT = """
+    SELECT c.course_id, c.course_name, c.credits, p.name, d.dept_name,
+           COALESCE((SELECT SUM(s.capacity - s.enrolled) FROM Section s WHERE s.course_id = c.course_id), ?)
+    FROM Course c
+    LEFT JOIN Professor p ON c.professor_id = p.professor_id
+    LEFT JOIN Department d ON c.dept_id = d.dept_id
+"""
+
+def course_catalog_source():
+    """Return every course with professor and department names and seats remaining
+    
+    Seats come from the per-section enrolled counters, so no enrollments
+    are counted. A course without sections gets one of the default
+    capacity on its first enrollment.
+    """
+    return QuerySource(CATALOG_SELECT, (SECTION_DEFAULT_CAPACITY,), order_by="c.course_id", cached=True)
+
+def course_catalog_row(course_id):
+    """Return one row of the course catalog, or None if the course no longer exists"""
+    return fetch_one(f"{CATALOG_SELECT} WHERE c.course_id = ?", (SECTION_DEFAULT_CAPACITY, course_id))
+
+def course_catalog():
+    """Return every course with professor and department names"""
+    return course_catalog_source().all()
+
+def enroll_student(student_id, course_id):
+    """Enroll a student in a section of the course with a free seat, creating one if needed
+    
+    Sections whose meetings clash with the student's timetable are
+    skipped; if every free section clashes the enrollment is refused.
+    """
+    with transaction() as cursor:
+        # Check if already enrolled
+        cursor.execute("""
+            SELECT 1 FROM Enrollment e
+            JOIN Section s ON e.section_id = s.section_id
+            WHERE e.student_id=? AND s.course_id=?
+        """, (student_id, course_id))
+        if cursor.fetchone():
+            raise EnrollmentError("You are already enrolled in this course")
+            
+        # Take the first section with a free seat that fits the student's
+        # timetable; the write lock held by the transaction keeps another
+        # client from taking it in the meantime
+        cursor.execute("""
+            SELECT section_id FROM Section WHERE course_id=? AND enrolled < capacity ORDER BY section_id
+        """, (course_id,))
+        section_id = None
+        clash = None
+        for (candidate,) in cursor.fetchall():
+            clashes = timetable.clashing_sections(cursor, student_id, candidate)
+            if not clashes:
+                section_id = candidate
+                break
+            clash = clash or clashes[0]
+        if section_id is None:
+            if clash is not None:
+                cursor.execute("""
+                    SELECT c.course_name, s.time_slot FROM Section s
+                    LEFT JOIN Course c ON s.course_id = c.course_id WHERE s.section_id=?
+                """, (clash,))
+                course_name, time_slot = cursor.fetchone()
+                raise EnrollmentError(f"This course clashes with {course_name} ({time_slot}) in your timetable")
+            cursor.execute("SELECT 1 FROM Section WHERE course_id=?", (course_id,))
+            if cursor.fetchone():
+                raise EnrollmentError("This course is full")
+                
+            # Create a section for this course if it doesn't exist
+            cursor.execute("INSERT INTO Section (course_id, room_no, time_slot, capacity) VALUES (?, ?, ?, ?)",
+                          (course_id, "TBD", "TBD", SECTION_DEFAULT_CAPACITY))
+            section_id = cursor.lastrowid
+            
+        cursor.execute("INSERT INTO Enrollment (student_id, section_id, grade) VALUES (?, ?, ?)",
+                      (student_id, section_id, "N/A"))
+        return cursor.lastrowid
+
+# Outcomes reported by enroll_students for each request
+ENROLLED = "enrolled"
+UNKNOWN_STUDENT = "unknown student"
+UNKNOWN_COURSE = "unknown course"
+UNKNOWN_SECTION = "unknown section"
+WRONG_COURSE = "section belongs to another course"
+ALREADY_ENROLLED = "already enrolled"
+DUPLICATE_REQUEST = "duplicate request"
+SECTION_FULL = "section is full"
+COURSE_FULL = "course is full"
+TIMETABLE_CLASH = "timetable clash"
+
+class EnrollmentReport:
+    """Per-request outcome of enroll_students, in request order"""
+    def __init__(self, results):
+        # (student_id, course_id, section_id, outcome, enrollment_id) per request
+        self.results = results
+        self.enrolled = sum(1 for result in results if result[3] == ENROLLED)
+        
+    def rejected(self):
+        """Return (index, outcome) for every request that was not enrolled"""
+        return [(index, result[3]) for index, result in enumerate(self.results) if result[3] != ENROLLED]
+        
+    def summary(self):
+        """Return a short human readable summary"""
+        counts = {}
+        for result in self.results:
+            counts[result[3]] = counts.get(result[3], 0) + 1
+        text = f"Enrolled {self.enrolled} of {len(self.results)} requests"
+        for outcome, count in sorted(counts.items()):
+            if outcome != ENROLLED:
+                text += f"\n{outcome}: {count}"
+        return text
+
+def mark_batch_clashes(cursor, pending):
+    """Reject batch requests whose assigned section clashes with the timetable or an earlier request
+    
+    pending is a condition on the requests to check, written against {r}.
+    """
+    cursor.execute(f"""
+        UPDATE enroll_request SET outcome = ?
+        WHERE {pending.format(r="enroll_request")} AND (
+            EXISTS (SELECT 1 FROM SectionMeeting m
+                    JOIN StudentMeeting sm
+                      ON sm.student_id = enroll_request.student_id AND sm.day = m.day
+                     AND sm.start_minute < m.end_minute AND sm.end_minute > m.start_minute
+                    WHERE m.section_id = enroll_request.assigned_section)
+            OR EXISTS (SELECT 1 FROM enroll_request earlier
+                       JOIN SectionMeeting em ON em.section_id = earlier.assigned_section
+                       JOIN SectionMeeting m
+                         ON m.section_id = enroll_request.assigned_section AND m.day = em.day
+                        AND m.start_minute < em.end_minute AND m.end_minute > em.start_minute
+                       WHERE earlier.student_id = enroll_request.student_id
+                       AND earlier.seq < enroll_request.seq AND {pending.format(r="earlier")})
+        )
+    """, (TIMETABLE_CLASH,))
+
+def enroll_students(requests):
+    """Enroll a batch of (student_id, course_id[, section_id]) requests in one transaction
+    
+    Requests naming a section are placed in it; the rest take, in request
+    order, the first section of the course with a free seat that does not
+    clash with the student's timetable, and a course without sections gets
+    a TBD one, as in enroll_student. Unknown students, courses and sections,
+    existing enrollments, repeats within the batch, sections that clash
+    with the student's timetable or with an earlier request of the batch,
+    and requests beyond the remaining seats are rejected. The checks run
+    set-wise over temporary tables and seats are handed out in one pass
+    over the requests, so the cost does not grow with a query per
+    request. Returns an EnrollmentReport.
+    """
+    with transaction() as cursor:
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS enroll_request (
+                seq INTEGER PRIMARY KEY,
+                student_id INTEGER,
+                course_id INTEGER,
+                section_id INTEGER,
+                place INTEGER,
+                assigned_section INTEGER,
+                outcome TEXT,
+                enrollment_id INTEGER
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS temp.idx_enroll_request_student
+            ON enroll_request(student_id, course_id, seq)
+        """)
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS enroll_seat (
+                section_id INTEGER PRIMARY KEY,
+                course_id INTEGER,
+                seats INTEGER
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS temp.idx_enroll_seat_course ON enroll_seat(course_id)")
+        cursor.execute("DELETE FROM enroll_request")
+        cursor.execute("DELETE FROM enroll_seat")
+        cursor.executemany(
+            "INSERT INTO enroll_request (student_id, course_id, section_id) VALUES (?, ?, ?)",
+            ((request[0], request[1], request[2] if len(request) > 2 else None) for request in requests))
+            
+        # Validate students, sections and courses
+        cursor.execute("""
+            UPDATE enroll_request SET outcome = ?
+            WHERE NOT EXISTS (SELECT 1 FROM Student st WHERE st.student_id = enroll_request.student_id)
+        """, (UNKNOWN_STUDENT,))
+        cursor.execute("""
+            UPDATE enroll_request SET outcome = ?
+            WHERE outcome IS NULL AND section_id IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM Section s WHERE s.section_id = enroll_request.section_id)
+        """, (UNKNOWN_SECTION,))
+        cursor.execute("""
+            UPDATE enroll_request SET outcome = ?
+            WHERE outcome IS NULL AND section_id IS NOT NULL AND course_id IS NOT NULL
+            AND course_id IS NOT (SELECT s.course_id FROM Section s WHERE s.section_id = enroll_request.section_id)
+        """, (WRONG_COURSE,))
+        cursor.execute("""
+            UPDATE enroll_request
+            SET course_id = (SELECT s.course_id FROM Section s WHERE s.section_id = enroll_request.section_id)
+            WHERE outcome IS NULL AND section_id IS NOT NULL AND course_id IS NULL
+        """)
+        cursor.execute("""
+            UPDATE enroll_request SET outcome = ?
+            WHERE outcome IS NULL
+            AND NOT EXISTS (SELECT 1 FROM Course c WHERE c.course_id = enroll_request.course_id)
+        """, (UNKNOWN_COURSE,))
+        
+        # Drop existing enrollments, then repeats of an earlier request in the batch
+        cursor.execute("""
+            UPDATE enroll_request SET outcome = ?
+            WHERE outcome IS NULL AND EXISTS (
+                SELECT 1 FROM Enrollment e
+                JOIN Section s ON e.section_id = s.section_id
+                WHERE e.student_id = enroll_request.student_id AND s.course_id = enroll_request.course_id
+            )
+        """, (ALREADY_ENROLLED,))
+        cursor.execute("""
+            UPDATE enroll_request SET outcome = ?
+            WHERE outcome IS NULL AND EXISTS (
+                SELECT 1 FROM enroll_request earlier
+                WHERE earlier.student_id = enroll_request.student_id
+                AND earlier.course_id = enroll_request.course_id
+                AND earlier.seq < enroll_request.seq
+                AND earlier.outcome IS NULL
+            )
+        """, (DUPLICATE_REQUEST,))
+        
+        # Requests naming a section get its free seats in request order
+        cursor.execute("""
+            UPDATE enroll_request SET assigned_section = section_id
+            WHERE outcome IS NULL AND section_id IS NOT NULL
+        """)
+        mark_batch_clashes(cursor, "{r}.outcome IS NULL AND {r}.section_id IS NOT NULL")
+        cursor.execute("""
+            UPDATE enroll_request SET place = ranked.place
+            FROM (SELECT seq, ROW_NUMBER() OVER (PARTITION BY section_id ORDER BY seq) AS place
+                  FROM enroll_request WHERE outcome IS NULL AND section_id IS NOT NULL) AS ranked
+            WHERE enroll_request.seq = ranked.seq
+        """)
+        cursor.execute("""
+            UPDATE enroll_request
+            SET outcome = CASE WHEN place <= (SELECT s.capacity - s.enrolled FROM Section s
+                                              WHERE s.section_id = enroll_request.section_id)
+                          THEN ? ELSE ? END
+            WHERE outcome IS NULL AND section_id IS NOT NULL
+        """, (ENROLLED, SECTION_FULL))
+        # The triggers on Enrollment keep Section.enrolled current for the next step
+        cursor.execute("""
+            INSERT INTO Enrollment (student_id, section_id, grade)
+            SELECT student_id, assigned_section, 'N/A' FROM enroll_request
+            WHERE outcome = ? AND section_id IS NOT NULL ORDER BY seq
+        """, (ENROLLED,))
+        
+        # Create a section for requested courses that don't have one
+        cursor.execute("""
+            INSERT INTO Section (course_id, room_no, time_slot, capacity)
+            SELECT DISTINCT r.course_id, 'TBD', 'TBD', ? FROM enroll_request r
+            WHERE r.outcome IS NULL
+            AND NOT EXISTS (SELECT 1 FROM Section s WHERE s.course_id = r.course_id)
+        """, (SECTION_DEFAULT_CAPACITY,))
+        
+        # The remaining requests take, in request order, the first section of their
+        # course with a free seat that fits the student's timetable, as enroll_student
+        # does. Sections clashing with the enrollments made so far are found set-wise
+        # before any seat is handed out; a clash with a section taken earlier in this
+        # step is checked against the meetings of the sections taken
+        cursor.execute("""
+            INSERT INTO enroll_seat (section_id, course_id, seats)
+            SELECT s.section_id, s.course_id, s.capacity - s.enrolled FROM Section s
+            WHERE s.enrolled < s.capacity
+            AND s.course_id IN (SELECT course_id FROM enroll_request WHERE outcome IS NULL)
+        """)
+        cursor.execute("SELECT section_id, course_id, seats FROM enroll_seat ORDER BY section_id")
+        seats = {}
+        course_sections = {}
+        for section_id, course_id, free in cursor.fetchall():
+            seats[section_id] = free
+            course_sections.setdefault(course_id, []).append(section_id)
+        cursor.execute("""
+            SELECT m.section_id, m.day, m.start_minute, m.end_minute
+            FROM enroll_seat seat JOIN SectionMeeting m ON m.section_id = seat.section_id
+        """)
+        meetings = {}
+        for section_id, day, start, end in cursor.fetchall():
+            meetings.setdefault(section_id, []).append((day, start, end))
+        cursor.execute("""
+            SELECT DISTINCT r.seq, seat.section_id
+            FROM enroll_request r
+            JOIN enroll_seat seat ON seat.course_id = r.course_id
+            JOIN SectionMeeting m ON m.section_id = seat.section_id
+            JOIN StudentMeeting sm
+              ON sm.student_id = r.student_id AND sm.day = m.day
+             AND sm.start_minute < m.end_minute AND sm.end_minute > m.start_minute
+            WHERE r.outcome IS NULL
+        """)
+        clashes = set(cursor.fetchall())
+        
+        cursor.execute("SELECT seq, student_id, course_id FROM enroll_request WHERE outcome IS NULL ORDER BY seq")
+        taken = {}
+        outcomes = []
+        for seq, student_id, course_id in cursor.fetchall():
+            outcome, assigned = COURSE_FULL, None
+            for section_id in course_sections.get(course_id, ()):
+                if not seats[section_id]:
+                    continue
+                if (seq, section_id) in clashes or timetable.meetings_overlap(
+                        meetings.get(section_id, ()), taken.get(student_id, ())):
+                    outcome = TIMETABLE_CLASH
+                    continue
+                outcome, assigned = ENROLLED, section_id
+                seats[section_id] -= 1
+                taken.setdefault(student_id, []).extend(meetings.get(section_id, ()))
+                break
+            outcomes.append((outcome, assigned, seq))
+        cursor.executemany("UPDATE enroll_request SET outcome = ?, assigned_section = ? WHERE seq = ?", outcomes)
+        cursor.execute("""
+            INSERT INTO Enrollment (student_id, section_id, grade)
+            SELECT student_id, assigned_section, 'N/A' FROM enroll_request
+            WHERE outcome = ? AND section_id IS NULL ORDER BY seq
+        """, (ENROLLED,))
+        
+        cursor.execute("""
+            UPDATE enroll_request
+            SET enrollment_id = (SELECT MAX(e.enrollment_id) FROM Enrollment e
+                                 WHERE e.student_id = enroll_request.student_id
+                                 AND e.section_id = enroll_request.assigned_section)
+            WHERE outcome = ?
+        """, (ENROLLED,))
+        cursor.execute("""
+            SELECT student_id, course_id, CASE WHEN outcome = ? THEN assigned_section ELSE section_id END,
+                   outcome, enrollment_id
+            FROM enroll_request ORDER BY seq
+        """, (ENROLLED,))
+        results = cursor.fetchall()
+        cursor.execute("DELETE FROM enroll_request")
+        cursor.execute("DELETE FROM enroll_seat")
+    return EnrollmentReport(results)
+
+CLASH_SELECT = """
+    SELECT pair.student_id, st.name AS student_name,
+           pair.section_id, c1.course_name, s1.time_slot,
+           pair.clashing_section_id, c2.course_name AS clashing_course_name, s2.time_slot AS clashing_time_slot
+    FROM (
+        SELECT DISTINCT a.student_id, MIN(a.section_id, b.section_id) AS section_id,
+               MAX(a.section_id, b.section_id) AS clashing_section_id
+        FROM StudentMeeting a
+        JOIN StudentMeeting b
+          ON b.student_id = a.student_id AND b.day = a.day
+         AND b.start_minute >= a.start_minute AND b.start_minute < a.end_minute
+         AND b.enrollment_id != a.enrollment_id
+         AND (b.start_minute > a.start_minute OR b.enrollment_id > a.enrollment_id)
+    ) pair
+    JOIN Student st ON st.student_id = pair.student_id
+    JOIN Section s1 ON s1.section_id = pair.section_id
+    JOIN Section s2 ON s2.section_id = pair.clashing_section_id
+    LEFT JOIN Course c1 ON s1.course_id = c1.course_id
+    LEFT JOIN Course c2 ON s2.course_id = c2.course_id
+    ORDER BY pair.student_id, pair.section_id, pair.clashing_section_id
+"""
+
+def timetable_clashes():
+    """Return every pair of enrolled sections whose meetings overlap, per student
+    
+    Each meeting is compared only with the same student's meetings that
+    start inside it on that day, found through idx_student_meeting_time.
+    """
+    return fetch_all(CLASH_SELECT)
+
+@cached_query
+def student_courses(student_id):
+    """Return the courses a student is enrolled in with grades"""
+    return fetch_all("""
+        SELECT c.course_id, c.course_name, c.credits, p.name, d.dept_name, e.grade
+        FROM Enrollment e
+        JOIN Section s ON e.section_id = s.section_id
+        JOIN Course c ON s.course_id = c.course_id
+        LEFT JOIN Professor p ON c.professor_id = p.professor_id
+        LEFT JOIN Department d ON c.dept_id = d.dept_id
+        WHERE e.student_id = ?
+    """, (student_id,))
+
+@cached_query
+def student_summary(student_id):
+    """Return (gpa, attempted_credits, earned_credits, rank, ranked_students) for a student
+    
+    The totals are kept current by triggers (see
+    database.migrate_student_summary), so nothing is joined here; the
+    rank is summed from the per-GPA counts in GpaDistribution (see
+    database.migrate_gpa_distribution), a few hundred rows however many
+    students there are. gpa and rank are None until the student has a
+    graded course.
+    """
+    row = fetch_one("SELECT gpa, attempted_credits, earned_credits FROM StudentSummary WHERE student_id = ?",
+                    (student_id,))
+    if row is None:
+        return None
+    gpa, attempted, earned = row
+    rank = None
+    if gpa is not None:
+        rank = fetch_one("SELECT IFNULL(SUM(students), 0) + 1 FROM GpaDistribution WHERE gpa > ?", (gpa,))[0]
+    ranked = fetch_one("SELECT IFNULL(SUM(students), 0) FROM GpaDistribution")[0]
+    return gpa, attempted, earned, rank, ranked
+
+RANKING_SELECT = """
+    SELECT st.student_id, st.name, ROUND(ss.gpa, 2), ss.earned_credits, ss.attempted_credits
+    FROM StudentSummary ss
+    CROSS JOIN Student st ON st.student_id = ss.student_id
+    WHERE ss.gpa IS NOT NULL
+"""
+
+def gpa_rankings_source():
+    """Return graded students best GPA first, read in order from idx_student_summary_gpa
+    
+    CROSS JOIN keeps StudentSummary as the outer loop, so a window is a
+    range of the index rather than a sort of every student.
+    """
+    return QuerySource(RANKING_SELECT, order_by="ss.gpa DESC, ss.student_id",
+                       count_sql="SELECT IFNULL(SUM(students), 0) FROM GpaDistribution")
+
+def gpa_rankings(limit=100):
+    """Return the top students by GPA"""
+    return gpa_rankings_source().fetch(0, limit)
+
+# Professor dashboard
+
+@cached_query
+def professor_courses(professor_id):
+    """Return the courses assigned to a professor"""
+    return fetch_all("""
+        SELECT c.course_id, c.course_name, c.credits, c.semester, d.dept_name
+        FROM Course c
+        LEFT JOIN Department d ON c.dept_id = d.dept_id
+        WHERE c.professor_id = ?
+    """, (professor_id,))
+
+def professor_students_source(professor_id, course_id=None):
+    """Return (enrollment_id, student_id, name, email, course_name, grade) for a professor's students
+    
+    With course_id only the students of that course are returned.
+    """
+    sql = """
+        SELECT e.enrollment_id, st.student_id, st.name, st.email, c.course_name, e.grade
+        FROM Enrollment e
+        JOIN Section sec ON e.section_id = sec.section_id
+        JOIN Course c ON sec.course_id = c.course_id
+        JOIN Student st ON e.student_id = st.student_id
+        WHERE c.professor_id = ?
+    """
+    params = (professor_id,)
+    if course_id is not None:
+        sql += " AND c.course_id = ?"
+        params += (course_id,)
+    return QuerySource(sql, params, order_by="e.enrollment_id", key_ordered=True, cached=True)
+
+def professor_students(professor_id, course_id=None):
+    """Return the students enrolled in a professor's courses"""
+    return professor_students_source(professor_id, course_id).all()
+
+# Grade given to enrollments that have not been graded
+UNGRADED = "N/A"
+
+def grade_choices():
+    """Return the letter grades a professor can enter, best first, then UNGRADED"""
+    rows = fetch_all("SELECT grade FROM GradePoint ORDER BY points DESC, rowid")
+    return [grade for (grade,) in rows] + [UNGRADED]
+
+def normalize_grade(grade, choices):
+    """Return grade spelled as in choices, UNGRADED if blank, or None if it is not a grade"""
+    grade = (grade or "").strip().upper()
+    if not grade:
+        return UNGRADED
+    for choice in choices:
+        if choice.upper() == grade:
+            return choice
+    return None
+
+def save_grades(professor_id, grades):
+    """Write (enrollment_id, grade) pairs in one transaction and return how many were saved
+    
+    Every grade is checked against grade_choices() and every enrollment
+    must belong to one of the professor's courses; otherwise GradeError
+    is raised and nothing is saved. The StudentSummary triggers update
+    each student's GPA as the rows are written.
+    """
+    choices = grade_choices()
+    rows = []
+    for enrollment_id, grade in grades:
+        normalized = normalize_grade(grade, choices)
+        if normalized is None:
+            raise GradeError(f"'{grade}' is not a grade; use one of {', '.join(choices)}")
+        rows.append((normalized, enrollment_id, professor_id))
+    if not rows:
+        return 0
+        
+    with transaction() as cursor:
+        cursor.executemany("""
+            UPDATE Enrollment SET grade = ?
+            WHERE enrollment_id = ? AND EXISTS (
+                SELECT 1 FROM Section s JOIN Course c ON c.course_id = s.course_id
+                WHERE s.section_id = Enrollment.section_id AND c.professor_id = ?
+            )
+        """, rows)
+        # Rolling back keeps a stale or foreign enrollment from saving half a sheet
+        if cursor.rowcount != len(rows):
+            raise GradeError(f"{len(rows) - cursor.rowcount} of the enrollments are no longer in your courses; "
+                             "reload the list and try again")
+    return len(rows)
+
+# Change detection
+
+@cached_query
+def table_versions():
+    """Return {table name: change counter} for database.WATCHED_TABLES
+    
+    Triggers bump a table's counter on every insert, update and delete,
+    whoever makes it. Served from QUERY_CACHE, so polling it reads no
+    table until something is committed.
+    """
+    return dict(fetch_all("SELECT table_name, version FROM TableVersion"))
+
+def own_changes():
+    """Return the (table, first, last) counter ranges this client's own commits made, oldest first"""
+    return database.own_changes()
\ No newline at end of file
@@ -1,12 +1,704 @@
 """Database module for the University Management System"""
 
+import atexit
+import random
 import sqlite3
-from config import DATABASE_NAME
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import DATABASE_NAME, DATABASE_CACHED_STATEMENTS, DATABASE_CACHE_SIZE_KB
+from config import DATABASE_JOURNAL_MODE, DATABASE_BUSY_TIMEOUT_MS
+from config import DATABASE_WRITE_RETRIES, DATABASE_RETRY_BACKOFF
+from config import QUERY_STATS_ENABLED, SECTION_DEFAULT_CAPACITY
+import query_stats
+import timetable
+
+# Path of the database file; use_database() points the application elsewhere
+database_path = DATABASE_NAME
+
+# One long-lived connection per thread, tracked so they can be closed at exit
+_local = threading.local()
+_generation = 0
+_connections = []
+_connections_lock = threading.Lock()
+
+# TableVersion ranges this process's own commits made, newest last (see own_changes())
+OWN_CHANGES_KEPT = 256
+_own_changes = deque(maxlen=OWN_CHANGES_KEPT)
+
+# Connection that only reads PRAGMA data_version (see data_version())
+_version_conn = None
+_version_generation = None
+_version_lock = threading.Lock()
+
+def connect():
+    """Open a new configured connection to the database"""
+    # isolation_level=None leaves transaction control to transaction()
+    conn = sqlite3.connect(database_path, isolation_level=None, check_same_thread=False,
+                           timeout=DATABASE_BUSY_TIMEOUT_MS / 1000,
+                           cached_statements=DATABASE_CACHED_STATEMENTS,
+                           factory=query_stats.InstrumentedConnection if QUERY_STATS_ENABLED else sqlite3.Connection)
+    conn.execute(f"PRAGMA busy_timeout = {DATABASE_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size = -{DATABASE_CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    set_journal_mode(conn)
+    return conn
+
+def set_journal_mode(conn):
+    """Switch the database to the configured journal mode if it isn't already"""
+    current = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    if current.upper() != DATABASE_JOURNAL_MODE.upper():
+        # The journal mode is persistent, so only the first client pays for this
+        retry_busy(lambda: conn.execute(f"PRAGMA journal_mode = {DATABASE_JOURNAL_MODE}"))
+    if DATABASE_JOURNAL_MODE.upper() == "WAL":
+        # NORMAL is durable across application crashes in WAL mode
+        conn.execute("PRAGMA synchronous = NORMAL")
+
+def is_busy_error(error):
+    """Return True if an OperationalError means another client holds a lock"""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+def retry_busy(operation):
+    """Run operation, retrying with exponential backoff while the database is busy"""
+    for attempt in range(DATABASE_WRITE_RETRIES + 1):
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt == DATABASE_WRITE_RETRIES:
+                raise
+            # Jitter keeps queued writers from retrying in lockstep
+            time.sleep(DATABASE_RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+def get_connection():
+    """Return the calling thread's shared database connection"""
+    conn = getattr(_local, "conn", None)
+    # A thread's connection is replaced after close_connections()
+    if conn is None or getattr(_local, "generation", None) != _generation:
+        conn = connect()
+        _local.conn = conn
+        _local.generation = _generation
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+def close_connections():
+    """Close every pooled connection"""
+    global _generation
+    with _connections_lock:
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _connections.clear()
+        _generation += 1
+
+atexit.register(close_connections)
+
+def data_version():
+    """Return a value that changes whenever any connection or process commits to the database
+    
+    PRAGMA data_version only changes for commits made through other
+    connections, so it is read on a connection of its own that never
+    writes. The generation is part of the value because a reopened
+    connection counts from the start again.
+    """
+    global _version_conn, _version_generation
+    with _version_lock:
+        if _version_conn is None or _version_generation != _generation:
+            _version_conn = sqlite3.connect(database_path, isolation_level=None, check_same_thread=False,
+                                            timeout=DATABASE_BUSY_TIMEOUT_MS / 1000)
+            _version_generation = _generation
+            with _connections_lock:
+                _connections.append(_version_conn)
+        return _generation, _version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+def use_database(path):
+    """Switch to another database file, closing connections to the current one"""
+    global database_path
+    close_connections()
+    database_path = path
+
+@contextmanager
+def transaction():
+    """Run a block of writes on the shared connection as one transaction
+    
+    The write lock is taken up front with BEGIN IMMEDIATE, so a busy
+    database is retried before any statement runs and writers queue
+    instead of failing part way through.
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        # Nested use joins the enclosing transaction
+        yield conn.cursor()
+        return
+        
+    retry_busy(lambda: conn.execute("BEGIN IMMEDIATE"))
+    try:
+        # No other client can commit until this one does, so the counters move only by these writes
+        before = read_table_versions(conn)
+        yield conn.cursor()
+        after = read_table_versions(conn) if before else {}
+    except BaseException:
+        conn.rollback()
+        raise
+    retry_busy(conn.commit)
+    record_own_changes(before, after)
+
+def read_table_versions(conn):
+    """Return {table: counter} from TableVersion, or {} before migration 8 has added it"""
+    try:
+        return dict(conn.execute("SELECT table_name, version FROM TableVersion"))
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e):
+            raise
+        return {}
+
+def record_own_changes(before, after):
+    """Remember the counter ranges a committed transaction gave TableVersion"""
+    changes = [(table, before.get(table, 0) + 1, version) for table, version in after.items()
+               if version != before.get(table, 0)]
+    if not changes:
+        return
+    _own_changes.extend(changes)
+    collected = getattr(_local, "changes", None)
+    if collected is not None:
+        collected.extend(changes)
+
+def own_changes():
+    """Return the (table, first, last) TableVersion counter ranges committed by this process, oldest first
+    
+    A ChangeWatcher skips counter moves these cover, so a client does not
+    re-read views for writes it has already shown.
+    """
+    return list(_own_changes)
+
+@contextmanager
+def collect_changes():
+    """Collect the counter ranges the calling thread commits in this block into the yielded list"""
+    previous = getattr(_local, "changes", None)
+    _local.changes = changes = []
+    try:
+        yield changes
+    finally:
+        _local.changes = previous
+
+# BEGIN and COMMIT are recorded under the function that opened the transaction
+query_stats.internal(retry_busy, transaction.__wrapped__, read_table_versions)
 
 def create_database():
     """Create SQLite database and tables if they don't exist"""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
+    with transaction() as cursor:
+        create_tables(cursor)
+    apply_migrations()
+
+def get_schema_version(cursor):
+    """Return the schema version stored in PRAGMA user_version"""
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
+
+def apply_migrations():
+    """Bring an existing database up to the latest schema version in place"""
+    for version, migration in enumerate(MIGRATIONS, start=1):
+        with transaction() as cursor:
+            # Re-check inside the transaction in case another client migrated first
+            if get_schema_version(cursor) >= version:
+                continue
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+
+def migrate_join_indexes(cursor):
+    """Add secondary indexes for the dashboard joins"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_enrollment_student ON Enrollment(student_id, section_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_enrollment_section ON Enrollment(section_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_section_course ON Section(course_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_course_professor ON Course(professor_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_course_dept ON Course(dept_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_professor_dept ON Professor(dept_id)")
+
+# Full-text search indexes: (index table, source table, key column, indexed columns)
+SEARCH_INDEXES = [
+    ("StudentSearch", "Student", "student_id", ("name", "email", "username")),
+    ("ProfessorSearch", "Professor", "professor_id", ("name", "email", "username")),
+    ("CourseSearch", "Course", "course_id", ("course_name",)),
+    ("DepartmentSearch", "Department", "dept_id", ("dept_name", "location")),
+]
+
+def migrate_search_index(cursor):
+    """Add FTS5 search indexes kept in sync with their tables by triggers"""
+    options = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+    for index, table, key, columns in SEARCH_INDEXES:
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5({column_list}, {options})")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {index} (rowid, {column_list}) VALUES (new.{key}, {new_values});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE ON {table} BEGIN
+                DELETE FROM {index} WHERE rowid = old.{key};
+                INSERT INTO {index} (rowid, {column_list}) VALUES (new.{key}, {new_values});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table} BEGIN
+                DELETE FROM {index} WHERE rowid = old.{key};
+            END
+        """)
+        cursor.execute(f"DELETE FROM {index}")
+        cursor.execute(f"INSERT INTO {index} (rowid, {column_list}) SELECT {key}, {column_list} FROM {table}")
+        
+    # Sections are searched by room number and by the name of their course
+    cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS SectionSearch USING fts5(room_no, course_name, {options})")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS SectionSearch_insert AFTER INSERT ON Section BEGIN
+            INSERT INTO SectionSearch (rowid, room_no, course_name)
+            VALUES (new.section_id, new.room_no,
+                    (SELECT course_name FROM Course WHERE course_id = new.course_id));
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS SectionSearch_update AFTER UPDATE ON Section BEGIN
+            DELETE FROM SectionSearch WHERE rowid = old.section_id;
+            INSERT INTO SectionSearch (rowid, room_no, course_name)
+            VALUES (new.section_id, new.room_no,
+                    (SELECT course_name FROM Course WHERE course_id = new.course_id));
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS SectionSearch_delete AFTER DELETE ON Section BEGIN
+            DELETE FROM SectionSearch WHERE rowid = old.section_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS SectionSearch_course_update AFTER UPDATE OF course_name ON Course BEGIN
+            UPDATE SectionSearch SET course_name = new.course_name
+            WHERE rowid IN (SELECT section_id FROM Section WHERE course_id = new.course_id);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS SectionSearch_course_delete AFTER DELETE ON Course BEGIN
+            UPDATE SectionSearch SET course_name = NULL
+            WHERE rowid IN (SELECT section_id FROM Section WHERE course_id = old.course_id);
+        END
+    """)
+    cursor.execute("DELETE FROM SectionSearch")
+    cursor.execute("""
+        INSERT INTO SectionSearch (rowid, room_no, course_name)
+        SELECT s.section_id, s.room_no, c.course_name
+        FROM Section s LEFT JOIN Course c ON s.course_id = c.course_id
+    """)
+
+def migrate_section_capacity(cursor):
+    """Add section capacity and an enrollment counter kept current by triggers"""
+    cursor.execute(f"ALTER TABLE Section ADD COLUMN capacity INTEGER NOT NULL DEFAULT {SECTION_DEFAULT_CAPACITY}")
+    cursor.execute("ALTER TABLE Section ADD COLUMN enrolled INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("""
+        UPDATE Section SET enrolled = (SELECT COUNT(*) FROM Enrollment e WHERE e.section_id = Section.section_id)
+    """)
+    # Existing sections keep every student they already have
+    cursor.execute("UPDATE Section SET capacity = enrolled WHERE enrolled > capacity")
+    
+    # Keep the counter in step with Enrollment
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS enrollment_count_insert AFTER INSERT ON Enrollment BEGIN
+            UPDATE Section SET enrolled = enrolled + 1 WHERE section_id = new.section_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS enrollment_count_delete AFTER DELETE ON Enrollment BEGIN
+            UPDATE Section SET enrolled = enrolled - 1 WHERE section_id = old.section_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS enrollment_count_move AFTER UPDATE OF section_id ON Enrollment
+        WHEN new.section_id IS NOT old.section_id BEGIN
+            UPDATE Section SET enrolled = enrolled - 1 WHERE section_id = old.section_id;
+            UPDATE Section SET enrolled = enrolled + 1 WHERE section_id = new.section_id;
+        END
+    """)
+    
+    # Refuse enrollments beyond capacity from any writer, not only enroll_student
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS enrollment_capacity_insert BEFORE INSERT ON Enrollment
+        WHEN (SELECT enrolled >= capacity FROM Section WHERE section_id = new.section_id) BEGIN
+            SELECT RAISE(ABORT, 'Section is full');
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS enrollment_capacity_move BEFORE UPDATE OF section_id ON Enrollment
+        WHEN new.section_id IS NOT old.section_id
+            AND (SELECT enrolled >= capacity FROM Section WHERE section_id = new.section_id) BEGIN
+            SELECT RAISE(ABORT, 'Section is full');
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS section_capacity_check BEFORE UPDATE OF capacity ON Section
+        WHEN new.capacity < old.enrolled BEGIN
+            SELECT RAISE(ABORT, 'Capacity is below the number of enrolled students');
+        END
+    """)
+
+def migrate_section_search_columns(cursor):
+    """Only re-index a section when its searched columns change, not on every enrollment"""
+    cursor.execute("DROP TRIGGER IF EXISTS SectionSearch_update")
+    cursor.execute("""
+        CREATE TRIGGER SectionSearch_update AFTER UPDATE OF room_no, course_id ON Section BEGIN
+            DELETE FROM SectionSearch WHERE rowid = old.section_id;
+            INSERT INTO SectionSearch (rowid, room_no, course_name)
+            VALUES (new.section_id, new.room_no,
+                    (SELECT course_name FROM Course WHERE course_id = new.course_id));
+        END
+    """)
+
+def migrate_timetable(cursor):
+    """Add parsed section meetings and a per-student meeting index for clash checks"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SectionMeeting (
+            meeting_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            section_id INTEGER,
+            day INTEGER NOT NULL,
+            start_minute INTEGER NOT NULL,
+            end_minute INTEGER NOT NULL,
+            FOREIGN KEY (section_id) REFERENCES Section(section_id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_section_meeting_section ON SectionMeeting(section_id)")
+    
+    # One row per meeting of every enrolled section, maintained by the triggers below
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS StudentMeeting (
+            student_id INTEGER,
+            day INTEGER NOT NULL,
+            start_minute INTEGER NOT NULL,
+            end_minute INTEGER NOT NULL,
+            section_id INTEGER,
+            enrollment_id INTEGER,
+            meeting_id INTEGER
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_student_meeting_time
+        ON StudentMeeting(student_id, day, start_minute, end_minute)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_student_meeting_enrollment ON StudentMeeting(enrollment_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_student_meeting_meeting ON StudentMeeting(meeting_id)")
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS student_meeting_enroll AFTER INSERT ON Enrollment BEGIN
+            INSERT INTO StudentMeeting (student_id, day, start_minute, end_minute, section_id, enrollment_id, meeting_id)
+            SELECT new.student_id, m.day, m.start_minute, m.end_minute, m.section_id, new.enrollment_id, m.meeting_id
+            FROM SectionMeeting m WHERE m.section_id = new.section_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS student_meeting_unenroll AFTER DELETE ON Enrollment BEGIN
+            DELETE FROM StudentMeeting WHERE enrollment_id = old.enrollment_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS student_meeting_move AFTER UPDATE OF student_id, section_id ON Enrollment BEGIN
+            DELETE FROM StudentMeeting WHERE enrollment_id = old.enrollment_id;
+            INSERT INTO StudentMeeting (student_id, day, start_minute, end_minute, section_id, enrollment_id, meeting_id)
+            SELECT new.student_id, m.day, m.start_minute, m.end_minute, m.section_id, new.enrollment_id, m.meeting_id
+            FROM SectionMeeting m WHERE m.section_id = new.section_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS student_meeting_schedule AFTER INSERT ON SectionMeeting BEGIN
+            INSERT INTO StudentMeeting (student_id, day, start_minute, end_minute, section_id, enrollment_id, meeting_id)
+            SELECT e.student_id, new.day, new.start_minute, new.end_minute, new.section_id, e.enrollment_id, new.meeting_id
+            FROM Enrollment e WHERE e.section_id = new.section_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS student_meeting_unschedule AFTER DELETE ON SectionMeeting BEGIN
+            DELETE FROM StudentMeeting WHERE meeting_id = old.meeting_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS section_meeting_delete AFTER DELETE ON Section BEGIN
+            DELETE FROM SectionMeeting WHERE section_id = old.section_id;
+        END
+    """)
+    
+    # Time slots are parsed in Python, so existing sections are scheduled here
+    # and later writes go through timetable.schedule_sections
+    timetable.schedule_sections(cursor, cursor.execute("SELECT section_id, time_slot FROM Section").fetchall())
+
+def migrate_rooms(cursor):
+    """Add rooms with their seating capacity for room allocation"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Room (
+            room_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            room_no TEXT UNIQUE NOT NULL,
+            capacity INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_section_room ON Section(room_no)")
+    
+    # Rooms already in use hold at least the largest section placed in them
+    cursor.execute("""
+        INSERT OR IGNORE INTO Room (room_no, capacity)
+        SELECT room_no, MAX(capacity) FROM Section
+        WHERE room_no IS NOT NULL AND TRIM(room_no) NOT IN ('', 'TBD')
+        GROUP BY room_no
+    """)
+
+# Letter grades and their grade points; grades not listed (e.g. "N/A") are not yet graded
+GRADE_POINTS = [
+    ("A+", 4.0), ("A", 4.0), ("A-", 3.7),
+    ("B+", 3.3), ("B", 3.0), ("B-", 2.7),
+    ("C+", 2.3), ("C", 2.0), ("C-", 1.7),
+    ("D+", 1.3), ("D", 1.0), ("F", 0.0),
+]
+
+# Grade points, attempted and earned credits of the enrollments matched by {where}
+ENROLLMENT_TOTALS = """
+    SELECT ROUND(COALESCE(SUM(g.points * c.credits), 0), 4) AS points,
+           COALESCE(SUM(c.credits), 0) AS attempted,
+           COALESCE(SUM(CASE WHEN g.points > 0 THEN c.credits END), 0) AS earned
+    FROM Enrollment e
+    JOIN Section s ON s.section_id = e.section_id
+    JOIN Course c ON c.course_id = s.course_id
+    JOIN GradePoint g ON g.grade = TRIM(e.grade)
+    WHERE {where}
+"""
+
+# Recompute the totals of every student matched by {where} from scratch
+RECOMPUTE_SUMMARY = f"""
+    UPDATE StudentSummary SET (quality_points, attempted_credits, earned_credits) = (
+        {ENROLLMENT_TOTALS.format(where="e.student_id = StudentSummary.student_id")}
+    )
+    WHERE {{where}}
+"""
+
+def migrate_student_summary(cursor):
+    """Add grade points and a per-student GPA and credit summary kept current by triggers"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS GradePoint (
+            grade TEXT PRIMARY KEY COLLATE NOCASE,
+            points REAL NOT NULL
+        )
+    """)
+    cursor.executemany("INSERT OR IGNORE INTO GradePoint (grade, points) VALUES (?, ?)", GRADE_POINTS)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS StudentSummary (
+            student_id INTEGER PRIMARY KEY,
+            quality_points REAL NOT NULL DEFAULT 0,
+            attempted_credits INTEGER NOT NULL DEFAULT 0,
+            earned_credits INTEGER NOT NULL DEFAULT 0,
+            gpa REAL GENERATED ALWAYS AS (
+                CASE WHEN attempted_credits > 0 THEN quality_points / attempted_credits END
+            ) VIRTUAL,
+            FOREIGN KEY (student_id) REFERENCES Student(student_id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_student_summary_gpa ON StudentSummary(gpa DESC, student_id)")
+    
+    # Every student has a summary row
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS student_summary_add AFTER INSERT ON Student BEGIN
+            INSERT OR IGNORE INTO StudentSummary (student_id) VALUES (new.student_id);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS student_summary_remove AFTER DELETE ON Student BEGIN
+            DELETE FROM StudentSummary WHERE student_id = old.student_id;
+        END
+    """)
+    
+    # An enrollment adds or removes only its own course's contribution
+    add_new = f"""
+        UPDATE StudentSummary SET (quality_points, attempted_credits, earned_credits) = (
+            SELECT ROUND(StudentSummary.quality_points + t.points, 4),
+                   StudentSummary.attempted_credits + t.attempted,
+                   StudentSummary.earned_credits + t.earned
+            FROM ({ENROLLMENT_TOTALS.format(where="e.enrollment_id = new.enrollment_id")}) AS t
+        )
+        WHERE student_id = new.student_id;
+    """
+    remove_old = f"""
+        UPDATE StudentSummary SET (quality_points, attempted_credits, earned_credits) = (
+            SELECT ROUND(StudentSummary.quality_points - t.points, 4),
+                   StudentSummary.attempted_credits - t.attempted,
+                   StudentSummary.earned_credits - t.earned
+            FROM ({ENROLLMENT_TOTALS.format(where="e.enrollment_id = old.enrollment_id")}) AS t
+        )
+        WHERE student_id = old.student_id;
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS student_summary_enroll AFTER INSERT ON Enrollment BEGIN
+            {add_new}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS student_summary_grade BEFORE UPDATE OF grade, section_id, student_id ON Enrollment BEGIN
+            {remove_old}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS student_summary_regrade AFTER UPDATE OF grade, section_id, student_id ON Enrollment BEGIN
+            {add_new}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS student_summary_unenroll BEFORE DELETE ON Enrollment BEGIN
+            {remove_old}
+        END
+    """)
+    
+    # Changes to credits or to which course a section belongs are rarer, so the
+    # students affected are recomputed in full
+    in_course = "student_id IN (SELECT e.student_id FROM Section s JOIN Enrollment e ON e.section_id = s.section_id WHERE s.course_id = {course})"
+    in_section = "student_id IN (SELECT e.student_id FROM Enrollment e WHERE e.section_id = {section})"
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS student_summary_credits AFTER UPDATE OF credits ON Course BEGIN
+            {RECOMPUTE_SUMMARY.format(where=in_course.format(course="new.course_id"))};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS student_summary_course_delete AFTER DELETE ON Course BEGIN
+            {RECOMPUTE_SUMMARY.format(where=in_course.format(course="old.course_id"))};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS student_summary_section_move AFTER UPDATE OF course_id ON Section BEGIN
+            {RECOMPUTE_SUMMARY.format(where=in_section.format(section="new.section_id"))};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS student_summary_section_delete AFTER DELETE ON Section BEGIN
+            {RECOMPUTE_SUMMARY.format(where=in_section.format(section="old.section_id"))};
+        END
+    """)
+    
+    cursor.execute("INSERT OR IGNORE INTO StudentSummary (student_id) SELECT student_id FROM Student")
+    cursor.execute(RECOMPUTE_SUMMARY.format(where="1"))
+
+# Tables whose changes open dashboards watch for (see change_watcher.py)
+WATCHED_TABLES = ["Department", "Professor", "Course", "Student", "Section", "Enrollment", "GradePoint"]
+
+def migrate_table_versions(cursor):
+    """Add a change counter per watched table, bumped by triggers on every write"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS TableVersion (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    cursor.executemany("INSERT OR IGNORE INTO TableVersion (table_name) VALUES (?)",
+                       [(table,) for table in WATCHED_TABLES])
+    for table in WATCHED_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table.lower()}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                    UPDATE TableVersion SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
+
+# Indexes the admin trees are sorted on: (index, table, indexed expression), one per
+# sortable column in data_access's *_SORTS tables. Nullable columns are indexed through
+# IFNULL so that seeking past a row never compares with NULL.
+SORT_INDEXES = [
+    ("idx_student_name_sort", "Student", "name COLLATE NOCASE"),
+    ("idx_student_email_sort", "Student", "IFNULL(email, '') COLLATE NOCASE"),
+    ("idx_student_dob_sort", "Student", "IFNULL(dob, '')"),
+    ("idx_student_username_sort", "Student", "IFNULL(username, '') COLLATE NOCASE"),
+    ("idx_professor_name_sort", "Professor", "name COLLATE NOCASE"),
+    ("idx_professor_email_sort", "Professor", "IFNULL(email, '') COLLATE NOCASE"),
+    ("idx_professor_username_sort", "Professor", "IFNULL(username, '') COLLATE NOCASE"),
+    ("idx_course_name_sort", "Course", "course_name COLLATE NOCASE"),
+    ("idx_course_credits_sort", "Course", "IFNULL(credits, 0)"),
+    ("idx_course_semester_sort", "Course", "IFNULL(semester, '') COLLATE NOCASE"),
+    ("idx_department_name_sort", "Department", "dept_name COLLATE NOCASE"),
+    ("idx_department_location_sort", "Department", "IFNULL(location, '') COLLATE NOCASE"),
+    ("idx_section_room_sort", "Section", "IFNULL(room_no, '') COLLATE NOCASE"),
+    ("idx_section_time_slot_sort", "Section", "IFNULL(time_slot, '')"),
+    ("idx_section_capacity_sort", "Section", "capacity"),
+    ("idx_section_enrolled_sort", "Section", "enrolled"),
+]
+
+def migrate_sort_indexes(cursor):
+    """Add an index per sortable admin tree column so sorted windows are read by seeking"""
+    for index, table, expression in SORT_INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table}({expression})")
+
+def migrate_gpa_distribution(cursor):
+    """Count graded students per GPA so a class rank sums a few hundred rows instead of counting students"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS GpaDistribution (
+            gpa REAL PRIMARY KEY,
+            students INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("DELETE FROM GpaDistribution")
+    cursor.execute("""
+        INSERT INTO GpaDistribution (gpa, students)
+        SELECT gpa, COUNT(*) FROM StudentSummary WHERE gpa IS NOT NULL GROUP BY gpa
+    """)
+    
+    # Move a student between the counts of their old and new GPA; empty counts are dropped
+    add_new = """
+        INSERT INTO GpaDistribution (gpa, students) SELECT new.gpa, 1 WHERE new.gpa IS NOT NULL
+        ON CONFLICT (gpa) DO UPDATE SET students = students + 1;
+    """
+    remove_old = """
+        UPDATE GpaDistribution SET students = students - 1 WHERE gpa = old.gpa;
+        DELETE FROM GpaDistribution WHERE gpa = old.gpa AND students = 0;
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS gpa_distribution_insert AFTER INSERT ON StudentSummary BEGIN
+            {add_new}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS gpa_distribution_update AFTER UPDATE OF quality_points, attempted_credits
+        ON StudentSummary WHEN old.gpa IS NOT new.gpa BEGIN
+            {remove_old}
+            {add_new}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS gpa_distribution_delete AFTER DELETE ON StudentSummary BEGIN
+            {remove_old}
+        END
+    """)
+
+def migrate_afternoon_time_slots(cursor):
+    """Schedule sections left without meetings by slots such as "Mon 12-1", which now parse"""
+    cursor.execute("""
+        SELECT s.section_id, s.time_slot FROM Section s
+        WHERE NOT EXISTS (SELECT 1 FROM SectionMeeting m WHERE m.section_id = s.section_id)
+    """)
+    timetable.schedule_sections(cursor, cursor.fetchall())
+
+# Ordered schema migrations; applying MIGRATIONS[n] moves user_version to n + 1.
+# Append new migrations to the end and never reorder or edit applied ones.
+MIGRATIONS = [
+    migrate_join_indexes,
+    migrate_search_index,
+    migrate_section_capacity,
+    migrate_section_search_columns,
+    migrate_timetable,
+    migrate_rooms,
+    migrate_student_summary,
+    migrate_table_versions,
+    migrate_sort_indexes,
+    migrate_gpa_distribution,
+    migrate_afternoon_time_slots,
+]
+
+def create_tables(cursor):
+    """Create all tables and the default admin account"""
     
     # Create Department table
     cursor.execute("""
@@ -93,10 +785,6 @@ def create_database():
     if not cursor.fetchone():
         cursor.execute("INSERT INTO Admin (username, password) VALUES (?, ?)", 
                       (DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD))
-        conn.commit()
-    
-    conn.commit()
-    conn.close()
 
 # Default admin credentials (imported from config)
 from config import DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD
\ No newline at end of file
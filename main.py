@@ -3,11 +3,13 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
+import time
 from datetime import datetime
 
-from config import WINDOW_TITLE, WINDOW_SIZE, BACKGROUND_COLOR
+from config import WINDOW_TITLE, WINDOW_SIZE, BACKGROUND_COLOR, SERVICE_URL
 from database import create_database
 from auth import authenticate_user
+from service_client import ServiceClient, ServiceError
 from ui_components import create_label, create_entry, create_combobox, create_button
 from ui_components import create_treeview, create_form_frame, create_tree_frame
 
@@ -27,8 +29,11 @@ class UniversityManagementSystem:
         self.current_user = None
         self.current_user_role = None
         
-        # Create database and tables
-        create_database()
+        # Use the HTTP service when one is configured, else open the database file
+        self.service = ServiceClient(SERVICE_URL) if SERVICE_URL else None
+        if self.service is None:
+            # Create database and tables
+            create_database()
         
         # Create login UI
         self.create_login_ui()
@@ -84,21 +89,35 @@ class UniversityManagementSystem:
             messagebox.showerror("Error", "Please enter both username and password")
             return
             
-        user = authenticate_user(username, password, role)
+        started = time.perf_counter()
+        try:
+            if self.service:
+                user = self.service.authenticate_user(username, password, role)
+            else:
+                user = authenticate_user(username, password, role)
+        except ServiceError as e:
+            messagebox.showerror("Error", str(e))
+            return
         if user:
             self.current_user = user
             self.current_user_role = role
             if role == "Student":
-                dashboard = StudentDashboard(self.root, user)
-                dashboard.set_logout_callback(self.create_login_ui)
+                dashboard = StudentDashboard(self.root, user, service=self.service)
+                dashboard.set_logout_callback(self.logout)
             elif role == "Professor":
-                dashboard = ProfessorDashboard(self.root, user)
-                dashboard.set_logout_callback(self.create_login_ui)
+                dashboard = ProfessorDashboard(self.root, user, service=self.service)
+                dashboard.set_logout_callback(self.logout)
             elif role == "Admin":
-                dashboard = AdminDashboard(self.root, user)
-                dashboard.set_logout_callback(self.create_login_ui)
+                dashboard = AdminDashboard(self.root, user, login_started=started, service=self.service)
+                dashboard.set_logout_callback(self.logout)
         else:
             messagebox.showerror("Error", "Invalid username or password")
+            
+    def logout(self):
+        """End the session and return to the login screen"""
+        if self.service:
+            self.service.logout()
+        self.create_login_ui()
 
 if __name__ == "__main__":
     root = tk.Tk()
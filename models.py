@@ -1,7 +1,14 @@
-"""Data models for the University Management System"""
+"""Data models for the University Management System
+
+Models declare __slots__, so an instance holds its fields in a fixed
+array instead of a per-instance dict; large reports can keep millions
+of them in memory. repository.py builds them from query rows.
+"""
 
 class User:
     """Base User class"""
+    __slots__ = ("user_id", "name", "username", "password")
+    
     def __init__(self, user_id, name, username, password):
         self.user_id = user_id
         self.name = name
@@ -10,6 +17,8 @@ class User:
 
 class Student(User):
     """Student model"""
+    __slots__ = ("student_id", "email", "dob")
+    
     def __init__(self, student_id, name, email, dob, username, password):
         super().__init__(student_id, name, username, password)
         self.student_id = student_id
@@ -18,6 +27,8 @@ class Student(User):
 
 class Professor(User):
     """Professor model"""
+    __slots__ = ("professor_id", "email", "dept_id")
+    
     def __init__(self, professor_id, name, email, dept_id, username, password):
         super().__init__(professor_id, name, username, password)
         self.professor_id = professor_id
@@ -26,12 +37,16 @@ class Professor(User):
 
 class Admin(User):
     """Admin model"""
+    __slots__ = ("admin_id",)
+    
     def __init__(self, admin_id, username, password):
         super().__init__(admin_id, "Admin", username, password)
         self.admin_id = admin_id
 
 class Department:
     """Department model"""
+    __slots__ = ("dept_id", "dept_name", "location")
+    
     def __init__(self, dept_id, dept_name, location):
         self.dept_id = dept_id
         self.dept_name = dept_name
@@ -39,6 +54,8 @@ class Department:
 
 class Course:
     """Course model"""
+    __slots__ = ("course_id", "course_name", "credits", "semester", "dept_id", "professor_id")
+    
     def __init__(self, course_id, course_name, credits, semester, dept_id, professor_id):
         self.course_id = course_id
         self.course_name = course_name
@@ -49,14 +66,20 @@ class Course:
 
 class Section:
     """Section model"""
-    def __init__(self, section_id, course_id, room_no, time_slot):
+    __slots__ = ("section_id", "course_id", "room_no", "time_slot", "capacity", "enrolled")
+    
+    def __init__(self, section_id, course_id, room_no, time_slot, capacity=None, enrolled=None):
         self.section_id = section_id
         self.course_id = course_id
         self.room_no = room_no
         self.time_slot = time_slot
+        self.capacity = capacity
+        self.enrolled = enrolled
 
 class Enrollment:
     """Enrollment model"""
+    __slots__ = ("enrollment_id", "student_id", "section_id", "grade")
+    
     def __init__(self, enrollment_id, student_id, section_id, grade):
         self.enrollment_id = enrollment_id
         self.student_id = student_id
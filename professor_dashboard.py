@@ -2,17 +2,64 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 
-from config import DATABASE_NAME
-from ui_components import create_label, create_entry, create_combobox, create_button
+import data_access
+from ui_components import create_label, create_combobox, create_button
 from ui_components import create_treeview, create_form_frame, create_tree_frame
+from ui_components import create_busy_indicator, set_busy
+from query_executor import QueryExecutor
+from change_watcher import ChangeWatcher
+
+# Course filter entry showing the students of every course
+ALL_COURSES = "All courses"
+
+# Column of the grade in professor_students_source rows
+GRADE_COLUMN = 5
+
+class GradeGridSource:
+    """Row source for the grade grid showing unsaved grades over the saved ones"""
+    def __init__(self, row_source, edits):
+        self.row_source = row_source
+        # str(enrollment_id) -> grade, shared with the dashboard
+        self.edits = edits
+        
+    @property
+    def key_ordered(self):
+        """Whether new rows come last, as for the wrapped source"""
+        return self.row_source.key_ordered
+        
+    def apply(self, row):
+        """Return row with its unsaved grade, if any"""
+        grade = self.edits.get(str(row[0]))
+        if grade is None:
+            return row
+        return tuple(row[:GRADE_COLUMN]) + (grade,)
+        
+    def count(self):
+        """Return the number of rows"""
+        return self.row_source.count()
+        
+    def fetch(self, offset, limit):
+        """Return up to limit rows starting at offset"""
+        return [self.apply(row) for row in self.row_source.fetch(offset, limit)]
+        
+    def all(self):
+        """Return every row"""
+        return [self.apply(row) for row in self.row_source.all()]
 
 class ProfessorDashboard:
-    def __init__(self, root, user):
+    def __init__(self, root, user, service=None):
         self.root = root
         self.current_user = user
         self.logout_callback = None
+        # Calls go to the HTTP service when the client uses one, else straight to the database
+        self.data_access = service.data_access if service else data_access
+        self.grade_course_map = {}
+        self.grade_course = ALL_COURSES
+        self.grade_choices = []
+        # Grades entered but not saved yet: str(enrollment_id) -> grade
+        self.grade_edits = {}
+        self.grade_editor = None
         self.create_dashboard()
         
     def set_logout_callback(self, callback):
@@ -36,6 +83,10 @@ class ProfessorDashboard:
         logout_button = ttk.Button(header_frame, text="Logout", command=self.logout)
         logout_button.pack(side=tk.RIGHT)
         
+        # Queries run in the background while the busy indicator is shown
+        self.busy_indicator = create_busy_indicator(header_frame)
+        self.executor = QueryExecutor(self.root, lambda busy: set_busy(self.busy_indicator, busy))
+        
         # Notebook for tabs
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
@@ -51,8 +102,19 @@ class ProfessorDashboard:
         self.create_professor_courses_tab()
         self.create_professor_students_tab()
         
+        # Refresh the views whose tables change; the grade grid already shows saved grades
+        self.watcher = ChangeWatcher(self.root, self.data_access)
+        self.watcher.watch(["Course", "Department"], self.load_professor_courses)
+        self.watcher.watch(["Enrollment", "Student", "Section", "Course"], self.refresh_professor_students,
+                           patched=["Enrollment"])
+        
     def logout(self):
         """Logout and return to login screen"""
+        if self.grade_edits and not messagebox.askyesno(
+                "Unsaved Grades", f"Discard {len(self.grade_edits)} unsaved grades and log out?"):
+            return
+        self.watcher.stop()
+        self.executor.shutdown()
         if self.logout_callback:
             self.logout_callback()
         
@@ -70,62 +132,304 @@ class ProfessorDashboard:
         
     def load_professor_courses(self):
         """Load courses assigned to professor"""
+        # Fetch data in the background
+        self.executor.submit("professor_courses", self.data_access.professor_courses,
+                             self.current_user.professor_id, on_success=self.show_professor_courses)
+        
+    def show_professor_courses(self, courses):
+        """Show fetched courses in the treeview"""
         # Clear existing data
         for item in self.professor_courses_tree.get_children():
             self.professor_courses_tree.delete(item)
             
-        # Fetch data
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT c.course_id, c.course_name, c.credits, c.semester, d.dept_name
-            FROM Course c
-            LEFT JOIN Department d ON c.dept_id = d.dept_id
-            WHERE c.professor_id = ?
-        """, (self.current_user.professor_id,))
-        courses = cursor.fetchall()
-        
         # Insert data
         for course in courses:
             self.professor_courses_tree.insert("", tk.END, values=course)
             
-        conn.close()
-            
+        # The same courses filter the grade grid
+        self.grade_course_map = {course[1]: course[0] for course in courses}
+        self.grade_course_combobox['values'] = [ALL_COURSES] + list(self.grade_course_map)
+        
     def create_professor_students_tab(self):
         """Create the students tab for professors"""
+        # Left frame for grade entry
+        form_frame = create_form_frame(self.my_students_tab, "Enter Grades")
+        
+        create_label(form_frame, "Course:", 0, 0)
+        self.grade_course_combobox = create_combobox(form_frame, 27, 0, 1)
+        self.grade_course_combobox['values'] = [ALL_COURSES]
+        self.grade_course_combobox.set(ALL_COURSES)
+        self.grade_course_combobox.bind("<<ComboboxSelected>>", self.select_grade_course)
+        
+        self.unsaved_label = ttk.Label(form_frame, text="")
+        self.unsaved_label.grid(row=1, column=0, columnspan=2, pady=5)
+        
+        button_frame = ttk.Frame(form_frame)
+        button_frame.grid(row=2, column=0, columnspan=2, pady=10)
+        create_button(button_frame, "Save Grades", self.save_grades, "left")
+        create_button(button_frame, "Discard Changes", self.discard_grades, "left")
+        
+        help_text = ("Double-click a grade or press Enter to edit it; Enter saves the cell and moves down.\n\n"
+                     "Paste (Ctrl+V) a column of grades copied from a spreadsheet to fill the rows from "
+                     "the selected one down, or two columns, student ID and grade, to match by student.\n\n"
+                     "Nothing is written until Save Grades.")
+        ttk.Label(form_frame, text=help_text, wraplength=260, justify=tk.LEFT).grid(
+            row=3, column=0, columnspan=2, padx=5, pady=5, sticky=tk.W)
+        
         # Create tree frame
         tree_frame = create_tree_frame(self.my_students_tab, "My Students")
         
-        # Create treeview
-        columns = ("ID", "Name", "Email", "Course", "Grade")
-        headings = ("ID", "Student Name", "Email", "Course", "Grade")
-        widths = (50, 150, 200, 200, 70)
+        # Create treeview; the enrollment ID identifies rows but is not shown
+        columns = ("Enrollment", "ID", "Name", "Email", "Course", "Grade")
+        headings = ("Enrollment", "ID", "Student Name", "Email", "Course", "Grade")
+        widths = (0, 50, 150, 200, 200, 70)
         self.professor_students_tree = create_treeview(tree_frame, columns, headings, widths)
+        self.professor_students_tree["displaycolumns"] = columns[1:]
+        self.professor_students_tree.bind("<Double-1>", self.edit_clicked_grade)
+        self.professor_students_tree.bind("<Return>", self.edit_focused_grade)
+        self.professor_students_tree.bind("<<Paste>>", self.paste_grades)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>", "<Prior>", "<Next>"):
+            # Scrolling re-renders the rows under an open editor
+            self.professor_students_tree.bind(sequence, lambda event: self.close_grade_editor(commit=True), add="+")
+            
+        self.executor.submit("grade_choices", self.data_access.grade_choices, on_success=self.set_grade_choices)
         self.load_professor_students()
         
     def load_professor_students(self):
         """Load students enrolled in professor's courses"""
-        # Clear existing data
-        for item in self.professor_students_tree.get_children():
-            self.professor_students_tree.delete(item)
+        self.close_grade_editor()
+        course_id = self.grade_course_map.get(self.grade_course)
+        source = self.data_access.professor_students_source(self.current_user.professor_id, course_id)
+        # Fetch data in the background, then a window at a time as the tree scrolls
+        self.executor.load_tree(self.professor_students_tree, GradeGridSource(source, self.grade_edits),
+                                key_column=0)
+        
+    def refresh_professor_students(self):
+        """Show grades and enrollments changed elsewhere, keeping unsaved grades and the scroll position"""
+        if self.grade_editor is not None:
+            return False  # Re-rendering would move the rows under the open editor
+        self.executor.refresh_tree(self.professor_students_tree)
+        
+    def set_grade_choices(self, choices):
+        """Remember the grades that can be entered"""
+        self.grade_choices = choices
+        
+    def select_grade_course(self, event=None):
+        """Show the students of the selected course, after confirming unsaved grades are dropped"""
+        course = self.grade_course_combobox.get()
+        if course == self.grade_course:
+            return
+        if self.grade_edits and not messagebox.askyesno(
+                "Unsaved Grades", f"Discard {len(self.grade_edits)} unsaved grades?"):
+            self.grade_course_combobox.set(self.grade_course)
+            return
+        self.grade_course = course
+        self.grade_edits.clear()
+        self.show_unsaved_grades()
+        self.load_professor_students()
+        
+    def edit_clicked_grade(self, event):
+        """Open the grade editor on the double-clicked row"""
+        iid = self.professor_students_tree.identify_row(event.y)
+        if iid:
+            self.open_grade_editor(iid)
+        return "break"
+        
+    def edit_focused_grade(self, event):
+        """Open the grade editor on the focused row"""
+        iid = self.professor_students_tree.focus()
+        if iid:
+            self.open_grade_editor(iid)
+        return "break"
+        
+    def open_grade_editor(self, iid):
+        """Place an entry over the row's grade cell"""
+        self.close_grade_editor(commit=True)
+        tree = self.professor_students_tree
+        if not tree.exists(iid):
+            return
+        bbox = tree.bbox(iid, "Grade")
+        if not bbox:
+            return
+        x, y, width, height = bbox
+        
+        editor = ttk.Entry(tree)
+        editor.place(x=x, y=y, width=max(width, 60), height=height)
+        editor.insert(0, tree.set(iid, "Grade"))
+        editor.select_range(0, tk.END)
+        editor.focus_set()
+        editor.bind("<Return>", lambda event: self.commit_grade_editor(iid, move=1))
+        editor.bind("<Down>", lambda event: self.commit_grade_editor(iid, move=1))
+        editor.bind("<Up>", lambda event: self.commit_grade_editor(iid, move=-1))
+        editor.bind("<Escape>", lambda event: self.close_grade_editor())
+        editor.bind("<FocusOut>", lambda event: self.close_grade_editor(commit=True))
+        self.grade_editor = (iid, editor)
+        tree.selection_set(iid)
+        tree.focus(iid)
+        
+    def commit_grade_editor(self, iid, move=0):
+        """Keep the edited grade and optionally open the editor on the next or previous row"""
+        editor = self.grade_editor[1]
+        grade = data_access.normalize_grade(editor.get(), self.grade_choices)
+        if grade is None:
+            # Detach the editor so the message box taking focus does not close it
+            self.grade_editor = None
+            messagebox.showerror("Error", f"'{editor.get().strip()}' is not a grade; "
+                                          f"use one of {', '.join(self.grade_choices)}")
+            self.grade_editor = (iid, editor)
+            editor.focus_set()
+            return "break"
+        self.close_grade_editor()
+        self.set_grades([(self.professor_students_tree.item(iid, "values"), grade)])
+        
+        if move:
+            tree = self.professor_students_tree
+            children = tree.get_children()
+            position = children.index(iid) + move if iid in children else -1
+            if not 0 <= position < len(children):
+                # Bring the next row into view
+                tree.yview("scroll", move, "units")
+                children = tree.get_children()
+                position = children.index(iid) + move if iid in children else -1
+            if 0 <= position < len(children):
+                self.open_grade_editor(children[position])
+            else:
+                tree.focus_set()
+        return "break"
+        
+    def close_grade_editor(self, commit=False):
+        """Remove the grade editor, keeping a valid grade it holds if commit is true"""
+        if self.grade_editor is None:
+            return
+        iid, editor = self.grade_editor
+        self.grade_editor = None
+        grade = data_access.normalize_grade(editor.get(), self.grade_choices)
+        editor.destroy()
+        tree = self.professor_students_tree
+        if commit and grade is not None and tree.exists(iid):
+            self.set_grades([(tree.item(iid, "values"), grade)])
             
-        # Fetch data
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT s.student_id, st.name, st.email, c.course_name, e.grade
-            FROM Enrollment e
-            JOIN Section sec ON e.section_id = sec.section_id
-            JOIN Course c ON sec.course_id = c.course_id
-            JOIN Student st ON e.student_id = st.student_id
-            WHERE c.professor_id = ?
-        """, (self.current_user.professor_id,))
-        students = cursor.fetchall()
+    def set_grades(self, grades):
+        """Record (row, grade) pairs as unsaved grades and show them in the grid"""
+        for row, grade in grades:
+            key = str(row[0])
+            if key not in self.grade_edits and str(row[GRADE_COLUMN]) == grade:
+                continue  # Unchanged
+            self.grade_edits[key] = grade
+            self.professor_students_tree.update_row(tuple(row[:GRADE_COLUMN]) + (grade,))
+        self.show_unsaved_grades()
         
-        # Insert data
-        for student in students:
-            self.professor_students_tree.insert("", tk.END, values=student)
+    def show_unsaved_grades(self):
+        """Show how many grades are waiting to be saved"""
+        count = len(self.grade_edits)
+        self.unsaved_label.config(text=f"{count} unsaved grade{'s' if count != 1 else ''}" if count else "")
+        
+    def paste_grades(self, event=None):
+        """Enter grades pasted from a spreadsheet as unsaved grades"""
+        self.close_grade_editor(commit=True)
+        tree = self.professor_students_tree
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            return "break"  # Nothing to paste
+        lines = [line.split("\t") for line in text.splitlines() if line.strip()]
+        if not lines or tree.row_source is None:
+            return "break"
+            
+        try:
+            if all(len(cells) >= 2 for cells in lines):
+                grades = self.match_pasted_students(tree.row_source, lines)
+            else:
+                grades = self.match_pasted_rows(tree.row_source, lines)
+        except data_access.GradeError as e:
+            messagebox.showerror("Error", str(e))
+            return "break"
+        self.set_grades(grades)
+        return "break"
+        
+    def match_pasted_students(self, row_source, lines):
+        """Return (row, grade) pairs for pasted student ID and grade columns"""
+        rows_by_student = {}
+        for row in row_source.all():
+            rows_by_student.setdefault(str(row[1]), []).append(row)
+            
+        grades = []
+        problems = []
+        for line_number, cells in enumerate(lines, start=1):
+            student_id, grade = cells[0].strip(), cells[-1]
+            if line_number == 1 and not student_id.isdigit():
+                continue  # Header row
+            rows = rows_by_student.get(student_id, [])
+            normalized = data_access.normalize_grade(grade, self.grade_choices)
+            if normalized is None:
+                problems.append(f"Line {line_number}: '{grade.strip()}' is not a grade")
+            elif not rows:
+                problems.append(f"Line {line_number}: student {student_id} is not in this list")
+            elif len(rows) > 1:
+                problems.append(f"Line {line_number}: student {student_id} takes several of your courses; "
+                                "choose the course first")
+            else:
+                grades.append((rows[0], normalized))
+        self.check_pasted(problems)
+        return grades
+        
+    def match_pasted_rows(self, row_source, lines):
+        """Return (row, grade) pairs for a pasted column of grades, from the focused row down"""
+        tree = self.professor_students_tree
+        children = tree.get_children()
+        focus = tree.focus()
+        first = tree.first_row + children.index(focus) if focus in children else 0
+        rows = row_source.fetch(first, len(lines))
+        if len(rows) < len(lines):
+            raise data_access.GradeError(f"{len(lines)} grades were pasted but only {len(rows)} rows "
+                                         "start at the selected one")
             
-        conn.close()
\ No newline at end of file
+        grades = []
+        problems = []
+        for line_number, (row, cells) in enumerate(zip(rows, lines), start=1):
+            normalized = data_access.normalize_grade(cells[-1], self.grade_choices)
+            if normalized is None:
+                problems.append(f"Line {line_number}: '{cells[-1].strip()}' is not a grade")
+            else:
+                grades.append((row, normalized))
+        self.check_pasted(problems)
+        return grades
+        
+    def check_pasted(self, problems):
+        """Raise GradeError listing the first problems of a paste, if any"""
+        if not problems:
+            return
+        message = "Nothing was pasted:\n" + "\n".join(problems[:10])
+        if len(problems) > 10:
+            message += f"\n... and {len(problems) - 10} more"
+        raise data_access.GradeError(message)
+        
+    def save_grades(self):
+        """Write every unsaved grade in one transaction"""
+        self.close_grade_editor(commit=True)
+        if not self.grade_edits:
+            messagebox.showinfo("Save Grades", "There are no grade changes to save")
+            return
+        try:
+            saved = self.data_access.save_grades(self.current_user.professor_id,
+                                                 [(int(key), grade) for key, grade in self.grade_edits.items()])
+        except data_access.GradeError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save grades: {str(e)}")
+            return
+            
+        # The grid already shows the saved grades
+        self.grade_edits.clear()
+        self.show_unsaved_grades()
+        messagebox.showinfo("Success", f"Saved {saved} grades")
+        
+    def discard_grades(self):
+        """Drop unsaved grades and show the saved ones again"""
+        self.close_grade_editor()
+        if not self.grade_edits:
+            return
+        self.grade_edits.clear()
+        self.show_unsaved_grades()
+        self.load_professor_students()
\ No newline at end of file
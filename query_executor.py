@@ -0,0 +1,164 @@
+"""Background query execution for the University Management System
+
+Dashboards hand their database reads to a QueryExecutor so the Tk main
+loop never waits on SQLite. Worker threads use their own connections
+(database.get_connection() is per thread) and results are delivered
+back on the Tk thread by polling with root.after.
+"""
+
+import itertools
+import queue
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+from config import QUERY_WORKERS, QUERY_POLL_MS
+from ui_components import VIRTUAL_BLOCK_SIZE
+
+class QueryExecutor:
+    """Run queries on a thread pool and deliver results through root.after
+    
+    Every request has a key (one per view being filled). Submitting a new
+    request for a key supersedes the previous one: it is cancelled if it
+    has not started yet and its result is dropped if it has.
+    """
+    def __init__(self, root, busy_callback=None, workers=QUERY_WORKERS):
+        self.root = root
+        self.busy_callback = busy_callback
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+        self.results = queue.Queue()
+        self.request_ids = itertools.count(1)
+        self.latest = {}
+        self.futures = {}
+        self.pending = 0
+        self.closed = False
+        self.poll_job = self.root.after(QUERY_POLL_MS, self._poll)
+        
+    def submit(self, key, func, *args, on_success=None, on_error=None):
+        """Run func(*args) in the background and pass its result to on_success on the Tk thread"""
+        if self.closed:
+            return
+        request_id = next(self.request_ids)
+        self.latest[key] = request_id
+        
+        # Cancel the superseded request if it has not started yet
+        previous = self.futures.pop(key, None)
+        if previous is not None and previous.cancel():
+            self._set_pending(self.pending - 1)
+            
+        self.futures[key] = self.pool.submit(self._run, key, request_id, func, args,
+                                             on_success, on_error)
+        self._set_pending(self.pending + 1)
+        
+    def load_tree(self, tree, row_source, key_column=None):
+        """Fetch row_source's first window in the background and attach it to tree, then count the rows
+        
+        The first rows are shown after one LIMIT query however large the
+        result is; the count, which visits every row, follows and only
+        sizes the scrollbar. A first window shorter than a block holds
+        every row, so it is not counted at all.
+        """
+        count_key = f"{tree}.count"
+        self.cancel(count_key)
+        
+        def attach(first_block):
+            tree.set_row_source(row_source, key_column, total_rows=len(first_block), first_block=first_block)
+            if len(first_block) == VIRTUAL_BLOCK_SIZE:
+                self.submit(count_key, row_source.count, on_success=attach_count)
+                
+        def attach_count(total_rows):
+            # A load started since then has replaced the source
+            if tree.row_source is row_source:
+                tree.set_total_rows(total_rows)
+                
+        self.submit(str(tree), row_source.fetch, 0, VIRTUAL_BLOCK_SIZE, on_success=attach)
+        
+    def refresh_tree(self, tree):
+        """Re-count tree's row source and re-fetch the rows in view in the background, keeping the scroll position"""
+        row_source = tree.row_source
+        if row_source is None:
+            return
+        indexes = tree.visible_blocks()
+        
+        def prefetch():
+            # Counting first lets a seeking source forget window edges that may have moved
+            total_rows = row_source.count()
+            blocks = {index: row_source.fetch(index * VIRTUAL_BLOCK_SIZE, VIRTUAL_BLOCK_SIZE) for index in indexes}
+            return total_rows, blocks
+            
+        def attach(result):
+            # A load started since then has replaced the source
+            if tree.row_source is row_source:
+                tree.refresh(*result)
+                
+        # Keyed apart from load_tree so a refresh never supersedes a load
+        self.submit(f"{tree}.refresh", prefetch, on_success=attach)
+        
+    def cancel(self, key):
+        """Cancel the request for key and ignore its result"""
+        self.latest.pop(key, None)
+        future = self.futures.pop(key, None)
+        if future is not None and future.cancel():
+            self._set_pending(self.pending - 1)
+            
+    def shutdown(self):
+        """Stop polling and cancel every queued request"""
+        self.closed = True
+        self.latest.clear()
+        self.futures.clear()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            self.root.after_cancel(self.poll_job)
+        except tk.TclError:
+            pass
+            
+    def _run(self, key, request_id, func, args, on_success, on_error):
+        """Worker side: run the request unless it was superseded while queued"""
+        if self.latest.get(key) != request_id:
+            self.results.put((key, request_id, None, None, None, None))
+            return
+        try:
+            result = func(*args)
+        except Exception as e:
+            self.results.put((key, request_id, None, e, on_success, on_error))
+        else:
+            self.results.put((key, request_id, result, None, on_success, on_error))
+            
+    def _poll(self):
+        """Tk side: deliver finished results, then poll again"""
+        if self.closed:
+            return
+        # Reschedule first so a failing callback cannot stop delivery
+        try:
+            self.poll_job = self.root.after(QUERY_POLL_MS, self._poll)
+        except tk.TclError:
+            self.closed = True  # The window has been destroyed
+            return
+            
+        while True:
+            try:
+                key, request_id, result, error, on_success, on_error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self._set_pending(self.pending - 1)
+            
+            # Drop results of superseded or cancelled requests
+            if self.latest.get(key) != request_id:
+                continue
+            del self.latest[key]
+            self.futures.pop(key, None)
+            
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    messagebox.showerror("Error", f"Failed to load data: {error}")
+            elif on_success:
+                on_success(result)
+                
+    def _set_pending(self, pending):
+        """Track outstanding requests and report busy/idle transitions"""
+        was_busy = self.pending > 0
+        self.pending = max(0, pending)
+        if self.busy_callback and was_busy != (self.pending > 0):
+            self.busy_callback(self.pending > 0)
\ No newline at end of file
@@ -0,0 +1,305 @@
+"""SQL instrumentation for the University Management System
+
+database.connect() opens connections with InstrumentedConnection when
+QUERY_STATS_ENABLED is set, so every statement run through
+get_connection() or transaction() is timed here. Statistics are grouped
+by query name (the function that issued the statement, e.g.
+data_access.students_source) and SQL text. Statements slower than
+SLOW_QUERY_MS are appended to SLOW_QUERY_LOG together with their
+EXPLAIN QUERY PLAN output. Bound values, which include passwords, are
+only described by type unless SLOW_QUERY_PARAMS is set.
+"""
+
+import datetime
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import SLOW_QUERY_MS, SLOW_QUERY_LOG, SLOW_QUERY_EXPLAIN, SLOW_QUERY_PARAMS
+
+# Most recent slow statements kept in memory for the admin dashboard
+SLOW_QUERIES_KEPT = 200
+
+_stats = {}
+_slow_queries = deque(maxlen=SLOW_QUERIES_KEPT)
+_plans = {}
+# Latest non-SQL timings, e.g. how long a dashboard took to appear
+_timings = {}
+_lock = threading.Lock()
+# Serializes appends to SLOW_QUERY_LOG, which are kept out of _lock
+_log_lock = threading.Lock()
+_local = threading.local()
+
+# Modules and functions that only pass statements through and never name a query
+_internal_modules = {"contextlib", __name__}
+_internal_code = set()
+_anonymous = {"<lambda>", "<genexpr>", "<listcomp>", "<dictcomp>", "<setcomp>"}
+
+class QueryStat:
+    """Accumulated timings for one statement issued under one query name"""
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+        self.calls = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+
+class SlowQuery:
+    """One statement that took longer than SLOW_QUERY_MS"""
+    def __init__(self, name, sql, params, elapsed, plan):
+        self.when = datetime.datetime.now()
+        self.name = name
+        self.sql = sql
+        # Only a description of the values is kept unless they are wanted for debugging
+        self.params = params if SLOW_QUERY_PARAMS else describe_params(params)
+        self.elapsed = elapsed
+        self.plan = plan
+        
+    def format(self):
+        """Return the log file entry for this statement"""
+        lines = [f"{self.when:%Y-%m-%d %H:%M:%S} {self.elapsed * 1000:.1f} ms {self.name}",
+                 f"    {normalize_sql(self.sql)}"]
+        if self.params:
+            params = repr(self.params) if SLOW_QUERY_PARAMS else self.params
+            lines.append(f"    params: {params}")
+        for detail in self.plan or []:
+            lines.append(f"    plan: {detail}")
+        return "\n".join(lines)
+
+def describe_params(params):
+    """Describe bound values by their number and types without their values"""
+    if not params:
+        return ""
+    if isinstance(params, dict):
+        types = ", ".join(f"{name}: {type(value).__name__}" for name, value in params.items())
+    else:
+        types = ", ".join(type(value).__name__ for value in params)
+    return f"{len(params)} values ({types})"
+
+def internal(*functions):
+    """Mark helper functions whose callers, not themselves, name the query"""
+    for function in functions:
+        _internal_code.add(function.__code__)
+
+@contextmanager
+def named(name):
+    """Attribute every statement run by the calling thread in this block to name"""
+    previous = getattr(_local, "name", None)
+    _local.name = name
+    try:
+        yield
+    finally:
+        _local.name = previous
+
+def caller_name():
+    """Return the query name for the statement being run by the calling thread"""
+    name = getattr(_local, "name", None)
+    if name:
+        return name
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        code = frame.f_code
+        if (module not in _internal_modules and code not in _internal_code
+                and code.co_name not in _anonymous):
+            return f"{module}.{code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+def normalize_sql(sql):
+    """Collapse whitespace so a statement fits on one line"""
+    return " ".join(sql.split())
+
+def record(name, sql, elapsed, rows=0, calls=1):
+    """Add one timing to the statistics and return the QueryStat it went to"""
+    key = (name, sql)
+    with _lock:
+        stat = _stats.get(key)
+        if stat is None:
+            stat = _stats[key] = QueryStat(name, sql)
+        stat.calls += calls
+        stat.rows += rows
+        stat.total += elapsed
+        stat.max = max(stat.max, elapsed)
+    return stat
+
+def log_slow(conn, stat, params, elapsed):
+    """Keep and log a statement that took longer than SLOW_QUERY_MS"""
+    plan = explain(conn, stat.sql, params) if SLOW_QUERY_EXPLAIN else None
+    slow = SlowQuery(stat.name, stat.sql, params, elapsed, plan)
+    with _lock:
+        stat.slow += 1
+        _slow_queries.append(slow)
+        entry = slow.format()
+    # Other threads' statements are not held up while the entry is written
+    if SLOW_QUERY_LOG:
+        with _log_lock, open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+            f.write(entry + "\n")
+
+def explain(conn, sql, params):
+    """Return the EXPLAIN QUERY PLAN details for a statement, cached by SQL text"""
+    if sql in _plans:
+        return _plans[sql]
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")):
+        return None
+    try:
+        # A plain cursor, so the plan query itself is not recorded
+        cursor = sqlite3.Cursor(conn)
+        plan = [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params or ())]
+    except sqlite3.Error as e:
+        plan = [f"unavailable: {e}"]
+    _plans[sql] = plan
+    return plan
+
+def record_timing(name, elapsed):
+    """Record how long something other than a statement took, keeping the latest"""
+    with _lock:
+        _timings[name] = elapsed
+
+def timings():
+    """Return the latest non-SQL timings in seconds by name"""
+    with _lock:
+        return dict(_timings)
+
+def captured_plan(sql):
+    """Return the query plan captured for a slow statement, if any"""
+    return _plans.get(sql)
+
+def snapshot():
+    """Return a copy of the statistics, slowest total time first"""
+    with _lock:
+        stats = [vars(stat).copy() for stat in _stats.values()]
+    stats.sort(key=lambda stat: stat["total"], reverse=True)
+    return stats
+
+def slow_queries():
+    """Return the most recent slow statements, newest first"""
+    with _lock:
+        return list(reversed(_slow_queries))
+
+def reset():
+    """Forget every recorded timing and slow statement"""
+    with _lock:
+        _stats.clear()
+        _slow_queries.clear()
+        _plans.clear()
+        _timings.clear()
+
+def report():
+    """Return the statistics, timings and recent slow statements as text"""
+    lines = [f"{'total ms':>10} {'calls':>7} {'avg ms':>8} {'max ms':>8} {'rows':>8} {'slow':>5}  query"]
+    for stat in snapshot():
+        average = stat["total"] / stat["calls"] if stat["calls"] else 0.0
+        lines.append(f"{stat['total'] * 1000:10.1f} {stat['calls']:7d} {average * 1000:8.2f} "
+                     f"{stat['max'] * 1000:8.2f} {stat['rows']:8d} {stat['slow']:5d}  {stat['name']}")
+        lines.append(f"{'':51}{normalize_sql(stat['sql'])[:200]}")
+    recorded = timings()
+    if recorded:
+        lines.append("")
+        lines.append("Timings:")
+        lines.extend(f"{elapsed * 1000:10.1f} ms  {name}" for name, elapsed in sorted(recorded.items()))
+    slow = slow_queries()
+    if slow:
+        lines.append("")
+        lines.append(f"Slow statements (>= {SLOW_QUERY_MS} ms), newest first:")
+        lines.extend(entry.format() for entry in slow)
+    return "\n".join(lines)
+
+def dump(path):
+    """Write report() to a file"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(report() + "\n")
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times execute calls and the fetches that follow them
+    
+    Fetch time is added to the statement last executed on the cursor, and
+    the statement is logged as slow once its execute and fetch time
+    together reach SLOW_QUERY_MS.
+    """
+    def execute(self, sql, parameters=()):
+        """Execute a statement and record its timing"""
+        self._start_query(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(time.perf_counter() - start, calls=1)
+            
+    def executemany(self, sql, seq_of_parameters):
+        """Execute a statement for every parameter set and record the total"""
+        self._start_query(sql, ())
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record(time.perf_counter() - start, calls=1, rows=max(self.rowcount, 0))
+            
+    def fetchone(self):
+        """Fetch one row, adding the time to the statement that produced it"""
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._record(time.perf_counter() - start, rows=int(row is not None))
+        return row
+        
+    def fetchmany(self, size=None):
+        """Fetch several rows, adding the time to the statement that produced them"""
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._record(time.perf_counter() - start, rows=len(rows))
+        return rows
+        
+    def fetchall(self):
+        """Fetch the remaining rows, adding the time to the statement that produced them"""
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._record(time.perf_counter() - start, rows=len(rows))
+        return rows
+        
+    def _start_query(self, sql, parameters):
+        """Begin timing a new statement on this cursor"""
+        self._query = (caller_name(), sql, parameters)
+        self._elapsed = 0.0
+        self._logged = False
+        
+    def _record(self, elapsed, rows=0, calls=0):
+        """Add a timing to the statement last executed on this cursor"""
+        query = getattr(self, "_query", None)
+        if query is None:
+            return
+        name, sql, parameters = query
+        stat = record(name, sql, elapsed, rows=rows, calls=calls)
+        self._elapsed += elapsed
+        if not self._logged and self._elapsed * 1000 >= SLOW_QUERY_MS:
+            self._logged = True
+            log_slow(self.connection, stat, parameters, self._elapsed)
+            
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors and commits are timed"""
+    def cursor(self, factory=InstrumentedCursor):
+        """Return an instrumented cursor"""
+        return super().cursor(factory)
+        
+    def execute(self, sql, parameters=()):
+        """Execute a statement on a new instrumented cursor"""
+        return self.cursor().execute(sql, parameters)
+        
+    def executemany(self, sql, seq_of_parameters):
+        """Execute a statement for every parameter set on a new instrumented cursor"""
+        return self.cursor().executemany(sql, seq_of_parameters)
+        
+    def commit(self):
+        """Commit and record the time spent (mostly waiting on the disk)"""
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            elapsed = time.perf_counter() - start
+            stat = record(caller_name(), "COMMIT", elapsed)
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                log_slow(self, stat, (), elapsed)
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""Repository layer for the University Management System
+
+Each Repository maps the rows of one table to a model from models.py.
+Columns are selected by name, in the order of the model's constructor,
+so rows never depend on the table's column order the way SELECT * and
+positional indexes do. The cursor's row factory builds the model as
+each row is read, and bulk reads are lazy iterators that fetch
+BULK_CHUNK_SIZE rows at a time, so a report over every enrollment never
+holds more than one chunk of raw rows.
+
+Most of a small model's memory is its field values rather than the
+object, so columns that repeat across rows (grades, section IDs) are
+declared shared: each query keeps one copy of every distinct value and
+the models reference it.
+"""
+
+import query_stats
+from config import BULK_CHUNK_SIZE
+from database import get_connection
+from models import Student, Professor, Admin, Department, Course, Section, Enrollment
+
+class Repository:
+    """Reads one table as model objects"""
+    def __init__(self, model, table, columns, key, shared=()):
+        self.model = model
+        self.table = table
+        # Constructor arguments of model, in order
+        self.columns = columns
+        self.key = key
+        # Positions of the columns whose repeated values are stored once per query
+        self.shared = [columns.index(column) for column in shared]
+        self.select_sql = f"SELECT {', '.join(columns)} FROM {table}"
+        
+    def cursor(self):
+        """Return a cursor on the shared connection that yields models"""
+        cursor = get_connection().cursor()
+        model = self.model
+        if not self.shared:
+            cursor.row_factory = lambda cursor, row: model(*row)
+            return cursor
+            
+        values = {}
+        shared = self.shared
+        
+        def row_factory(cursor, row):
+            row = list(row)
+            for position in shared:
+                value = row[position]
+                row[position] = values.setdefault(value, value)
+            return model(*row)
+            
+        cursor.row_factory = row_factory
+        return cursor
+        
+    def get(self, key):
+        """Return the model with the given primary key, or None"""
+        return self.find_one(f"{self.key} = ?", (key,))
+        
+    def find_one(self, where, params=()):
+        """Return the first model matching a WHERE clause, or None"""
+        cursor = self.cursor()
+        cursor.execute(f"{self.select_sql} WHERE {where}", params)
+        return cursor.fetchone()
+        
+    def find(self, where=None, params=(), order_by=None, chunk_size=BULK_CHUNK_SIZE):
+        """Iterate over the models matching a WHERE clause, in primary key order by default
+        
+        Rows are fetched chunk_size at a time as the iterator is consumed.
+        """
+        sql = self.select_sql
+        if where:
+            sql += f" WHERE {where}"
+        sql += f" ORDER BY {order_by or self.key}"
+        cursor = self.cursor()
+        cursor.execute(sql, params)
+        while True:
+            models = cursor.fetchmany(chunk_size)
+            if not models:
+                return
+            yield from models
+            
+    def all(self, chunk_size=BULK_CHUNK_SIZE):
+        """Iterate over every model in primary key order"""
+        return self.find(chunk_size=chunk_size)
+
+# Statements are recorded under the function using the repository
+query_stats.internal(Repository.find_one, Repository.find)
+
+STUDENTS = Repository(Student, "Student", ("student_id", "name", "email", "dob", "username", "password"),
+                      "student_id")
+PROFESSORS = Repository(Professor, "Professor",
+                        ("professor_id", "name", "email", "dept_id", "username", "password"), "professor_id")
+ADMINS = Repository(Admin, "Admin", ("admin_id", "username", "password"), "admin_id")
+DEPARTMENTS = Repository(Department, "Department", ("dept_id", "dept_name", "location"), "dept_id")
+COURSES = Repository(Course, "Course",
+                     ("course_id", "course_name", "credits", "semester", "dept_id", "professor_id"), "course_id")
+SECTIONS = Repository(Section, "Section",
+                      ("section_id", "course_id", "room_no", "time_slot", "capacity", "enrolled"), "section_id",
+                      shared=("course_id", "room_no", "time_slot"))
+ENROLLMENTS = Repository(Enrollment, "Enrollment", ("enrollment_id", "student_id", "section_id", "grade"),
+                         "enrollment_id", shared=("section_id", "grade"))
+
+# Repositories of the users who can log in, by role
+USER_REPOSITORIES = {"Student": STUDENTS, "Professor": PROFESSORS, "Admin": ADMINS}
+
+def course_enrollments(course_id, chunk_size=BULK_CHUNK_SIZE):
+    """Iterate over the enrollments in every section of a course, section by section"""
+    # Ordering by section as well lets idx_enrollment_section return the rows
+    # in order; by enrollment_id alone SQLite would scan the whole table
+    return ENROLLMENTS.find("section_id IN (SELECT section_id FROM Section WHERE course_id = ?)", (course_id,),
+                            order_by="section_id, enrollment_id", chunk_size=chunk_size)
+
+def student_enrollments(student_id):
+    """Iterate over a student's enrollments"""
+    return ENROLLMENTS.find("student_id = ?", (student_id,))
\ No newline at end of file
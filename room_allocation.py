@@ -0,0 +1,178 @@
+"""Room allocation for the University Management System
+
+Assigns a room from the Room table to every section at once, so that no
+two sections share a room at overlapping times and every room seats its
+section. Usable from the admin dashboard or headless:
+
+    python room_allocation.py
+    python room_allocation.py --semester 3 --unassigned-only --dry-run
+"""
+
+import argparse
+import sys
+from bisect import bisect_left
+
+from database import create_database, transaction
+
+# Room numbers that mean a section has no room yet
+UNASSIGNED_ROOMS = {"", "TBD"}
+
+NO_TIME_SLOT = "no time slot"
+NO_ROOM_LARGE_ENOUGH = "no room large enough"
+NO_FREE_ROOM = "no room free at that time"
+
+class RoomSchedule:
+    """Busy intervals of one room, per day, sorted by start"""
+    def __init__(self):
+        # day -> ([start, ...], [end, ...]); intervals never overlap, so ends are sorted too
+        self.days = {}
+        
+    def is_free(self, meetings):
+        """Return True if none of the (day, start, end) meetings overlaps a busy interval"""
+        for day, start, end in meetings:
+            starts, ends = self.days.get(day, ((), ()))
+            # Only the last interval starting before this meeting ends can overlap it
+            before = bisect_left(starts, end)
+            if before and ends[before - 1] > start:
+                return False
+        return True
+        
+    def book(self, meetings):
+        """Mark the meetings busy, joining any busy intervals they overlap"""
+        for day, start, end in meetings:
+            starts, ends = self.days.setdefault(day, ([], []))
+            first = bisect_left(starts, start)
+            if first and ends[first - 1] > start:
+                first -= 1
+            last = first
+            while last < len(starts) and starts[last] < end:
+                last += 1
+            if last > first:
+                start = min(start, starts[first])
+                end = max(end, ends[last - 1])
+            starts[first:last] = [start]
+            ends[first:last] = [end]
+
+class AllocationReport:
+    """Outcome of an allocation: rooms given and sections left without one"""
+    def __init__(self):
+        # section_id -> room_no for every placed section
+        self.placed = {}
+        # (section_id, course_name, time_slot, reason) for every section without a room
+        self.unplaced = []
+        self.written = False
+        
+    def summary(self):
+        """Return a short human readable summary"""
+        text = f"Placed {len(self.placed)} sections, {len(self.unplaced)} without a room"
+        if not self.written:
+            text += " (not saved)"
+        for section_id, course_name, time_slot, reason in self.unplaced[:10]:
+            text += f"\nSection {section_id} {course_name or ''} ({time_slot or 'no time'}): {reason}"
+        if len(self.unplaced) > 10:
+            text += f"\n... and {len(self.unplaced) - 10} more"
+        return text
+
+def merge_meetings(meetings):
+    """Return meetings sorted by day and start with overlapping ones joined"""
+    merged = []
+    for day, start, end in sorted(meetings):
+        if merged and merged[-1][0] == day and start < merged[-1][2]:
+            merged[-1] = (day, merged[-1][1], max(end, merged[-1][2]))
+        else:
+            merged.append((day, start, end))
+    return merged
+
+def load_sections(cursor):
+    """Return {section_id: [course_name, time_slot, semester, capacity, room_no, meetings]}"""
+    cursor.execute("""
+        SELECT s.section_id, c.course_name, s.time_slot, c.semester, s.capacity, s.room_no
+        FROM Section s LEFT JOIN Course c ON s.course_id = c.course_id
+    """)
+    sections = {row[0]: list(row[1:]) + [[]] for row in cursor.fetchall()}
+    cursor.execute("SELECT section_id, day, start_minute, end_minute FROM SectionMeeting")
+    for section_id, day, start, end in cursor.fetchall():
+        if section_id in sections:
+            sections[section_id][5].append((day, start, end))
+    for section in sections.values():
+        section[5] = merge_meetings(section[5])
+    return sections
+
+def allocate_rooms(semester=None, unassigned_only=False, dry_run=False):
+    """Assign rooms to sections and write them back in one transaction
+    
+    Sections of the given semester (every section by default) are placed
+    greedily, largest and longest-meeting first, each into the smallest
+    room that seats it and is free at all of its meeting times. Sections
+    outside the semester, and with unassigned_only those already in a
+    known room, keep their rooms and block them. Sections that cannot be
+    placed are reported and left with room "TBD". Returns an
+    AllocationReport; dry_run computes it without saving.
+    """
+    report = AllocationReport()
+    with transaction() as cursor:
+        cursor.execute("SELECT room_no, capacity FROM Room ORDER BY capacity, room_no")
+        rooms = cursor.fetchall()
+        capacities = [capacity for _, capacity in rooms]
+        schedules = {room_no: RoomSchedule() for room_no, _ in rooms}
+        sections = load_sections(cursor)
+        
+        # Sections that keep their room occupy it first
+        pending = []
+        for section_id, (course_name, time_slot, course_semester, capacity, room_no, meetings) in sections.items():
+            in_scope = semester is None or course_semester == semester
+            keeps_room = room_no in schedules and (unassigned_only or not in_scope)
+            if keeps_room:
+                schedules[room_no].book(meetings)
+            elif in_scope:
+                pending.append(section_id)
+                
+        # Hardest sections first: most seats, then most time in the week
+        pending.sort(key=lambda section_id: (-sections[section_id][3],
+                                             -sum(end - start for _, start, end in sections[section_id][5]),
+                                             section_id))
+        for section_id in pending:
+            course_name, time_slot, _, capacity, _, meetings = sections[section_id]
+            if not meetings:
+                report.unplaced.append((section_id, course_name, time_slot, NO_TIME_SLOT))
+                continue
+            # Rooms are sorted by capacity, so the first free one is the best fit
+            first = bisect_left(capacities, capacity)
+            if first == len(rooms):
+                report.unplaced.append((section_id, course_name, time_slot, NO_ROOM_LARGE_ENOUGH))
+                continue
+            for room_no, _ in rooms[first:]:
+                if schedules[room_no].is_free(meetings):
+                    schedules[room_no].book(meetings)
+                    report.placed[section_id] = room_no
+                    break
+            else:
+                report.unplaced.append((section_id, course_name, time_slot, NO_FREE_ROOM))
+                
+        if not dry_run:
+            cursor.executemany("UPDATE Section SET room_no = ? WHERE section_id = ?",
+                               [(room_no, section_id) for section_id, room_no in report.placed.items()
+                                if sections[section_id][4] != room_no])
+            cursor.executemany("UPDATE Section SET room_no = 'TBD' WHERE section_id = ?",
+                               [(section[0],) for section in report.unplaced
+                                if sections[section[0]][4] not in UNASSIGNED_ROOMS])
+            report.written = True
+    report.unplaced.sort()
+    return report
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Assign rooms to sections")
+    parser.add_argument("--semester", help="only (re)assign sections of courses in this semester")
+    parser.add_argument("--unassigned-only", action="store_true",
+                        help="keep sections that already have a known room where they are")
+    parser.add_argument("--dry-run", action="store_true", help="report the allocation without saving it")
+    args = parser.parse_args(argv)
+    
+    create_database()
+    report = allocate_rooms(args.semester, args.unassigned_only, args.dry_run)
+    print(report.summary())
+    return 1 if report.unplaced else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
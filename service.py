@@ -0,0 +1,333 @@
+"""HTTP/JSON service for the University Management System
+
+Desktop clients normally open university.db themselves, so every client
+takes the file locks on its own and pays the latency of the share the
+file lives on. This service owns the database instead: a fixed pool of
+worker threads, each keeping its warm per-thread connection, serves the
+queries and writes of the dashboards and authenticate_user as JSON
+endpoints. Clients use it when SERVICE_URL is set in config.py (see
+service_client.py).
+
+    python service.py
+    python service.py --host 0.0.0.0 --port 8765 --database /srv/university.db
+
+Every request is POST /api/<endpoint> with a JSON object {"args": [...]}.
+Row source endpoints (names ending in _source) also take "op" ("count",
+"fetch" or "all") and, to fetch, "offset", "limit" and optionally
+"edges", the [offset, sort key] pairs an earlier fetch returned, so the
+window is read by seeking from them (see data_access.QuerySource).
+Responses are {"result": ...}, with "changes" listing the TableVersion counter
+ranges the call's writes made (see database.own_changes()), or, with an
+error status, {"error": message, "type": exception name}. Except for login, requests carry the token login
+returned in an "Authorization: Bearer <token>" header.
+"""
+
+import argparse
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import bulk_io
+import data_access
+import database
+import room_allocation
+from auth import authenticate_user
+from config import SERVICE_HOST, SERVICE_PORT, SERVICE_WORKERS
+
+STUDENT = "Student"
+PROFESSOR = "Professor"
+ADMIN = "Admin"
+
+class ServiceError(Exception):
+    """A request the service refuses, with the HTTP status to answer it with"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class Endpoint:
+    """A function served over HTTP and the roles that may call it
+    
+    With own_id the first argument is a student or professor ID, which a
+    student or professor may only pass as their own. Admins may call
+    every endpoint.
+    """
+    def __init__(self, function, roles=(), own_id=False):
+        self.function = function
+        self.roles = set(roles) | {ADMIN}
+        self.own_id = own_id
+        # Returns a data_access.QuerySource, read with the request's op
+        self.is_source = function.__name__.endswith("_source")
+
+def import_csv_text(entity, text):
+    """Import CSV text uploaded by a client and return the report summary"""
+    handle, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(handle, "w", newline="", encoding="utf-8") as f:
+            f.write(text)
+        return bulk_io.import_csv(entity, path).summary()
+    finally:
+        os.remove(path)
+
+def export_csv_text(entity):
+    """Return [rows written, CSV text] for an entity"""
+    handle, path = tempfile.mkstemp(suffix=".csv")
+    os.close(handle)
+    try:
+        written = bulk_io.export_csv(entity, path)
+        with open(path, newline="", encoding="utf-8") as f:
+            return [written, f.read()]
+    finally:
+        os.remove(path)
+
+def allocate_rooms_summary(semester=None, unassigned_only=False, dry_run=False):
+    """Allocate rooms and return the report summary"""
+    return room_allocation.allocate_rooms(semester, unassigned_only, dry_run).summary()
+
+ENDPOINTS = {
+    # Student dashboard
+    "available_courses": Endpoint(data_access.available_courses, [STUDENT], own_id=True),
+    "course_catalog_source": Endpoint(data_access.course_catalog_source, [STUDENT]),
+    "course_catalog_row": Endpoint(data_access.course_catalog_row, [STUDENT]),
+    "enroll_student": Endpoint(data_access.enroll_student, [STUDENT], own_id=True),
+    "student_courses": Endpoint(data_access.student_courses, [STUDENT], own_id=True),
+    "student_summary": Endpoint(data_access.student_summary, [STUDENT], own_id=True),
+
+    # Professor dashboard
+    "professor_courses": Endpoint(data_access.professor_courses, [PROFESSOR], own_id=True),
+    "professor_students_source": Endpoint(data_access.professor_students_source, [PROFESSOR], own_id=True),
+    "grade_choices": Endpoint(data_access.grade_choices, [PROFESSOR]),
+    "save_grades": Endpoint(data_access.save_grades, [PROFESSOR], own_id=True),
+
+    # Every dashboard
+    "table_versions": Endpoint(data_access.table_versions, [STUDENT, PROFESSOR]),
+
+    # Admin dashboard
+    "students_source": Endpoint(data_access.students_source),
+    "student_row": Endpoint(data_access.student_row),
+    "add_student": Endpoint(data_access.add_student),
+    "update_student": Endpoint(data_access.update_student),
+    "delete_student": Endpoint(data_access.delete_student),
+    "professors_source": Endpoint(data_access.professors_source),
+    "professor_row": Endpoint(data_access.professor_row),
+    "add_professor": Endpoint(data_access.add_professor),
+    "update_professor": Endpoint(data_access.update_professor),
+    "delete_professor": Endpoint(data_access.delete_professor),
+    "courses_source": Endpoint(data_access.courses_source),
+    "course_row": Endpoint(data_access.course_row),
+    "add_course": Endpoint(data_access.add_course),
+    "update_course": Endpoint(data_access.update_course),
+    "delete_course": Endpoint(data_access.delete_course),
+    "departments_source": Endpoint(data_access.departments_source),
+    "department_row": Endpoint(data_access.department_row),
+    "add_department": Endpoint(data_access.add_department),
+    "update_department": Endpoint(data_access.update_department),
+    "delete_department": Endpoint(data_access.delete_department),
+    "sections_source": Endpoint(data_access.sections_source),
+    "section_row": Endpoint(data_access.section_row),
+    "add_section": Endpoint(data_access.add_section),
+    "update_section": Endpoint(data_access.update_section),
+    "delete_section": Endpoint(data_access.delete_section),
+    "room_conflicts": Endpoint(data_access.room_conflicts),
+    "department_choices": Endpoint(data_access.department_choices),
+    "professor_choices": Endpoint(data_access.professor_choices),
+    "course_choices": Endpoint(data_access.course_choices),
+    "timetable_clashes": Endpoint(data_access.timetable_clashes),
+    "gpa_rankings_source": Endpoint(data_access.gpa_rankings_source),
+    "import_csv": Endpoint(import_csv_text),
+    "export_csv": Endpoint(export_csv_text),
+    "allocate_rooms": Endpoint(allocate_rooms_summary),
+}
+
+def user_fields(user):
+    """Return the fields a client needs to rebuild a logged in user's model, without the password"""
+    if user.__class__.__name__ == STUDENT:
+        return [user.student_id, user.name, user.email, user.dob, user.username]
+    if user.__class__.__name__ == PROFESSOR:
+        return [user.professor_id, user.name, user.email, user.dept_id, user.username]
+    return [user.admin_id, user.username]
+
+def error_status(error):
+    """Return the HTTP status for an exception raised by an endpoint"""
+    if isinstance(error, ServiceError):
+        return error.status
+    if isinstance(error, (data_access.EnrollmentError, data_access.GradeError, sqlite3.IntegrityError)):
+        return 409
+    if isinstance(error, (ValueError, TypeError, KeyError)):
+        return 400
+    return 500
+
+class Sessions:
+    """Logged in users by token"""
+    def __init__(self):
+        self.users = {}
+        self.lock = threading.Lock()
+        
+    def open(self, user):
+        """Return a new token for user"""
+        token = secrets.token_urlsafe(32)
+        with self.lock:
+            self.users[token] = user
+        return token
+        
+    def get(self, token):
+        """Return the user a token belongs to, or None"""
+        with self.lock:
+            return self.users.get(token)
+            
+    def close(self, token):
+        """Forget a token"""
+        with self.lock:
+            self.users.pop(token, None)
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Answer one JSON request
+    
+    Requests are HTTP/1.0, so a connection is closed after its response
+    and never holds a pool worker while the client is idle.
+    """
+    server_version = "UniversityService/1.0"
+    
+    def do_POST(self):
+        """Run the endpoint named by the path and send its result"""
+        try:
+            if not self.path.startswith("/api/"):
+                raise ServiceError(404, f"Unknown path '{self.path}'")
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                raise ServiceError(400, "Request body is not JSON")
+            response = self.dispatch(self.path[len("/api/"):], body)
+        except Exception as e:
+            status = error_status(e)
+            if status == 500:
+                self.log_error("%s failed: %r", self.path, e)
+            self.send_json(status, {"error": str(e), "type": type(e).__name__})
+        else:
+            self.send_json(200, response)
+            
+    def dispatch(self, name, body):
+        """Check the caller may use the endpoint, run it and return the response object"""
+        args = body.get("args", []) if isinstance(body, dict) else None
+        if not isinstance(args, list):
+            raise ServiceError(400, "args must be a list")
+        sessions = self.server.sessions
+        if name == "login":
+            user = authenticate_user(*args)
+            if user is None:
+                return {"result": None}
+            return {"result": {"token": sessions.open(user), "role": user.__class__.__name__,
+                               "user": user_fields(user)}}
+            
+        token = self.headers.get("Authorization", "").replace("Bearer ", "", 1)
+        user = sessions.get(token)
+        if user is None:
+            raise ServiceError(401, "Not logged in")
+        if name == "logout":
+            sessions.close(token)
+            return {"result": None}
+            
+        endpoint = ENDPOINTS.get(name)
+        if endpoint is None:
+            raise ServiceError(404, f"Unknown endpoint '{name}'")
+        role = user.__class__.__name__
+        if role not in endpoint.roles:
+            raise ServiceError(403, f"{role}s may not call {name}")
+        if endpoint.own_id and role != ADMIN and (not args or str(args[0]) != str(user.user_id)):
+            raise ServiceError(403, f"{name} is only available for your own records")
+            
+        # The client's change watcher skips the counter ranges its own writes made
+        with database.collect_changes() as changes:
+            result = endpoint.function(*args)
+        if not endpoint.is_source:
+            return {"result": result, "changes": changes}
+        op = body.get("op", "all")
+        if op == "count":
+            rows = result.count()
+        elif op == "fetch":
+            # Each request builds a new source, so the client keeps the edges between windows
+            result.use_edges(body.get("edges", ()))
+            rows = result.fetch(int(body["offset"]), int(body["limit"]))
+            return {"result": rows, "key_ordered": result.key_ordered, "edges": result.edge_keys()}
+        elif op == "all":
+            rows = result.all()
+        else:
+            raise ServiceError(400, f"Unknown op '{op}'")
+        return {"result": rows, "key_ordered": result.key_ordered}
+        
+    def send_json(self, status, payload):
+        """Send payload as the JSON response"""
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        
+    def log_message(self, format, *args):
+        """Log requests only when the server is verbose"""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class ServiceServer(HTTPServer):
+    """HTTP server handing requests to a fixed pool of worker threads
+    
+    ThreadingHTTPServer starts a thread, and so a database connection,
+    per request; the pool's threads live as long as the server, so each
+    keeps its warm connection and statement cache.
+    """
+    def __init__(self, address, workers=SERVICE_WORKERS, verbose=False):
+        super().__init__(address, ServiceHandler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="service")
+        self.sessions = Sessions()
+        self.verbose = verbose
+        
+    def process_request(self, request, client_address):
+        """Queue the request for a worker"""
+        self.pool.submit(self.process_request_thread, request, client_address)
+        
+    def process_request_thread(self, request, client_address):
+        """Worker side: answer the request and close its connection"""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            
+    def server_close(self):
+        """Stop accepting requests and wait for the workers to finish"""
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve the university database over HTTP/JSON")
+    parser.add_argument("--host", default=SERVICE_HOST, help=f"address to listen on (default {SERVICE_HOST})")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help=f"port to listen on (default {SERVICE_PORT})")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="worker threads")
+    parser.add_argument("--database", help="database file to serve instead of the configured one")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+    
+    if args.database:
+        database.use_database(args.database)
+    database.create_database()
+    server = ServiceServer((args.host, args.port), args.workers, args.verbose)
+    print(f"Serving {database.database_path} on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""Client for the University Management System HTTP service
+
+ServiceClient stands in for the data_access, bulk_io and room_allocation
+modules the dashboards use, sending each call to service.py instead of
+opening the database file. Row sources come back as RemoteSource, which
+fetches the windows a VirtualTreeview asks for one request at a time and
+keeps the sort keys of their edges for the service to seek from.
+"""
+
+import json
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+from collections import OrderedDict, deque
+
+import data_access
+import database
+from config import SERVICE_TIMEOUT
+from models import Student, Professor, Admin
+from service import ENDPOINTS
+
+class ServiceError(Exception):
+    """Raised when the service cannot be reached or fails a request"""
+
+# Exceptions raised again on the client under the type the service reported
+REMOTE_EXCEPTIONS = {
+    "EnrollmentError": data_access.EnrollmentError,
+    "GradeError": data_access.GradeError,
+    "IntegrityError": sqlite3.IntegrityError,
+    "ValueError": ValueError,
+}
+
+USER_MODELS = {"Student": Student, "Professor": Professor, "Admin": Admin}
+
+# Tables of data_access.CHOICE_CACHES and the endpoints serving them
+CHOICE_ENDPOINTS = {
+    "Department": "department_choices",
+    "Professor": "professor_choices",
+    "Course": "course_choices",
+}
+
+class ServiceClient:
+    """Connection details and session of one logged in client"""
+    def __init__(self, url, timeout=SERVICE_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.token = None
+        # TableVersion counter ranges this client's writes made, newest last
+        self.own_changes = deque(maxlen=database.OWN_CHANGES_KEPT)
+        self.data_access = RemoteDataAccess(self)
+        self.bulk_io = RemoteBulkIO(self)
+        self.room_allocation = RemoteRoomAllocation(self)
+        
+    def request(self, endpoint, args=(), **fields):
+        """POST a call to an endpoint and return the decoded response object"""
+        body = json.dumps(dict(fields, args=list(args))).encode("utf-8")
+        request = urllib.request.Request(f"{self.url}/api/{endpoint}", data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                payload = json.loads(e.read())
+            except ValueError:
+                raise ServiceError(f"The service failed with status {e.code}") from None
+            error = REMOTE_EXCEPTIONS.get(payload.get("type"), ServiceError)
+            raise error(payload.get("error") or f"The service failed with status {e.code}") from None
+        except urllib.error.URLError as e:
+            raise ServiceError(f"Cannot reach the service at {self.url}: {e.reason}") from None
+        self.own_changes.extend(tuple(change) for change in payload.get("changes", ()))
+        return payload
+            
+    def call(self, endpoint, *args):
+        """Call an endpoint and return its result"""
+        return self.request(endpoint, args)["result"]
+        
+    def authenticate_user(self, username, password, role):
+        """Log in and return the user's model, or None if the credentials are wrong"""
+        result = self.call("login", username, password, role)
+        if result is None:
+            return None
+        self.token = result["token"]
+        return USER_MODELS[result["role"]](*result["user"], None)
+        
+    def logout(self):
+        """End the session on the service"""
+        if self.token is None:
+            return
+        try:
+            self.call("logout")
+        except ServiceError:
+            pass  # The session is dropped with the server anyway
+        self.token = None
+
+class RemoteSource:
+    """Row source for ui_components.VirtualTreeview served by a *_source endpoint"""
+    def __init__(self, client, endpoint, args):
+        self.client = client
+        self.endpoint = endpoint
+        self.args = args
+        # Reported by the service with every response
+        self.key_ordered = False
+        # Sort keys of window edges by offset, as in data_access.QuerySource
+        self.edges = OrderedDict()
+        self.edges_lock = threading.Lock()
+        self.edges_generation = 0
+        
+    def request(self, op, **fields):
+        """Run op on the service's row source and return the response"""
+        response = self.client.request(self.endpoint, self.args, op=op, **fields)
+        self.key_ordered = response.get("key_ordered", False)
+        return response
+        
+    def count(self):
+        """Return the number of rows"""
+        # Rows may have moved since the edges were read
+        self.forget_edges()
+        return self.request("count")["result"]
+        
+    def fetch(self, offset, limit):
+        """Return up to limit rows starting at offset, sending the edges next to the window"""
+        with self.edges_lock:
+            generation = self.edges_generation
+            edges = [[at, self.edges[at]] for at in (offset - 1, offset + limit) if at in self.edges]
+        response = self.request("fetch", offset=offset, limit=limit, edges=edges)
+        with self.edges_lock:
+            if generation == self.edges_generation:
+                for at, key in response.get("edges", ()):
+                    self.edges[at] = key
+                    self.edges.move_to_end(at)
+                while len(self.edges) > data_access.SEEK_EDGES:
+                    self.edges.popitem(last=False)
+        return response["result"]
+        
+    def forget_edges(self):
+        """Forget the edge keys, whose offsets go stale when rows are added or removed"""
+        with self.edges_lock:
+            self.edges.clear()
+            self.edges_generation += 1
+            
+
+    def all(self):
+        """Return every row"""
+        return self.request("all")["result"]
+
+class RemoteChoiceCache:
+    """Stands in for a data_access.ChoiceCache, reading the choices from the service
+    
+    Other clients can change the tables at any time, so nothing is
+    cached here; the service answers from its own cache.
+    """
+    def __init__(self, client, endpoint):
+        self.client = client
+        self.endpoint = endpoint
+        
+    def cached(self):
+        """Return None so the choices are always requested"""
+        return None
+        
+    def get(self):
+        """Return the choices"""
+        return data_access.Choices(self.client.call(self.endpoint))
+
+class RemoteDataAccess:
+    """Stands in for the data_access module
+    
+    Functions the service serves are sent to it; everything else, such
+    as the exception classes and normalize_grade, is data_access's own.
+    """
+    def __init__(self, client):
+        self.client = client
+        self.CHOICE_CACHES = {table: RemoteChoiceCache(client, endpoint)
+                              for table, endpoint in CHOICE_ENDPOINTS.items()}
+        
+    def own_changes(self):
+        """Return the counter ranges this client's writes through the service made, oldest first"""
+        return list(self.client.own_changes)
+        
+    def __getattr__(self, name):
+        if name not in ENDPOINTS:
+            return getattr(data_access, name)
+        if name.endswith("_source"):
+            return lambda *args: RemoteSource(self.client, name, args)
+        if name.endswith("_choices"):
+            return lambda: data_access.Choices(self.client.call(name))
+        return lambda *args: self.client.call(name, *args)
+
+class RemoteReport:
+    """Report of a bulk operation run on the service"""
+    def __init__(self, text):
+        self.text = text
+        
+    def summary(self):
+        """Return the summary the service produced"""
+        return self.text
+
+class RemoteBulkIO:
+    """Stands in for bulk_io, uploading and downloading the CSV files"""
+    def __init__(self, client):
+        self.client = client
+        
+    def import_csv(self, entity, path):
+        """Send a CSV file to the service to import and return its report"""
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            text = f.read()
+        return RemoteReport(self.client.call("import_csv", entity, text))
+        
+    def export_csv(self, entity, path):
+        """Write an entity's rows exported by the service to a CSV file and return the number written"""
+        written, text = self.client.call("export_csv", entity)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            f.write(text)
+        return written
+
+class RemoteRoomAllocation:
+    """Stands in for room_allocation"""
+    def __init__(self, client):
+        self.client = client
+        
+    def allocate_rooms(self, semester=None, unassigned_only=False, dry_run=False):
+        """Allocate rooms on the service and return its report"""
+        return RemoteReport(self.client.call("allocate_rooms", semester, unassigned_only, dry_run))
\ No newline at end of file
@@ -2,17 +2,22 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 
-from config import DATABASE_NAME
-from ui_components import create_label, create_entry, create_combobox, create_button
+import data_access
+from ui_components import create_label, create_combobox
 from ui_components import create_treeview, create_form_frame, create_tree_frame
+from ui_components import create_busy_indicator, set_busy
+from query_executor import QueryExecutor
+from change_watcher import ChangeWatcher
 
 class StudentDashboard:
-    def __init__(self, root, user):
+    def __init__(self, root, user, service=None):
         self.root = root
         self.current_user = user
         self.logout_callback = None
+        # Calls go to the HTTP service when the client uses one, else straight to the database
+        self.data_access = service.data_access if service else data_access
+        self.available_course_id_map = {}
         self.create_dashboard()
         
     def set_logout_callback(self, callback):
@@ -36,6 +41,10 @@ class StudentDashboard:
         logout_button = ttk.Button(header_frame, text="Logout", command=self.logout)
         logout_button.pack(side=tk.RIGHT)
         
+        # Queries run in the background while the busy indicator is shown
+        self.busy_indicator = create_busy_indicator(header_frame)
+        self.executor = QueryExecutor(self.root, lambda busy: set_busy(self.busy_indicator, busy))
+        
         # Notebook for tabs
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
@@ -51,8 +60,20 @@ class StudentDashboard:
         self.create_available_courses_tab()
         self.create_my_courses_tab()
         
+        # Refresh the views whose tables change; enrolling reloads both lists and
+        # patches the course's catalog row itself
+        self.watcher = ChangeWatcher(self.root, self.data_access)
+        self.watcher.watch(["Course", "Section", "Enrollment"], self.load_available_courses,
+                           patched=["Section", "Enrollment"])
+        self.watcher.watch(["Course", "Section", "Professor", "Department"],
+                           lambda: self.executor.refresh_tree(self.available_courses_tree), patched=["Section"])
+        self.watcher.watch(["Enrollment", "Section", "Course", "Professor", "Department", "GradePoint"],
+                           self.load_my_courses, patched=["Enrollment", "Section"])
+        
     def logout(self):
         """Logout and return to login screen"""
+        self.watcher.stop()
+        self.executor.shutdown()
         if self.logout_callback:
             self.logout_callback()
         
@@ -74,25 +95,19 @@ class StudentDashboard:
         tree_frame = create_tree_frame(self.available_courses_tab, "Available Courses")
         
         # Create treeview
-        columns = ("ID", "Name", "Credits", "Professor", "Department")
-        headings = ("ID", "Course Name", "Credits", "Professor", "Department")
-        widths = (50, 200, 70, 150, 150)
+        columns = ("ID", "Name", "Credits", "Professor", "Department", "Seats")
+        headings = ("ID", "Course Name", "Credits", "Professor", "Department", "Seats Left")
+        widths = (50, 200, 70, 150, 150, 80)
         self.available_courses_tree = create_treeview(tree_frame, columns, headings, widths)
         self.load_available_courses_list()
         
     def load_available_courses(self):
         """Load available courses to combobox"""
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT c.course_id, c.course_name 
-            FROM Course c
-            LEFT JOIN Enrollment e ON c.course_id = e.section_id 
-            WHERE e.student_id IS NULL OR e.student_id != ?
-        """, (self.current_user.student_id,))
-        courses = cursor.fetchall()
+        self.executor.submit("available_course_combobox", self.data_access.available_courses,
+                             self.current_user.student_id, on_success=self.fill_available_courses)
         
+    def fill_available_courses(self, courses):
+        """Fill the enrollment combobox with fetched courses"""
         # Create a list of course names for the combobox
         course_names = [course[1] for course in courses]
         self.available_course_combobox['values'] = course_names
@@ -100,80 +115,56 @@ class StudentDashboard:
         # Create a mapping for course_id lookup
         self.available_course_id_map = {course[1]: course[0] for course in courses}
         
-        conn.close()
-        
     def load_available_courses_list(self):
         """Load available courses to treeview"""
-        # Clear existing data
-        for item in self.available_courses_tree.get_children():
-            self.available_courses_tree.delete(item)
-            
-        # Fetch data
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT c.course_id, c.course_name, c.credits, p.name, d.dept_name
-            FROM Course c
-            LEFT JOIN Professor p ON c.professor_id = p.professor_id
-            LEFT JOIN Department d ON c.dept_id = d.dept_id
-        """)
-        courses = cursor.fetchall()
-        
-        # Insert data
-        for course in courses:
-            self.available_courses_tree.insert("", tk.END, values=course)
-            
-        conn.close()
+        # Fetch data in the background, then a window at a time as the tree scrolls
+        self.executor.load_tree(self.available_courses_tree, self.data_access.course_catalog_source(), key_column=0)
             
     def enroll_in_course(self):
-        """Enroll student in selected course"""
+        """Enroll student in selected course in the background"""
         course_name = self.available_course_combobox.get()
         
         if not course_name:
             messagebox.showerror("Error", "Please select a course")
             return
             
-        try:
-            # Get course ID
-            course_id = self.available_course_id_map.get(course_name)
-            
-            # Check if already enrolled
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT * FROM Enrollment WHERE student_id=? AND section_id=?", 
-                          (self.current_user.student_id, course_id))
-            if cursor.fetchone():
-                messagebox.showerror("Error", "You are already enrolled in this course")
-                conn.close()
-                return
-                
-            # Create a section for this course if it doesn't exist
-            cursor.execute("SELECT * FROM Section WHERE course_id=?", (course_id,))
-            section = cursor.fetchone()
-            if not section:
-                # Create a new section
-                cursor.execute("INSERT INTO Section (course_id, room_no, time_slot) VALUES (?, ?, ?)", 
-                              (course_id, "TBD", "TBD"))
-                conn.commit()
-                cursor.execute("SELECT * FROM Section WHERE course_id=?", (course_id,))
-                section = cursor.fetchone()
-                
-            # Enroll student
-            cursor.execute("INSERT INTO Enrollment (student_id, section_id, grade) VALUES (?, ?, ?)", 
-                          (self.current_user.student_id, section[0], "N/A"))
-            conn.commit()
-            conn.close()
+        # Get course ID
+        course_id = self.available_course_id_map.get(course_name)
+        
+        # Check enrollment and enroll in one transaction, off the Tk thread
+        self.executor.submit(f"enroll_student.{course_id}", self.data_access.enroll_student,
+                             self.current_user.student_id, course_id,
+                             on_success=lambda enrollment_id: self.show_enrollment(course_id),
+                             on_error=self.show_enrollment_error)
+        
+    def show_enrollment(self, course_id):
+        """Confirm an enrollment and refresh the views it changed"""
+        messagebox.showinfo("Success", "Enrolled in course successfully")
+        self.load_available_courses()  # Refresh available courses
+        self.load_my_courses()  # Refresh my courses
+        
+        # Show the course's new seat count without reloading the list
+        self.executor.submit(f"course_catalog_row.{course_id}", self.data_access.course_catalog_row, course_id,
+                             on_success=self.show_catalog_row)
+        
+    def show_enrollment_error(self, error):
+        """Show why an enrollment was refused or failed"""
+        if isinstance(error, data_access.EnrollmentError):
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showerror("Error", f"Failed to enroll: {str(error)}")
             
-            messagebox.showinfo("Success", "Enrolled in course successfully")
-            self.load_available_courses()  # Refresh available courses
-            self.load_my_courses()  # Refresh my courses
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to enroll: {str(e)}")
+    def show_catalog_row(self, row):
+        """Patch a course's fetched catalog row in place, reloading the list when that is not possible"""
+        if row is None or not self.available_courses_tree.update_row(row):
+            self.load_available_courses_list()
             
     def create_my_courses_tab(self):
         """Create the my courses tab for students"""
+        # GPA and credit totals above the course list
+        self.summary_label = ttk.Label(self.my_courses_tab, font=("Arial", 11, "bold"))
+        self.summary_label.pack(side=tk.TOP, anchor=tk.W, padx=10, pady=(10, 0))
+        
         # Create tree frame
         tree_frame = create_tree_frame(self.my_courses_tab, "My Courses")
         
@@ -186,27 +177,30 @@ class StudentDashboard:
         
     def load_my_courses(self):
         """Load student's enrolled courses"""
+        # Fetch data in the background
+        self.executor.submit("my_courses", self.data_access.student_courses, self.current_user.student_id,
+                             on_success=self.show_my_courses)
+        self.executor.submit("my_summary", self.data_access.student_summary, self.current_user.student_id,
+                             on_success=self.show_summary)
+        
+    def show_summary(self, summary):
+        """Show the student's GPA, credits and class rank"""
+        if summary is None:
+            self.summary_label.config(text="")
+            return
+        gpa, attempted, earned, rank, ranked = summary
+        if gpa is None:
+            text = "GPA: not graded yet"
+        else:
+            text = f"GPA: {gpa:.2f}   Class rank: {rank} of {ranked}"
+        self.summary_label.config(text=f"{text}   Credits earned: {earned} of {attempted} attempted")
+        
+    def show_my_courses(self, courses):
+        """Show fetched enrolled courses in the treeview"""
         # Clear existing data
         for item in self.my_courses_tree.get_children():
             self.my_courses_tree.delete(item)
             
-        # Fetch data
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT c.course_id, c.course_name, c.credits, p.name, d.dept_name, e.grade
-            FROM Enrollment e
-            JOIN Section s ON e.section_id = s.section_id
-            JOIN Course c ON s.course_id = c.course_id
-            LEFT JOIN Professor p ON c.professor_id = p.professor_id
-            LEFT JOIN Department d ON c.dept_id = d.dept_id
-            WHERE e.student_id = ?
-        """, (self.current_user.student_id,))
-        courses = cursor.fetchall()
-        
         # Insert data
         for course in courses:
-            self.my_courses_tree.insert("", tk.END, values=course)
-            
-        conn.close()
\ No newline at end of file
+            self.my_courses_tree.insert("", tk.END, values=course)
\ No newline at end of file
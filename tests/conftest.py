@@ -0,0 +1,42 @@
+"""Fixtures shared by the tests
+
+Every test gets a new database file in its own temporary directory, so
+tests never touch university.db or each other's rows.
+"""
+
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_access
+import database
+
+# Names repeat, and some emails are missing, so sorted orders have ties and NULLs
+NAMES = ["Aarav Shah", "alice Khan", "Bob Lee", "Aarav Singh", "Zoe Park", "bob lee", "Mia Chen"]
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Point the application at a new, migrated database"""
+    # slow_queries.log is written to the working directory
+    monkeypatch.chdir(tmp_path)
+    database.use_database(str(tmp_path / "university.db"))
+    database.create_database()
+    data_access.QUERY_CACHE.clear()
+    for table in data_access.CHOICE_CACHES:
+        data_access.invalidate_choices(table)
+    yield
+    database.close_connections()
+    data_access.QUERY_CACHE.clear()
+
+@pytest.fixture
+def students(db):
+    """Add 450 students and return their IDs"""
+    rows = [(NAMES[i * 3 % len(NAMES)], None if i % 5 == 0 else f"s{i}@uni.edu", f"2000-01-{i % 28 + 1:02d}",
+             f"student{i}", "pw") for i in range(450)]
+    with database.transaction() as cursor:
+        cursor.executemany("INSERT INTO Student (name, email, dob, username, password) VALUES (?, ?, ?, ?, ?)", rows)
+    return [student_id for (student_id,) in data_access.fetch_all("SELECT student_id FROM Student ORDER BY student_id")]
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""Enrollment rules: available courses, full courses, repeats and timetable clashes"""
+
+import pytest
+
+import data_access
+from data_access import EnrollmentError
+
+@pytest.fixture
+def catalog(db):
+    """A department, a professor and three courses; two meet at the same time"""
+    dept_id = data_access.add_department("Computing", "Block A")
+    professor_id = data_access.add_professor("Ada Byron", "ada@uni.edu", dept_id, "ada", "pw")
+    courses = {name: data_access.add_course(name, 3, "Fall", dept_id, professor_id)
+               for name in ("Databases", "Networks", "Compilers")}
+    sections = {
+        "Databases": data_access.add_section(courses["Databases"], "R1", "Mon 9:00-10:30", capacity=1),
+        "Networks": data_access.add_section(courses["Networks"], "R2", "Mon 10:00-11:00"),
+    }
+    students = [data_access.add_student(f"Student {i}", f"s{i}@uni.edu", "2000-01-01", f"s{i}", "pw")
+                for i in range(3)]
+    return professor_id, courses, sections, students
+
+def enrollments(student_id):
+    """Return the course IDs a student is enrolled in"""
+    rows = data_access.fetch_all("""
+        SELECT s.course_id FROM Enrollment e JOIN Section s ON s.section_id = e.section_id
+        WHERE e.student_id = ? ORDER BY s.course_id
+    """, (student_id,))
+    return [course_id for (course_id,) in rows]
+
+def test_available_courses_leave_out_enrolled_courses(catalog):
+    _, courses, _, students = catalog
+    data_access.enroll_student(students[0], courses["Compilers"])
+    available = [course_id for course_id, _ in data_access.available_courses(students[0])]
+    assert available == [courses["Databases"], courses["Networks"]]
+
+def test_available_courses_leave_out_full_courses(catalog):
+    _, courses, _, students = catalog
+    data_access.enroll_student(students[0], courses["Databases"])
+    available = [course_id for course_id, _ in data_access.available_courses(students[1])]
+    assert courses["Databases"] not in available
+    assert courses["Compilers"] in available  # No section yet, so one is created on enrollment
+
+def test_enrolling_twice_is_refused(catalog):
+    _, courses, _, students = catalog
+    data_access.enroll_student(students[0], courses["Networks"])
+    with pytest.raises(EnrollmentError, match="already enrolled"):
+        data_access.enroll_student(students[0], courses["Networks"])
+    assert enrollments(students[0]) == [courses["Networks"]]
+
+def test_enrolling_in_a_full_course_is_refused(catalog):
+    _, courses, _, students = catalog
+    data_access.enroll_student(students[0], courses["Databases"])
+    with pytest.raises(EnrollmentError, match="full"):
+        data_access.enroll_student(students[1], courses["Databases"])
+    assert enrollments(students[1]) == []
+
+def test_enrolling_in_a_clashing_course_is_refused(catalog):
+    _, courses, _, students = catalog
+    data_access.enroll_student(students[0], courses["Databases"])
+    with pytest.raises(EnrollmentError, match="clashes with Databases"):
+        data_access.enroll_student(students[0], courses["Networks"])
+    assert enrollments(students[0]) == [courses["Databases"]]
+
+def test_enrolling_in_a_course_without_sections_creates_one(catalog):
+    _, courses, _, students = catalog
+    data_access.enroll_student(students[0], courses["Compilers"])
+    data_access.enroll_student(students[1], courses["Compilers"])
+    sections = data_access.fetch_all("SELECT section_id FROM Section WHERE course_id = ?", (courses["Compilers"],))
+    assert len(sections) == 1
+
+def enroll_one_by_one(requests):
+    """Enroll (student_id, course_id) requests through enroll_student; returns (section_id, outcome) each"""
+    results = []
+    for student_id, course_id in requests:
+        try:
+            enrollment_id = data_access.enroll_student(student_id, course_id)
+        except EnrollmentError as error:
+            outcome = data_access.TIMETABLE_CLASH if "clashes" in str(error) else data_access.COURSE_FULL
+            results.append((None, outcome))
+            continue
+        section = data_access.fetch_one("SELECT section_id FROM Enrollment WHERE enrollment_id = ?", (enrollment_id,))
+        results.append((section[0], data_access.ENROLLED))
+    return results
+
+def enroll_as_batch(requests):
+    """Enroll (student_id, course_id) requests through enroll_students; returns (section_id, outcome) each"""
+    return [(section_id, outcome) for _, _, section_id, outcome, _ in data_access.enroll_students(requests).results]
+
+@pytest.mark.parametrize("enroll", [enroll_one_by_one, enroll_as_batch])
+def test_clashing_request_leaves_the_seat_to_the_next_one(catalog, enroll):
+    _, courses, sections, students = catalog
+    data_access.enroll_student(students[0], courses["Networks"])
+    results = enroll([(students[0], courses["Databases"]), (students[1], courses["Databases"])])
+    assert results == [(None, data_access.TIMETABLE_CLASH), (sections["Databases"], data_access.ENROLLED)]
+
+@pytest.mark.parametrize("enroll", [enroll_one_by_one, enroll_as_batch])
+def test_clashing_request_takes_another_free_section(catalog, enroll):
+    _, courses, sections, students = catalog
+    later = data_access.add_section(courses["Databases"], "R3", "Tue 9:00-10:30")
+    data_access.enroll_student(students[0], courses["Networks"])
+    results = enroll([
+        (students[0], courses["Databases"]),
+        # The first Databases section clashes with the Networks request just before it
+        (students[2], courses["Networks"]),
+        (students[2], courses["Databases"]),
+        (students[1], courses["Databases"]),
+    ])
+    assert results == [
+        (later, data_access.ENROLLED),
+        (sections["Networks"], data_access.ENROLLED),
+        (later, data_access.ENROLLED),
+        (sections["Databases"], data_access.ENROLLED),
+    ]
+
+def test_batch_enrollment_reports_each_refusal(catalog):
+    _, courses, sections, students = catalog
+    report = data_access.enroll_students([
+        (students[0], courses["Databases"]),
+        (students[1], courses["Databases"]),
+        (students[0], courses["Networks"]),
+        (students[2], courses["Networks"], sections["Databases"]),
+        (students[2], 999),
+    ])
+    assert report.enrolled == 1
+    assert report.rejected() == [
+        (1, data_access.COURSE_FULL),
+        (2, data_access.TIMETABLE_CLASH),
+        (3, data_access.WRONG_COURSE),
+        (4, data_access.UNKNOWN_COURSE),
+    ]
\ No newline at end of file
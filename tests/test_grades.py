@@ -0,0 +1,61 @@
+"""Saving grades: validation, ownership and the GPA summary they update"""
+
+import pytest
+
+import data_access
+from data_access import GradeError
+
+@pytest.fixture
+def graded_course(db):
+    """Two professors' courses with one student enrolled in each; returns their IDs"""
+    dept_id = data_access.add_department("Computing", "Block A")
+    own = data_access.add_professor("Ada Byron", "ada@uni.edu", dept_id, "ada", "pw")
+    other = data_access.add_professor("Alan Turing", "alan@uni.edu", dept_id, "alan", "pw")
+    own_course = data_access.add_course("Databases", 4, "Fall", dept_id, own)
+    other_course = data_access.add_course("Networks", 3, "Fall", dept_id, other)
+    student_id = data_access.add_student("Grace Hopper", "grace@uni.edu", "2000-01-01", "grace", "pw")
+    own_enrollment = data_access.enroll_student(student_id, own_course)
+    other_enrollment = data_access.enroll_student(student_id, other_course)
+    return own, student_id, own_enrollment, other_enrollment
+
+def grade_of(enrollment_id):
+    """Return the grade stored for an enrollment"""
+    return data_access.fetch_one("SELECT grade FROM Enrollment WHERE enrollment_id = ?", (enrollment_id,))[0]
+
+def test_grades_are_normalized_and_update_the_summary(graded_course):
+    professor_id, student_id, enrollment_id, _ = graded_course
+    assert data_access.save_grades(professor_id, [(enrollment_id, " a- ")]) == 1
+    assert grade_of(enrollment_id) == "A-"
+    gpa, attempted, earned, rank, ranked = data_access.student_summary(student_id)
+    assert (gpa, attempted, earned, rank, ranked) == (pytest.approx(3.7), 4, 4, 1, 1)
+
+def test_blank_grade_clears_the_grade(graded_course):
+    professor_id, student_id, enrollment_id, _ = graded_course
+    data_access.save_grades(professor_id, [(enrollment_id, "B")])
+    data_access.save_grades(professor_id, [(enrollment_id, "")])
+    assert grade_of(enrollment_id) == data_access.UNGRADED
+    assert data_access.student_summary(student_id)[0] is None
+
+def test_unknown_grade_saves_nothing(graded_course):
+    professor_id, _, enrollment_id, _ = graded_course
+    with pytest.raises(GradeError, match="'Q' is not a grade"):
+        data_access.save_grades(professor_id, [(enrollment_id, "A"), (enrollment_id, "Q")])
+    assert grade_of(enrollment_id) == data_access.UNGRADED
+
+def test_another_professors_enrollment_saves_nothing(graded_course):
+    professor_id, _, enrollment_id, other_enrollment = graded_course
+    with pytest.raises(GradeError, match="1 of the enrollments"):
+        data_access.save_grades(professor_id, [(enrollment_id, "A"), (other_enrollment, "A")])
+    assert grade_of(enrollment_id) == data_access.UNGRADED
+    assert grade_of(other_enrollment) == data_access.UNGRADED
+
+def test_class_rank_counts_better_gpas_only(db):
+    dept_id = data_access.add_department("Computing", "Block A")
+    professor_id = data_access.add_professor("Ada Byron", "ada@uni.edu", dept_id, "ada", "pw")
+    course_id = data_access.add_course("Databases", 3, "Fall", dept_id, professor_id)
+    students = [data_access.add_student(f"Student {i}", f"s{i}@uni.edu", "2000-01-01", f"s{i}", "pw")
+                for i in range(4)]
+    enrollment_ids = [data_access.enroll_student(student_id, course_id) for student_id in students]
+    data_access.save_grades(professor_id, list(zip(enrollment_ids, ["B", "A", "B", "N/A"])))
+    ranks = [data_access.student_summary(student_id)[3:] for student_id in students]
+    assert ranks == [(2, 3), (1, 3), (2, 3), (None, 3)]
\ No newline at end of file
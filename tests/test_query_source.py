@@ -0,0 +1,94 @@
+"""Windows read by QuerySource, by OFFSET and by seeking from remembered edges"""
+
+import pytest
+
+import data_access
+
+WINDOW = 100
+
+# Key order, a column with ties, the same descending, and a column with NULLs
+SORTS = [None, (1, False), (1, True), (2, False)]
+
+def expected(sort, offset, limit=WINDOW):
+    """Return a window read by OFFSET alone, from a source that has no edges"""
+    return data_access.students_source(None, sort).fetch(offset, limit)
+
+def count_seeks(source, monkeypatch):
+    """Count the windows source reads by seeking"""
+    seeks = []
+    seek = source.seek
+    monkeypatch.setattr(source, "seek", lambda *args, **kwargs: seeks.append(args) or seek(*args, **kwargs))
+    return seeks
+
+@pytest.mark.parametrize("sort", SORTS)
+def test_scrolling_forward_seeks_to_the_offset_windows(students, sort, monkeypatch):
+    source = data_access.students_source(None, sort)
+    seeks = count_seeks(source, monkeypatch)
+    for offset in range(0, len(students), WINDOW):
+        assert source.fetch(offset, WINDOW) == expected(sort, offset)
+    assert len(seeks) == len(students) // WINDOW
+
+@pytest.mark.parametrize("sort", SORTS)
+def test_scrolling_backward_seeks_to_the_offset_windows(students, sort, monkeypatch):
+    source = data_access.students_source(None, sort)
+    last = len(students) // WINDOW * WINDOW
+    source.fetch(last, WINDOW)
+    seeks = count_seeks(source, monkeypatch)
+    for offset in range(last - WINDOW, -1, -WINDOW):
+        assert source.fetch(offset, WINDOW) == expected(sort, offset)
+    assert len(seeks) == last // WINDOW - 1  # The first window needs no seek
+
+def test_sorted_order_is_unique_and_complete(students):
+    rows = data_access.students_source(None, (1, False)).all()
+    assert sorted(row[0] for row in rows) == students
+    keys = [(row[1].lower(), row[0]) for row in rows]
+    assert keys == sorted(keys)
+
+@pytest.mark.parametrize("sort", SORTS)
+def test_windows_after_a_delete_match_offset_windows(students, sort):
+    source = data_access.students_source(None, sort)
+    first = source.fetch(0, WINDOW)
+    source.fetch(WINDOW, WINDOW)
+    data_access.delete_student(first[5][0])
+    # What VirtualTreeview.remove_row does after patching its blocks
+    source.forget_edges()
+    window = source.fetch(WINDOW, WINDOW)
+    assert window == expected(sort, WINDOW)
+    assert first[-1] not in window
+
+@pytest.mark.parametrize("sort", SORTS)
+def test_windows_after_an_add_match_offset_windows(students, sort):
+    source = data_access.students_source(None, sort)
+    source.fetch(0, WINDOW)
+    source.fetch(WINDOW, WINDOW)
+    data_access.add_student("Aaron Abbott", "a@uni.edu", "2001-01-01", "aaron", "pw")
+    source.forget_edges()
+    assert source.fetch(2 * WINDOW, WINDOW) == expected(sort, 2 * WINDOW)
+
+def test_count_forgets_edges(students):
+    source = data_access.students_source(None, (1, False))
+    source.fetch(0, WINDOW)
+    assert source.edges
+    source.count()
+    assert not source.edges
+
+def test_window_read_while_edges_are_forgotten_is_not_remembered(students, monkeypatch):
+    source = data_access.students_source(None, (1, False))
+    query_rows = source.query_rows
+    
+    def patched_meanwhile(offset, limit):
+        rows = query_rows(offset, limit)
+        source.forget_edges()
+        return rows
+        
+    monkeypatch.setattr(source, "query_rows", patched_meanwhile)
+    source.fetch(0, WINDOW)
+    assert not source.edges
+
+def test_search_results_are_paged_by_offset(students, monkeypatch):
+    source = data_access.students_source("aarav")
+    seeks = count_seeks(source, monkeypatch)
+    rows = source.fetch(0, WINDOW) + source.fetch(WINDOW, WINDOW)
+    assert not seeks
+    assert sorted(row[0] for row in rows) == sorted(row[0] for row in source.all())
+    assert all(row[1].lower().startswith("aarav") for row in rows)
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""Windows read through the HTTP service, seeking from the edges the client sends back"""
+
+import threading
+
+import pytest
+
+import data_access
+from config import DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD
+from service import ServiceServer
+from service_client import ServiceClient
+
+WINDOW = 100
+
+@pytest.fixture
+def client(db):
+    """An admin logged in to a service on a free local port"""
+    server = ServiceServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = ServiceClient(f"http://127.0.0.1:{server.server_address[1]}")
+    client.authenticate_user(DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD, "Admin")
+    yield client
+    client.logout()
+    server.shutdown()
+    server.server_close()
+
+def count_seeks(monkeypatch):
+    """Count the windows every QuerySource reads by seeking, on any thread"""
+    seeks = []
+    seek = data_access.QuerySource.seek
+    monkeypatch.setattr(data_access.QuerySource, "seek",
+                        lambda self, *args, **kwargs: seeks.append(args) or seek(self, *args, **kwargs))
+    return seeks
+
+@pytest.mark.parametrize("sort", [None, (1, False), (2, True)])
+def test_scrolling_through_the_service_seeks(client, students, sort, monkeypatch):
+    seeks = count_seeks(monkeypatch)
+    source = client.data_access.students_source(None, sort)
+    rows = []
+    for offset in range(0, len(students), WINDOW):
+        rows.extend(source.fetch(offset, WINDOW))
+    assert rows == [list(row) for row in data_access.students_source(None, sort).all()]
+    assert len(seeks) == len(students) // WINDOW
+
+def test_count_through_the_service_forgets_edges(client, students, monkeypatch):
+    seeks = count_seeks(monkeypatch)
+    source = client.data_access.students_source(None, (1, False))
+    source.fetch(0, WINDOW)
+    source.count()
+    assert not source.edges
+    expected = data_access.students_source(None, (1, False)).fetch(WINDOW, WINDOW)
+    assert source.fetch(WINDOW, WINDOW) == [list(row) for row in expected]
+    assert not seeks
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""Reading time slots into meetings"""
+
+import logging
+
+import pytest
+
+import data_access
+import timetable
+
+@pytest.mark.parametrize("time_slot, meetings", [
+    ("Mon 9:00-10:30", [(0, 540, 630)]),
+    ("MWF 9-10", [(0, 540, 600), (2, 540, 600), (4, 540, 600)]),
+    ("Mon 13-14", [(0, 780, 840)]),
+    ("TuTh 2:00 PM - 3:15 PM", [(1, 840, 915), (3, 840, 915)]),
+    ("Mon 2-3:30pm", [(0, 840, 930)]),
+    ("Mon 12-1", [(0, 720, 780)]),  # Noon to 1 pm
+    ("Mon 11-1", [(0, 660, 780)]),
+    ("TBD", []),
+])
+def test_time_slots_are_read_as_meetings(time_slot, meetings):
+    assert timetable.parse_time_slot(time_slot) == meetings
+
+@pytest.mark.parametrize("time_slot", ["Mon 9-9", "Mon 11pm-1", "Mon 25-26", "Someday 9-10"])
+def test_unreadable_time_slots_are_refused(time_slot):
+    with pytest.raises(ValueError):
+        timetable.parse_time_slot(time_slot)
+
+def test_unreadable_stored_slot_is_logged(db, caplog):
+    with caplog.at_level(logging.WARNING, logger="timetable"):
+        section_id = data_access.add_section(None, "R1", "Mon 9-9")
+    assert f"Section {section_id} is left unscheduled" in caplog.text
\ No newline at end of file
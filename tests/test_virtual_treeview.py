@@ -0,0 +1,61 @@
+"""VirtualTreeview rows patched in place over a seeking row source; needs a display for Tk"""
+
+import tkinter as tk
+
+import pytest
+
+import data_access
+from ui_components import VIRTUAL_BLOCK_SIZE, create_treeview
+
+COLUMNS = ("ID", "Name", "Email", "DOB", "Username")
+
+@pytest.fixture
+def root():
+    """A hidden Tk root window"""
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display for Tk")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+def student_tree(root, sort):
+    """Return a tree listing the students in sort order, as the admin Students tab does"""
+    tree = create_treeview(root, COLUMNS, COLUMNS, (50,) * len(COLUMNS))
+    tree.sort = sort
+    tree.set_row_source(data_access.students_source(None, sort), key_column=0)
+    return tree
+
+def shown_rows(tree):
+    """Return every row the tree shows when scrolled from top to bottom"""
+    return tree._rows(0, tree.row_count())
+
+@pytest.mark.parametrize("sort", [None, (1, False), (2, True)])
+def test_rows_after_remove_row_are_not_repeated(root, students, sort):
+    tree = student_tree(root, sort)
+    # Read the second block by seeking from the first one's last row
+    second = tree._rows(VIRTUAL_BLOCK_SIZE, 1)[0]
+    removed = tree._rows(5, 1)[0][0]
+    data_access.delete_student(removed)
+    assert tree.remove_row(removed)
+    
+    rows = shown_rows(tree)
+    assert rows == data_access.students_source(None, sort).all()
+    assert second in rows
+
+def test_add_row_makes_the_source_forget_its_edges(root, students):
+    tree = student_tree(root, None)
+    tree._rows(VIRTUAL_BLOCK_SIZE, 1)
+    assert tree.row_source.edges
+    student_id = data_access.add_student("Aaron Abbott", "a@uni.edu", "2001-01-01", "aaron", "pw")
+    assert tree.add_row(data_access.student_row(student_id))
+    assert not tree.row_source.edges
+    assert shown_rows(tree) == data_access.students_source().all()
+
+def test_update_row_reloads_when_the_sorted_column_changes(root, students):
+    tree = student_tree(root, (1, False))
+    row = tree._rows(3, 1)[0]
+    assert tree.update_row(row[:1] + ("Zed",) + row[2:]) is False
+    assert tree.update_row(row[:2] + ("new@uni.edu",) + row[3:]) is True
+    assert tree._rows(3, 1)[0][2] == "new@uni.edu"
\ No newline at end of file
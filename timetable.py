@@ -0,0 +1,156 @@
+"""Timetable parsing and clash detection for the University Management System
+
+Section.time_slot stays free text for display, but every slot is parsed
+into (day, start, end) meetings stored in SectionMeeting. Triggers copy
+the meetings of each enrolled section into StudentMeeting, indexed by
+(student_id, day, start_minute), so checking a section against a
+student's timetable is an index range lookup however large the term is.
+
+Accepted slots look like "Mon 9:00-10:30", "Mon/Wed 14:00-15:30",
+"MWF 9-10", "TuTh 2:00 PM - 3:15 PM" or several of those separated by
+";". Times without am/pm are read as 24-hour times, except that a bare
+end before its start is in the afternoon, so "Mon 12-1" ends at 13:00.
+An empty slot or "TBD" has no meetings and never clashes.
+"""
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# Day words and their abbreviations -> day number (Monday is 0)
+DAY_WORDS = {
+    "monday": 0, "mon": 0, "m": 0,
+    "tuesday": 1, "tues": 1, "tue": 1, "tu": 1, "t": 1,
+    "wednesday": 2, "wed": 2, "w": 2,
+    "thursday": 3, "thurs": 3, "thur": 3, "thu": 3, "th": 3, "r": 3,
+    "friday": 4, "fri": 4, "f": 4,
+    "saturday": 5, "sat": 5, "sa": 5,
+    "sunday": 6, "sun": 6, "su": 6,
+}
+
+# Letters used in compact day lists such as "MWF" or "TuTh", longest first
+DAY_LETTERS = re.compile(r"th|tu|sa|su|m|t|w|r|f")
+
+TIME = r"\d{1,2}(?::\d{2})?\s*(?:[ap]\.?m\.?)?"
+MEETING_PATTERN = re.compile(
+    rf"^(?P<days>[a-z][a-z/,&\s]*?)\s*(?P<start>{TIME})\s*(?:-|–|to)\s*(?P<end>{TIME})$")
+
+# Slots that mean the section is not scheduled yet
+UNSCHEDULED = {"", "tbd", "tba", "n/a"}
+
+SLOT_EXAMPLE = "Mon/Wed 09:00-10:30"
+
+def parse_time_slot(time_slot):
+    """Return the (day, start_minute, end_minute) meetings of a time slot
+    
+    Raises ValueError for a slot that cannot be read.
+    """
+    text = (time_slot or "").strip().lower()
+    if text in UNSCHEDULED:
+        return []
+    meetings = []
+    for part in text.split(";"):
+        match = MEETING_PATTERN.match(part.strip())
+        if not match:
+            raise ValueError(f"Time slot '{time_slot}' should look like '{SLOT_EXAMPLE}'")
+        start, end = parse_times(match.group("start"), match.group("end"))
+        if end <= start:
+            raise ValueError(f"Time slot '{time_slot}' ends before it starts")
+        for day in parse_days(match.group("days"), time_slot):
+            if (day, start, end) not in meetings:
+                meetings.append((day, start, end))
+    return meetings
+
+def parse_days(text, time_slot):
+    """Return the day numbers in a day list such as "Mon/Wed" or "MWF" """
+    days = []
+    for word in re.split(r"[/,&\s]+", text.strip()):
+        if word in DAY_WORDS:
+            days.append(DAY_WORDS[word])
+            continue
+        letters = DAY_LETTERS.findall(word)
+        if not word or "".join(letters) != word:
+            raise ValueError(f"Unknown day '{word}' in time slot '{time_slot}'")
+        days.extend(DAY_WORDS[letter] for letter in letters)
+    return sorted(set(days))
+
+def parse_times(start_text, end_text):
+    """Return start and end as minutes after midnight
+    
+    A start without am/pm takes the end's pm when that keeps it before
+    the end, so "2-3:30pm" starts at 14:00, and an end without am/pm
+    before its start is pm, so "12-1" ends at 13:00.
+    """
+    start, start_half = parse_time(start_text)
+    end, end_half = parse_time(end_text)
+    if end_half == "p" and end < 12 * 60:
+        end += 12 * 60
+    if start_half == "p" and start < 12 * 60:
+        start += 12 * 60
+    elif start_half is None and end_half == "p" and start + 12 * 60 < end:
+        start += 12 * 60
+    if end_half is None and end < start and end < 12 * 60:
+        end += 12 * 60
+    return start, end
+
+def parse_time(text):
+    """Return (minutes, "a", "p" or None) for a time such as "9", "09:30" or "2:15 pm" """
+    match = re.match(r"(\d{1,2})(?::(\d{2}))?\s*(?:([ap])\.?m\.?)?$", text.strip())
+    hours, minutes, half = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if minutes >= 60 or hours > 24 or (half and not 1 <= hours <= 12):
+        raise ValueError(f"Invalid time '{text}'")
+    if half and hours == 12:
+        hours = 0
+    return hours * 60 + minutes, half
+
+def format_meeting(day, start, end):
+    """Return a meeting as text, e.g. "Mon 09:00-10:30" """
+    return f"{DAY_NAMES[day]} {start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+
+def meetings_overlap(meetings, others):
+    """Return True if any of the (day, start, end) meetings overlaps one of others"""
+    return any(day == other_day and start < other_end and end > other_start
+               for day, start, end in meetings for other_day, other_start, other_end in others)
+
+def schedule_sections(cursor, sections):
+    """Replace the meetings of (section_id, time_slot) pairs
+    
+    Slots that cannot be parsed leave the section unscheduled, so it is
+    never found clashing, and are logged as a warning; the admin form and
+    CSV imports refuse such slots before they are stored. Triggers keep
+    StudentMeeting in step.
+    """
+    meetings = []
+    section_ids = []
+    for section_id, time_slot in sections:
+        section_ids.append((section_id,))
+        try:
+            parsed = parse_time_slot(time_slot)
+        except ValueError as e:
+            logger.warning("Section %s is left unscheduled: %s", section_id, e)
+            parsed = []
+        meetings.extend((section_id, day, start, end) for day, start, end in parsed)
+    cursor.executemany("DELETE FROM SectionMeeting WHERE section_id = ?", section_ids)
+    cursor.executemany("INSERT INTO SectionMeeting (section_id, day, start_minute, end_minute) VALUES (?, ?, ?, ?)",
+                       meetings)
+
+def clashing_sections(cursor, student_id, section_id):
+    """Return the student's enrolled sections whose meetings overlap section_id's
+    
+    Each of the section's meetings is one range lookup on
+    idx_student_meeting_time. Meetings that only touch, such as 9-10 and
+    10-11, do not clash.
+    """
+    cursor.execute("""
+        SELECT DISTINCT sm.section_id
+        FROM SectionMeeting m
+        JOIN StudentMeeting sm
+          ON sm.student_id = ? AND sm.day = m.day
+         AND sm.start_minute < m.end_minute AND sm.end_minute > m.start_minute
+        WHERE m.section_id = ? AND sm.section_id IS NOT m.section_id
+        ORDER BY sm.section_id
+    """, (student_id, section_id))
+    return [row[0] for row in cursor.fetchall()]
\ No newline at end of file
@@ -1,6 +1,7 @@
 """UI components module for the University Management System"""
 
 import tkinter as tk
+from collections import OrderedDict
 from tkinter import ttk
 
 def create_label(parent, text, row, column, sticky=tk.W, padx=5, pady=5):
@@ -37,7 +38,11 @@ def create_button(parent, text, command, side="left", padx=5):
     return button
 
 def create_treeview(parent, columns, headings, widths):
-    """Create a standardized treeview with scrollbars"""
+    """Create a standardized treeview with scrollbars
+    
+    The returned VirtualTreeview behaves like a plain ttk.Treeview until a
+    row source is attached with set_row_source().
+    """
     # Treeview with scrollbar
     tree_frame = ttk.Frame(parent)
     tree_frame.pack(fill=tk.BOTH, expand=True)
@@ -48,8 +53,8 @@ def create_treeview(parent, columns, headings, widths):
     tree_scroll_x = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL)
     tree_scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
     
-    tree = ttk.Treeview(tree_frame, columns=columns, show="headings", 
-                       yscrollcommand=tree_scroll_y.set, xscrollcommand=tree_scroll_x.set)
+    tree = VirtualTreeview(tree_frame, tree_scroll_y, columns=columns, show="headings",
+                           xscrollcommand=tree_scroll_x.set)
     tree_scroll_y.config(command=tree.yview)
     tree_scroll_x.config(command=tree.xview)
     
@@ -61,6 +66,379 @@ def create_treeview(parent, columns, headings, widths):
     tree.pack(fill=tk.BOTH, expand=True)
     return tree
 
+# Rows fetched per window and number of windows kept in memory by VirtualTreeview
+VIRTUAL_BLOCK_SIZE = 200
+VIRTUAL_CACHED_BLOCKS = 8
+
+class VirtualTreeview(ttk.Treeview):
+    """Treeview that only materializes the rows in its viewport
+    
+    A row source is any object with count() and fetch(offset, limit)
+    methods. Rows are fetched from it in blocks of VIRTUAL_BLOCK_SIZE as
+    the view scrolls, and only the rows that fit in the widget are
+    inserted as Tk items. Without a row source the widget behaves like a
+    plain ttk.Treeview.
+    """
+    def __init__(self, parent, y_scrollbar, **kwargs):
+        super().__init__(parent, yscrollcommand=self._on_native_yscroll, **kwargs)
+        self.y_scrollbar = y_scrollbar
+        self.row_source = None
+        self.key_column = None
+        self.total_rows = 0
+        self.first_row = 0
+        self.blocks = OrderedDict()
+        # Values of selected rows, kept while they are scrolled out of view
+        self.selected_rows = {}
+        # (column position, descending) chosen with a heading made sortable by make_sortable()
+        self.sort = None
+        
+        self.bind("<Configure>", self._on_configure, add="+")
+        self.bind("<Button-1>", self._on_click, add="+")
+        self.bind("<MouseWheel>", self._on_mousewheel, add="+")
+        self.bind("<Button-4>", self._on_mousewheel, add="+")
+        self.bind("<Button-5>", self._on_mousewheel, add="+")
+        self.bind("<Up>", self._on_arrow_key, add="+")
+        self.bind("<Down>", self._on_arrow_key, add="+")
+        self.bind("<Prior>", self._on_page_key, add="+")
+        self.bind("<Next>", self._on_page_key, add="+")
+        
+    def set_row_source(self, row_source, key_column=None, total_rows=None, first_block=None):
+        """Show rows from row_source, using values[key_column] as item ids if given
+        
+        total_rows and first_block can be passed when they were already
+        fetched (e.g. on a background thread) to skip those queries here.
+        """
+        self.row_source = row_source
+        self.key_column = key_column
+        self.first_row = 0
+        self.selected_rows = {}
+        if total_rows is None:
+            self.refresh()
+            return
+        self.blocks.clear()
+        self.total_rows = total_rows
+        if first_block is not None:
+            self.blocks[0] = first_block
+        self._render()
+        
+    def set_total_rows(self, total_rows):
+        """Set the number of rows once it has been counted, after the first rows were shown"""
+        self.total_rows = total_rows
+        self.first_row = max(0, min(self.first_row, self.total_rows - self._visible_rows()))
+        self._render()
+        
+    def clear_row_source(self):
+        """Detach the row source and go back to plain Treeview behaviour"""
+        self.row_source = None
+        self.blocks.clear()
+        self.selected_rows = {}
+        self.delete(*super().get_children())
+        
+    def refresh(self, total_rows=None, blocks=None):
+        """Re-count and re-fetch the row source, keeping the scroll position
+        
+        total_rows and blocks ({block index: rows}) can be passed when
+        they were already fetched, as for set_row_source().
+        """
+        if self.row_source is None:
+            return
+        self.blocks.clear()
+        self.total_rows = self.row_source.count() if total_rows is None else total_rows
+        if blocks:
+            self.blocks.update(blocks)
+        # The source may have shrunk below the scroll position
+        self.first_row = max(0, min(self.first_row, self.total_rows - self._visible_rows()))
+        self._render()
+        
+    def visible_blocks(self):
+        """Return the indexes of the blocks holding the rows in view"""
+        last_row = self.first_row + self._visible_rows() - 1
+        return list(range(self.first_row // VIRTUAL_BLOCK_SIZE, last_row // VIRTUAL_BLOCK_SIZE + 1))
+        
+    def add_row(self, row):
+        """Show a newly inserted row; return False if the view must be reloaded instead
+        
+        Only row sources whose key_ordered attribute is true list new rows
+        last, so only those can take the row without being re-queried.
+        """
+        if self.row_source is None or self.key_column is None or not getattr(self.row_source, "key_ordered", False):
+            return False
+        block_index, position = divmod(self.total_rows, VIRTUAL_BLOCK_SIZE)
+        block = self.blocks.get(block_index)
+        if block is not None:
+            if len(block) != position:
+                return False
+            self.blocks[block_index] = list(block) + [row]
+        self.total_rows += 1
+        self._forget_offsets()
+        self._render()
+        return True
+        
+    def update_row(self, row):
+        """Replace the row with row's key in place; return False if the view must be reloaded instead
+        
+        In a tree sorted by a column (see make_sortable) a row whose value
+        in that column changed, or whose position is unknown, may belong
+        elsewhere in the order, so it is reloaded rather than patched.
+        """
+        if self.row_source is None or self.key_column is None:
+            return False
+        key = str(row[self.key_column])
+        located = [(block_index, position) for block_index, block in self.blocks.items()
+                   for position, cached in enumerate(block) if str(cached[self.key_column]) == key]
+        if self.sort is not None:
+            column = self.sort[0]
+            if not located or any(self.blocks[index][position][column] != row[column] for index, position in located):
+                return False
+        for block_index, position in located:
+            block = self.blocks[block_index] = list(self.blocks[block_index])
+            block[position] = row
+        self._forget_offsets()
+        if key in self.selected_rows:
+            self.selected_rows[key] = tuple(row)
+        if self.exists(key):
+            super().item(key, values=row)
+        return True
+        
+    def remove_row(self, key):
+        """Drop the row with key from the view; return False if the view must be reloaded instead"""
+        if self.row_source is None or self.key_column is None:
+            return False
+        key = str(key)
+        located = None
+        for block_index, block in self.blocks.items():
+            for position, cached in enumerate(block):
+                if str(cached[self.key_column]) == key:
+                    located = (block_index, position)
+        if located is None:
+            return False  # Its position among the rows is unknown
+            
+        # Shift the cached rows after the removed one back by one place
+        block_index, position = located
+        shifted = {}
+        chain = block_index
+        for index in sorted(self.blocks):
+            rows = list(self.blocks[index])
+            if index < block_index:
+                shifted[index] = rows
+            elif index == block_index:
+                del rows[position]
+                shifted[index] = rows
+            elif index == chain + 1:
+                shifted[chain].append(rows.pop(0))
+                shifted[index] = rows
+                chain = index
+            # Blocks after a gap hold rows from stale offsets and are refetched
+        self.total_rows -= 1
+        if chain != max(0, self.total_rows - 1) // VIRTUAL_BLOCK_SIZE:
+            del shifted[chain]  # Now one row short
+        self.blocks = OrderedDict((index, shifted[index]) for index in self.blocks if index in shifted)
+        self._forget_offsets()
+        
+        self.selected_rows.pop(key, None)
+        self.first_row = max(0, min(self.first_row, self.total_rows - self._visible_rows()))
+        self._render()
+        return True
+        
+    def _forget_offsets(self):
+        """Tell the row source that rows were patched locally, so row offsets it keeps may be stale"""
+        forget_edges = getattr(self.row_source, "forget_edges", None)
+        if forget_edges is not None:
+            forget_edges()
+            
+    def row_count(self):
+        """Return the total number of rows in the view"""
+        if self.row_source is None:
+            return len(super().get_children())
+        return self.total_rows
+        
+    def selection(self):
+        """Return selected item ids, including selected rows scrolled out of view"""
+        selected = super().selection()
+        if self.row_source is None:
+            return selected
+        hidden = tuple(iid for iid in self.selected_rows if not self.exists(iid))
+        return tuple(selected) + hidden
+        
+    def item(self, item, option=None, **kwargs):
+        """Return item options, answering for selected rows scrolled out of view"""
+        if self.row_source is not None and not kwargs and item in self.selected_rows and not self.exists(item):
+            values = self.selected_rows[item]
+            return values if option == "values" else {"values": values}
+        return super().item(item, option, **kwargs)
+        
+    def yview(self, *args):
+        """Scroll through the row source instead of the materialized items"""
+        if self.row_source is None:
+            return super().yview(*args)
+        if not args:
+            return self._fractions()
+            
+        visible = self._visible_rows()
+        if args[0] == "moveto":
+            first = int(float(args[1]) * self.total_rows)
+        else:
+            amount = int(args[1])
+            first = self.first_row + (amount * visible if args[2] == "pages" else amount)
+        first = max(0, min(first, self.total_rows - visible))
+        if first != self.first_row:
+            self.first_row = first
+            self._render()
+            
+    def _visible_rows(self):
+        """Return how many rows fit in the widget"""
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        height = self.winfo_height()
+        if height <= 1:
+            return int(self.cget("height"))
+        # Leave room for the heading row
+        return max(1, (height - row_height) // row_height)
+        
+    def _fractions(self):
+        """Return the (first, last) fractions of the rows in view"""
+        if not self.total_rows:
+            return (0.0, 1.0)
+        last = min(self.total_rows, self.first_row + self._visible_rows())
+        return (self.first_row / self.total_rows, last / self.total_rows)
+        
+    def _rows(self, start, count):
+        """Return rows start..start+count from the block cache, fetching as needed"""
+        rows = []
+        index = start
+        end = min(start + count, self.total_rows)
+        while index < end:
+            block_index = index // VIRTUAL_BLOCK_SIZE
+            block = self.blocks.get(block_index)
+            if block is None:
+                block = self.row_source.fetch(block_index * VIRTUAL_BLOCK_SIZE, VIRTUAL_BLOCK_SIZE)
+                self.blocks[block_index] = block
+                while len(self.blocks) > VIRTUAL_CACHED_BLOCKS:
+                    self.blocks.popitem(last=False)
+            else:
+                self.blocks.move_to_end(block_index)
+            offset = index - block_index * VIRTUAL_BLOCK_SIZE
+            chunk = block[offset:offset + end - index]
+            if not chunk:
+                break  # Source shrank since it was counted
+            rows.extend(chunk)
+            index += len(chunk)
+        return rows
+        
+    def _item_id(self, index, row):
+        """Return the Tk item id for a row"""
+        if self.key_column is None:
+            return f"row{index}"
+        return str(row[self.key_column])
+        
+    def _render(self):
+        """Replace the materialized items with the rows in view"""
+        # Remember which rendered rows are selected before replacing them
+        current = super().get_children()
+        selected = set(super().selection())
+        for iid in current:
+            if iid in selected:
+                self.selected_rows[iid] = super().item(iid, "values")
+            else:
+                self.selected_rows.pop(iid, None)
+        self.delete(*current)
+        
+        rows = self._rows(self.first_row, self._visible_rows())
+        for index, row in enumerate(rows, start=self.first_row):
+            self.insert("", tk.END, iid=self._item_id(index, row), values=row)
+        reselect = [iid for iid in self.selected_rows if self.exists(iid)]
+        if reselect:
+            self.selection_set(*reselect)
+        self.y_scrollbar.set(*self._fractions())
+        
+    def _on_native_yscroll(self, first, last):
+        """Forward the Treeview's own scroll position when not virtual"""
+        if self.row_source is None:
+            self.y_scrollbar.set(first, last)
+            
+    def _on_configure(self, event):
+        """Re-render when the widget is resized"""
+        if self.row_source is not None and len(super().get_children()) != self._visible_rows():
+            self.first_row = max(0, min(self.first_row, self.total_rows - self._visible_rows()))
+            self._render()
+            
+    def _on_click(self, event):
+        """Drop remembered off-screen selections when a click replaces the selection"""
+        # Shift (0x1) and Control (0x4) extend the selection instead
+        if not event.state & 0x5:
+            self.selected_rows = {}
+            
+    def _on_mousewheel(self, event):
+        """Scroll through the row source with the mouse wheel"""
+        if self.row_source is None:
+            return None
+        if event.num == 4 or event.delta > 0:
+            self.yview("scroll", -3, "units")
+        else:
+            self.yview("scroll", 3, "units")
+        return "break"
+        
+    def _on_arrow_key(self, event):
+        """Scroll by one row when the arrow keys move past the rendered rows"""
+        if self.row_source is None:
+            return None
+        children = super().get_children()
+        focus = self.focus()
+        if not children or focus not in children:
+            return None
+        step = 1 if event.keysym == "Down" else -1
+        position = children.index(focus) + step
+        if 0 <= position < len(children):
+            return None  # Let the Treeview move within the rendered rows
+        self.yview("scroll", step, "units")
+        children = super().get_children()
+        if children:
+            target = children[-1] if step > 0 else children[0]
+            self.selection_set(target)
+            self.focus(target)
+        return "break"
+        
+    def _on_page_key(self, event):
+        """Scroll by a page with Page Up / Page Down"""
+        if self.row_source is None:
+            return None
+        self.yview("scroll", 1 if event.keysym == "Next" else -1, "pages")
+        return "break"
+        
+def make_sortable(tree, positions, reload):
+    """Let the headings of tree's columns at positions sort it on the server
+    
+    A click sets tree.sort to (position, descending), reversing the order
+    when the column is sorted already, marks the heading with an arrow and
+    calls reload() to fetch the rows in the new order.
+    """
+    columns = tree["columns"]
+    headings = {column: tree.heading(column, "text") for column in columns}
+    
+    def sort_by(position):
+        descending = tree.sort is not None and tree.sort[0] == position and not tree.sort[1]
+        tree.sort = (position, descending)
+        for column in columns:
+            tree.heading(column, text=headings[column])
+        column = columns[position]
+        tree.heading(column, text=f"{headings[column]} {'▼' if descending else '▲'}")
+        reload()
+        
+    for position in positions:
+        tree.heading(columns[position], command=lambda position=position: sort_by(position))
+
+def create_busy_indicator(parent):
+    """Create a progress bar shown while background queries run"""
+    return ttk.Progressbar(parent, mode="indeterminate", length=120)
+
+def set_busy(indicator, busy):
+    """Show and animate a busy indicator, or hide it"""
+    if busy:
+        indicator.pack(side=tk.RIGHT, padx=10)
+        indicator.start(10)
+    else:
+        indicator.stop()
+        indicator.pack_forget()
+
 def create_form_frame(parent, text):
     """Create a standardized form frame"""
     form_frame = ttk.LabelFrame(parent, text=text)